@@ -1,26 +1,53 @@
+import time
+import uuid
 import streamlit as st
 import pandas as pd
-from io import BytesIO
 from datetime import datetime
-import re, ast, unicodedata
+
+from workbook_utils import Workbook, content_hash, UPLOAD_TYPES
+from result_cache import RESULTS
+from instrumentation import memory_tracing, set_memory_tracing
+from stats_core import (
+    open_workbook, missing_columns, students_table,
+    export_stats, export_students, export_broken_pairs, TABLE_FORMATS, sanitize_sheet_name,
+    broken_summary, build_broken_report, build_mass_broken_and_conflicts_report,
+    compare_workbook, build_comparison_report, optimize_sheet, build_scenarios_workbook, name_matches,
+    filter_table, page_of, PAGE_SIZES,
+)
+from friends_utils import FUZZY_THRESHOLD
+from scenario_optimizer import DEFAULT_TOLERANCES
+from scenario_editor import ScenarioEditor
 
 # ---------------------------
 # 🔄 Restart helpers
 # ---------------------------
+def _session_id() -> str:
+    """Σταθερό id της συνεδρίας (κλειδί απομόνωσης στη μνήμη αποτελεσμάτων)."""
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return st.session_state["session_id"]
+
+def _session_result(slot: str, key):
+    """Η τιμή της θέσης `slot` της συνεδρίας στη μνήμη αποτελεσμάτων, αν χτίστηκε για το `key` (αλλιώς None)."""
+    entry = RESULTS.get(_session_id(), slot)
+    return entry[1] if entry is not None and entry[0] == key else None
+
+def _store_session_result(slot: str, key, value):
+    """Αποθηκεύει (key, value) στη θέση `slot` (όριο μνήμης/TTL όπως τα Workbook· φεύγει στην επανεκκίνηση)."""
+    RESULTS.put(_session_id(), slot, (key, value))
+    return value
+
 def _restart_app():
-    """Clear caches & widget states (including file_uploader) and rerun."""
+    """Clear this session's results & widget states (including file_uploader) and rerun."""
+    job = st.session_state.pop("analysis_job", None)
+    if job is not None:
+        job.cancel()   # η ανάλυση παρασκηνίου σταματά μετά το τρέχον sheet
     st.session_state["uploader_key"] = st.session_state.get("uploader_key", 0) + 1
     for k in list(st.session_state.keys()):
         if str(k).startswith("uploader_"):
             del st.session_state[k]
-    try:
-        st.cache_data.clear()
-    except Exception:
-        pass
-    try:
-        st.cache_resource.clear()
-    except Exception:
-        pass
+    # Workbook, editor, optimizer και έτοιμα αρχεία: μόνο αυτής της συνεδρίας· οι άλλοι χρήστες δεν επηρεάζονται
+    RESULTS.clear_session(_session_id())
     st.rerun()
 
 st.set_page_config(page_title="📊 Στατιστικά & 🧩 Σπασμένες Φιλίες", page_icon="🧩", layout="wide")
@@ -54,7 +81,7 @@ with st.sidebar.expander("Κάτοχος/Δημιουργός & Άδεια", exp
 
 with st.sidebar.expander("🔒 Προστασία Δεδομένων (GDPR – Κύπρος)", expanded=False):
     st.markdown("""
-- Τα αρχεία Excel ανεβαίνουν από τον χρήστη και χρησιμοποιούνται **μόνο** για άμεσο υπολογισμό. Η εφαρμογή δεν αποθηκεύει μόνιμα δεδομένα.  
+- Τα αρχεία Excel ανεβαίνουν από τον χρήστη και χρησιμοποιούνται **μόνο** για άμεσο υπολογισμό. Η εφαρμογή δεν αποθηκεύει μόνιμα δεδομένα: τα αποτελέσματα κρατούνται **μόνο στη μνήμη** (ποτέ σε δίσκο), χωριστά ανά συνεδρία, και σβήνονται με την «Επανεκκίνηση», μετά από αδράνεια ή όταν χρειαστεί χώρος.  
 - Ο χρήστης/σχολείο ευθύνεται για συμμόρφωση με **GDPR**.  
 - **Συστάσεις:** ψευδώνυμα/κωδικοί, ελαχιστοποίηση δεδομένων, περίοδος διατήρησης, ενημέρωση DPO, έλεγχος παρόχου cloud.
 """)
@@ -73,409 +100,202 @@ with st.expander("📜 Πλήρεις Όροι Χρήσης & Αποποίηση
 """)
 
 # ---------------------------
-# Canonicalization / Renaming
-# ---------------------------
-def _canon(s: str) -> str:
-    return "".join((s or "").replace("_"," ").split()).upper()
-
-CANON_TARGETS = {
-    "ΟΝΟΜΑ": {"ΟΝΟΜΑ"},
-    "ΦΥΛΟ": {"ΦΥΛΟ"},
-    "ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ": {"ΠΑΙΔΙΕΚΠΑΙΔΕΥΤΙΚΟΥ", "ΠΑΙΔΙ-ΕΚΠΑΙΔΕΥΤΙΚΟΥ"},
-    "ΖΩΗΡΟΣ": {"ΖΩΗΡΟΣ"},
-    "ΙΔΙΑΙΤΕΡΟΤΗΤΑ": {"ΙΔΙΑΙΤΕΡΟΤΗΤΑ"},
-    "ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ": {"ΚΑΛΗΓΝΩΣΗΕΛΛΗΝΙΚΩΝ", "ΓΝΩΣΗΕΛΛΗΝΙΚΩΝ"},
-    "ΦΙΛΟΙ": {"ΦΙΛΟΙ", "ΦΙΛΙΑ", "ΦΙΛΟΣ"},
-    "ΣΥΓΚΡΟΥΣΗ": {"ΣΥΓΚΡΟΥΣΗ", "ΣΥΓΚΡΟΥΣΕΙΣ"},
-    "ΤΜΗΜΑ": {"ΤΜΗΜΑ"},
-}
-REQUIRED_COLS = ["ΟΝΟΜΑ","ΦΥΛΟ","ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ","ΖΩΗΡΟΣ","ΙΔΙΑΙΤΕΡΟΤΗΤΑ","ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ","ΦΙΛΟΙ","ΣΥΓΚΡΟΥΣΗ","ΤΜΗΜΑ"]
-
-def auto_rename_columns(df: pd.DataFrame):
-    """Map κοινές ελληνικές στήλες σε κανονική μορφή. Αν δεν βρεθούν, δημιουργούνται/συνενώνονται όπου χρειάζεται."""
-    mapping, seen = {}, set()
-    for col in df.columns:
-        c = _canon(col)
-        for target, keys in CANON_TARGETS.items():
-            if c in keys and target not in seen:
-                mapping[col] = target
-                seen.add(target)
-                break
-    renamed = df.rename(columns=mapping)
-
-    # ΦΙΛΟΙ fallback
-    friends_cols = [c for c in renamed.columns if c in ("ΦΙΛΟΙ","ΦΙΛΙΑ","ΦΙΛΟΣ")]
-    if not friends_cols:
-        candidates = []
-        for col in df.columns:
-            c = _canon(col)
-            if "ΦΙΛ" in c or "FRIEND" in c:
-                candidates.append(col)
-        if candidates:
-            combined = []
-            for _, row in df[candidates].astype(str).iterrows():
-                vals = [str(v).strip() for v in row.tolist() if str(v).strip() and str(v).strip().upper() not in ("-","NA","NAN")]
-                combined.append(", ".join(vals))
-            renamed["ΦΙΛΟΙ"] = combined
-
-    # ΤΜΗΜΑ fallback
-    if "ΤΜΗΜΑ" not in renamed.columns:
-        best = None
-        for col in df.columns[::-1]:
-            s = df[col].dropna().astype(str).str.strip()
-            if not len(s):
-                continue
-            if s.str.len().median() <= 4 and s.nunique() <= 10:
-                best = col
-                break
-        if best:
-            renamed = renamed.rename(columns={best:"ΤΜΗΜΑ"})
-
-    # ΣΥΓΚΡΟΥΣΗ fallback
-    if "ΣΥΓΚΡΟΥΣΗ" not in renamed.columns:
-        if "ΣΥΓΚΡΟΥΣΕΙΣ" in renamed.columns:
-            renamed = renamed.rename(columns={"ΣΥΓΚΡΟΥΣΕΙΣ": "ΣΥΓΚΡΟΥΣΗ"})
-        else:
-            renamed["ΣΥΓΚΡΟΥΣΗ"] = ""
-    return renamed, mapping
-
-# ---------------------------
-# Name canonicalization helpers
-# ---------------------------
-
-def _strip_diacritics(s: str) -> str:
-    nfkd = unicodedata.normalize("NFD", s)
-    return "".join(ch for ch in nfkd if not unicodedata.combining(ch))
-
-def _canon_name(s: str) -> str:
-    s = (str(s) if s is not None else "").strip()
-    s = s.strip("[]'\" ")
-    s = re.sub(r"\s+", " ", s)
-    s = _strip_diacritics(s).upper()
-    return s
-
-_SPLIT_RE = re.compile(r"\s*(?:,|;|/|\||\band\b|\bκαι\b|\+|\n)\s*", flags=re.IGNORECASE)
-
-# ---------------------------
-# Friends parsing & broken pairs
-# ---------------------------
-
-def _parse_friends(cell):
-    raw = str(cell) if cell is not None else ""
-    raw = raw.strip()
-    if not raw:
-        return []
-    if raw.startswith("[") and raw.endswith("]"):
-        try:
-            val = ast.literal_eval(raw)
-            if isinstance(val, (list, tuple)):
-                return [_canon_name(x) for x in val if str(x).strip()]
-        except Exception:
-            pass
-        raw2 = raw.strip("[]")
-        parts = re.split(r"[;,]", raw2)
-        return [_canon_name(p) for p in parts if _canon_name(p)]
-    parts = [p for p in _SPLIT_RE.split(raw) if p]
-    return [_canon_name(p) for p in parts if _canon_name(p)]
-
-
-def list_broken_mutual_pairs(df: pd.DataFrame) -> pd.DataFrame:
-    """Επιστρέφει DataFrame με κάθε **σπασμένη πλήρως αμοιβαία δυάδα** (A/B + τμήματα)."""
-    fcol = None
-    for candidate in ["ΦΙΛΟΙ","ΦΙΛΙΑ","ΦΙΛΟΣ"]:
-        if candidate in df.columns:
-            fcol = candidate
-            break
-    if fcol is None or "ΟΝΟΜΑ" not in df.columns or "ΤΜΗΜΑ" not in df.columns:
-        return pd.DataFrame(columns=["A","A_ΤΜΗΜΑ","B","B_ΤΜΗΜΑ"])
-
-    df = df.copy()
-    df["__CAN_NAME__"] = df["ΟΝΟΜΑ"].map(_canon_name)
-    name_to_original = dict(zip(df["__CAN_NAME__"], df["ΟΝΟΜΑ"].astype(str)))
-    class_by_name = dict(zip(df["__CAN_NAME__"], df["ΤΜΗΜΑ"].astype(str).str.strip()))
-
-    token_index = {}
-    for full in df["__CAN_NAME__"]:
-        tokens = [t for t in re.split(r"\s+", full) if t]
-        for t in tokens:
-            token_index.setdefault(t, set()).add(full)
-
-    def resolve_friend(s: str):
-        s = _canon_name(s)
-        if not s:
-            return None
-        if s in name_to_original:
-            return s
-        toks = [t for t in re.split(r"\s+", s) if t]
-        if not toks:
-            return None
-        if len(toks) >= 2:
-            sets = [token_index.get(t, set()) for t in toks]
-            inter = set.intersection(*sets) if sets else set()
-            if len(inter) == 1:
-                return next(iter(inter))
-            union = set().union(*sets)
-            if len(union) == 1:
-                return next(iter(union))
-            return None
-        else:
-            group = token_index.get(toks[0], set())
-            return next(iter(group)) if len(group) == 1 else None
-
-    friends_by_name = {}
-    for _, row in df.iterrows():
-        me = row["__CAN_NAME__"]
-        flist_raw = _parse_friends(row[fcol])
-        resolved = set()
-        for fr in flist_raw:
-            r = resolve_friend(fr)
-            if r and r != me:
-                resolved.add(r)
-        friends_by_name[me] = resolved
-
-    mutual_pairs = set()
-    for a, flist in friends_by_name.items():
-        for b in flist:
-            if b in friends_by_name and a in friends_by_name[b]:
-                mutual_pairs.add(tuple(sorted([a,b])))
-
-    rows = []
-    for a, b in sorted(mutual_pairs):
-        ta = class_by_name.get(a, "")
-        tb = class_by_name.get(b, "")
-        if ta and tb and ta != tb:
-            rows.append({
-                "A": name_to_original.get(a, a), "A_ΤΜΗΜΑ": ta,
-                "B": name_to_original.get(b, b), "B_ΤΜΗΜΑ": tb,
-            })
-    return pd.DataFrame(rows)
-
-# ---------------------------
-# Broken friendships per student (counts + names)
+# Export helpers
 # ---------------------------
 
-def compute_broken_friend_names_per_student(df: pd.DataFrame):
-    """Return (counts_series, names_series) per student for σπασμένες πλήρως αμοιβαίες δυάδες."""
-    if not {"ΟΝΟΜΑ", "ΤΜΗΜΑ"}.issubset(df.columns):
-        return pd.Series([0]*len(df), index=df.index), pd.Series([""]*len(df), index=df.index)
-
-    df_local = df.copy()
-    df_local["__CAN_NAME__"] = df_local["ΟΝΟΜΑ"].map(_canon_name)
-    canon_to_display = dict(zip(df_local["__CAN_NAME__"], df_local["ΟΝΟΜΑ"].astype(str)))
-
-    broken_df = list_broken_mutual_pairs(df_local)
-    broken_map = {cn: [] for cn in df_local["__CAN_NAME__"]}
-
-    for _, row in broken_df.iterrows():
-        a = _canon_name(row.get("A", "")) if "A" in row else ""
-        b = _canon_name(row.get("B", "")) if "B" in row else ""
-        if a and b:
-            broken_map.setdefault(a, []).append(canon_to_display.get(b, row.get("B", "")))
-            broken_map.setdefault(b, []).append(canon_to_display.get(a, row.get("A", "")))
+def lazy_download_button(wb: Workbook, key: tuple, build, label: str, **kwargs):
+    """
+    Κουμπί λήψης που χτίζει την αναφορά **μόνο** όταν ζητηθεί: πρώτα «Προετοιμασία»,
+    μετά λήψη. Τα bytes κρατούνται στο Workbook ανά (αρχείο, key) και δεν ξαναχτίζονται σε κάθε rerun.
+    """
+    if not wb.has_report(key):
+        if not st.button(f"⚙️ Προετοιμασία: {label}", key="prep_" + "|".join(map(str, key))):
+            return
+        with st.spinner("Δημιουργία αναφοράς…"):
+            wb.report(key, build)
+    st.download_button(label, data=wb.report(key, build), key="dl_" + "|".join(map(str, key)), **kwargs)
 
-    counts, names = [], []
-    for cn in df_local["__CAN_NAME__"]:
-        lst = broken_map.get(cn, []) or []
-        counts.append(len(lst))
-        names.append(", ".join(lst))
-    return pd.Series(counts, index=df.index), pd.Series(names, index=df.index)
 
 # ---------------------------
-# Conflicts per student (NO pairs)
+# 📄 Filtered / paged tables
 # ---------------------------
 
-def _parse_conflict_targets(cell):
-    raw = str(cell) if cell is not None else ""
-    raw = raw.strip()
-    if not raw:
-        return []
-    if raw.startswith("[") and raw.endswith("]"):
-        try:
-            val = ast.literal_eval(raw)
-            if isinstance(val, (list, tuple)):
-                return [_canon_name(x) for x in val if str(x).strip()]
-        except Exception:
-            pass
-        raw2 = raw.strip("[]")
-        parts = re.split(r"[;,]", raw2)
-        return [_canon_name(p) for p in parts if _canon_name(p)]
-    parts = [p for p in _SPLIT_RE.split(raw) if p]
-    return [_canon_name(p) for p in parts if _canon_name(p)]
-
-
-def _build_name_resolution(df: pd.DataFrame):
-    df = df.copy()
-    df["__CAN_NAME__"] = df["ΟΝΟΜΑ"].map(_canon_name)
-    name_to_original = dict(zip(df["__CAN_NAME__"], df["ΟΝΟΜΑ"].astype(str)))
-    class_by_name = dict(zip(df["__CAN_NAME__"], df["ΤΜΗΜΑ"].astype(str).str.strip()))
-    token_index = {}
-    for full in df["__CAN_NAME__"]:
-        tokens = [t for t in re.split(r"\s+", full) if t]
-        for t in tokens:
-            token_index.setdefault(t, set()).add(full)
-    def resolve_name(s: str):
-        s = _canon_name(s)
-        if not s:
-            return None
-        if s in name_to_original:
-            return s
-        toks = [t for t in re.split(r"\s+", s) if t]
-        if not toks:
-            return None
-        if len(toks) >= 2:
-            sets = [token_index.get(t, set()) for t in toks]
-            inter = set.intersection(*sets) if sets else set()
-            if len(inter) == 1:
-                return next(iter(inter))
-            union = set().union(*sets)
-            if len(union) == 1:
-                return next(iter(union))
-            return None
-        else:
-            group = token_index.get(toks[0], set())
-            return next(iter(group)) if len(group) == 1 else None
-    return name_to_original, class_by_name, resolve_name
-
-
-def compute_conflict_counts_and_names(df: pd.DataFrame):
+def render_paged_table(df: pd.DataFrame, key: str, class_cols=("ΤΜΗΜΑ",), name_cols=("ΟΝΟΜΑ",), student_filters: bool = True):
     """
-    Return (counts_series, names_series) per student.
-    - counts_series: πόσοι από τους δηλωμένους βρίσκονται στην **ίδια τάξη** (μονόπλευρη δήλωση αρκεί).
-    - names_series: ονόματα αυτών των μαθητών (comma-separated).
+    Πίνακας με φίλτρα (τμήμα, όνομα, ≥1 σπασμένη/σύγκρουση) και σελίδες, όλα στον server:
+    στο st.dataframe στέλνεται μόνο η ορατή σελίδα. Επιστρέφει τις φιλτραρισμένες γραμμές.
     """
-    required = {"ΟΝΟΜΑ", "ΤΜΗΜΑ", "ΣΥΓΚΡΟΥΣΗ"}
-    if not required.issubset(set(df.columns)):
-        return pd.Series([0]*len(df), index=df.index), pd.Series([""]*len(df), index=df.index)
+    classes = sorted({str(v).strip() for col in class_cols if col in df.columns for v in df[col].dropna().unique()})
+    c1, c2 = st.columns([1, 1])
+    chosen = c1.multiselect("Τμήμα", classes, key=f"{key}_classes") if classes else []
+    search = c2.text_input("Αναζήτηση ονόματος", key=f"{key}_search", placeholder="π.χ. παπαδο")
+    only_broken = only_conflict = False
+    if student_filters:
+        c3, c4 = st.columns([1, 1])
+        only_broken = c3.checkbox("Μόνο με ≥1 σπασμένη φιλία", key=f"{key}_broken")
+        only_conflict = c4.checkbox("Μόνο με ≥1 σύγκρουση", key=f"{key}_conflict")
+    view = filter_table(df, chosen, class_cols, name_cols, search, only_broken, only_conflict)
+
+    c5, c6, c7 = st.columns([1, 1, 2])
+    size = c5.selectbox("Γραμμές ανά σελίδα", PAGE_SIZES, index=1, key=f"{key}_size")
+    pages = page_of(view, 1, size)[1]
+    if st.session_state.get(f"{key}_page", 1) > pages:      # λιγότερες σελίδες μετά από νέο φίλτρο
+        st.session_state[f"{key}_page"] = pages
+    page = c6.number_input("Σελίδα", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    rows, _ = page_of(view, page, size)
+    c7.caption(f"{len(view)} από {len(df)} γραμμές · σελίδα {min(page, pages)}/{pages}")
+    st.dataframe(rows, use_container_width=True)
+    return view
 
-    name_to_original, class_by_name, resolve_name = _build_name_resolution(df)
-
-    canon_names = df["ΟΝΟΜΑ"].map(_canon_name)
-    counts = [0]*len(df)
-    names = [""]*len(df)
-
-    index_by_canon = {cn: i for i, cn in enumerate(canon_names)}
-
-    for i, row in df.iterrows():
-        me = _canon_name(row["ΟΝΟΜΑ"])
-        my_class = class_by_name.get(me, "")
-        targets = _parse_conflict_targets(row["ΣΥΓΚΡΟΥΣΗ"])
-        same_class_names = []
-        for t in targets:
-            r = resolve_name(t)
-            if r and r != me:
-                if class_by_name.get(r, None) == my_class and my_class:
-                    same_class_names.append(name_to_original.get(r, r))
-        counts[index_by_canon.get(me, i)] = len(same_class_names)
-        names[index_by_canon.get(me, i)] = ", ".join(same_class_names)
+# ---------------------------
+# 🩺 Diagnostics (sidebar)
+# ---------------------------
 
-    return pd.Series(counts, index=df.index), pd.Series(names, index=df.index)
+def render_diagnostics(wb: Workbook):
+    """Χρόνοι/μνήμη ανά στάδιο (από το Workbook.diagnostics) σε expander στο sidebar."""
+    with st.sidebar.expander("🩺 Διαγνωστικά απόδοσης", expanded=False):
+        mem = st.checkbox(
+            "Μέτρηση μνήμης (tracemalloc)", value=memory_tracing(), key="diag_tracemalloc",
+            help="Επιβαρύνει ελαφρά όλη την εφαρμογή όσο είναι ενεργό· μετρά τα στάδια που τρέχουν μετά την ενεργοποίηση.",
+        )
+        if mem != memory_tracing():
+            set_memory_tracing(mem)
+        diag = wb.diagnostics()
+        if diag.empty:
+            st.caption("Δεν έχει καταγραφεί κανένα στάδιο ακόμη.")
+            return
+        per_stage = diag.groupby("Στάδιο", sort=False).agg(
+            {"Κλήσεις": "sum", "Χρόνος (s)": "sum", "Peak μνήμη (MB)": "max"}
+        ).sort_values("Χρόνος (s)", ascending=False)
+        st.dataframe(per_stage.round(4), use_container_width=True)
+        st.caption("Ανά sheet:")
+        st.dataframe(diag.round(4), use_container_width=True, hide_index=True)
+        _render_cache_usage()
+
+def _render_cache_usage():
+    """Τα αποτελέσματα αυτής της συνεδρίας στη μνήμη αποτελεσμάτων και η συνολική κατάληψη."""
+    st.caption(f"Μνήμη αποτελεσμάτων (όλες οι συνεδρίες): {RESULTS.total / 2**20:.1f} / "
+               f"{RESULTS.budget / 2**20:.0f} MB")
+    st.dataframe(RESULTS.usage(_session_id()).round(2), use_container_width=True, hide_index=True)
 
 # ---------------------------
-# Stats generator
+# 🔁 What-if editor (stats tab)
 # ---------------------------
 
-def generate_stats(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    if "ΤΜΗΜΑ" in df:
-        df["ΤΜΗΜΑ"] = df["ΤΜΗΜΑ"].apply(lambda v: v.strip() if isinstance(v, str) else v)
-    if "ΦΥΛΟ" in df:
-        df["ΦΥΛΟ"] = df["ΦΥΛΟ"].fillna("").astype(str).str.strip().str.upper()
-    for col in ["ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ","ΖΩΗΡΟΣ","ΙΔΙΑΙΤΕΡΟΤΗΤΑ","ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ"]:
-        if col in df:
-            s = df[col]
-            if s.dtype == object:
-                s = s.fillna("").astype(str).str.strip().str.upper().replace({
-                    "ΝΑΙ":"Ν","NAI":"Ν","YES":"Ν","Y":"Ν",
-                    "ΟΧΙ":"Ο","OXI":"Ο","NO":"Ο","N":"Ο","": "Ο"
-                })
-                df[col] = s.where(s.isin(["Ν","Ο"]), other="Ο")
-
-    boys = df[df.get("ΦΥΛΟ", "").eq("Α")].groupby("ΤΜΗΜΑ").size() if "ΦΥΛΟ" in df else pd.Series(dtype=int)
-    girls = df[df.get("ΦΥΛΟ", "").eq("Κ")].groupby("ΤΜΗΜΑ").size() if "ΦΥΛΟ" in df else pd.Series(dtype=int)
-    educators = df[df.get("ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ", "").eq("Ν")].groupby("ΤΜΗΜΑ").size() if "ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ" in df else pd.Series(dtype=int)
-    energetic = df[df.get("ΖΩΗΡΟΣ", "").eq("Ν")].groupby("ΤΜΗΜΑ").size() if "ΖΩΗΡΟΣ" in df else pd.Series(dtype=int)
-    special = df[df.get("ΙΔΙΑΙΤΕΡΟΤΗΤΑ", "").eq("Ν")].groupby("ΤΜΗΜΑ").size() if "ΙΔΙΑΙΤΕΡΟΤΗΤΑ" in df else pd.Series(dtype=int)
-    greek = df[df.get("ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ", "").eq("Ν")].groupby("ΤΜΗΜΑ").size() if "ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ" in df else pd.Series(dtype=int)
-    total = df.groupby("ΤΜΗΜΑ").size() if "ΤΜΗΜΑ" in df else pd.Series(dtype=int)
-
-    # Broken friendships per class
-    try:
-        pairs = list_broken_mutual_pairs(df)
-        if pairs.empty:
-            broken = pd.Series({tmima: 0 for tmima in df["ΤΜΗΜΑ"].dropna().astype(str).str.strip().unique()})
-        else:
-            counts = {}
-            for _, row in pairs.iterrows():
-                a_c = str(row["A_ΤΜΗΜΑ"]).strip(); b_c = str(row["B_ΤΜΗΜΑ"]).strip()
-                counts[a_c] = counts.get(a_c, 0) + 1
-                counts[b_c] = counts.get(b_c, 0) + 1
-            broken = pd.Series(counts).astype(int)
-    except Exception:
-        broken = pd.Series(dtype=int)
-
-    # Conflicts per class = sum of per-student counts (no pairs)
-    try:
-        conf_counts, _conf_names = compute_conflict_counts_and_names(df)
-        if "ΤΜΗΜΑ" in df:
-            cls = df["ΤΜΗΜΑ"].astype(str).str.strip()
-            conflict_by_class = conf_counts.groupby(cls).sum().astype(int)
-        else:
-            conflict_by_class = pd.Series(dtype=int)
-    except Exception:
-        conflict_by_class = pd.Series(dtype=int)
-
-    stats = pd.DataFrame({
-        "ΑΓΟΡΙΑ": boys,
-        "ΚΟΡΙΤΣΙΑ": girls,
-        "ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ": educators,
-        "ΖΩΗΡΟΙ": energetic,
-        "ΙΔΙΑΙΤΕΡΟΤΗΤΑ": special,
-        "ΓΝΩΣΗ ΕΛΛΗΝΙΚΩΝ": greek,
-        "ΣΥΓΚΡΟΥΣΗ": conflict_by_class,
-        "ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ": broken,
-        "ΣΥΝΟΛΟ ΜΑΘΗΤΩΝ": total,
-    }).fillna(0).astype(int)
-
-    if hasattr(stats.index, "str"):
-        stats = stats.loc[stats.index.str.lower() != "nan"]
-    try:
-        stats = stats.sort_index(key=lambda x: x.str.extract(r"(\d+)")[0].astype(float))
-    except Exception:
-        stats = stats.sort_index()
-    return stats
+def _scenario_editor(wb: Workbook, sheet: str, df_norm: pd.DataFrame, analysis) -> ScenarioEditor:
+    """Ένας ScenarioEditor ανά συνεδρία για το τρέχον (αρχείο, sheet)· οι αλλαγές διατηρούνται στα reruns."""
+    key = (wb.digest, sheet, analysis.graph.fuzzy if analysis.graph is not None else None)
+    editor = _session_result("scenario_editor", key)
+    if editor is None:
+        editor = _store_session_result("scenario_editor", key, ScenarioEditor(df_norm, graph=analysis.graph))
+    return editor
+
+def render_scenario_editor(wb: Workbook, sheet: str, df_norm: pd.DataFrame, analysis):
+    """Μετακίνηση/ανταλλαγή μαθητών με άμεση προεπισκόπηση των μεταβολών (χωρίς επανυπολογισμό του sheet)."""
+    editor = _scenario_editor(wb, sheet, df_norm, analysis)
+    if editor.k < 2:
+        st.info("Χρειάζονται τουλάχιστον δύο τμήματα.")
+        return
+
+    def label(i):
+        return f"{editor.name(i)} ({editor.class_of(i)})"
+
+    action = st.radio("Αλλαγή", ["Μετακίνηση", "Ανταλλαγή"], horizontal=True, key="edit_action")
+    who = st.selectbox("Μαθητής", editor.movable, format_func=label, key="edit_who")
+    if action == "Μετακίνηση":
+        target = st.selectbox("Νέο ΤΜΗΜΑ", [c for c in editor.labels if c != editor.class_of(who)], key="edit_to")
+        preview = editor.preview_move(who, target)
+        apply = lambda: editor.move(who, target)
+    else:
+        others = [j for j in editor.movable if editor.cls[j] != editor.cls[who]]
+        other = st.selectbox("Με μαθητή", others, format_func=label, key="edit_with")
+        preview = editor.preview_swap(who, other)
+        apply = lambda: editor.swap(who, other)
+
+    c1, c2 = st.columns(2)
+    c1.metric("Σπασμένες αμοιβαίες δυάδες", editor.broken + preview.broken, delta=preview.broken, delta_color="inverse")
+    c2.metric("Συγκρούσεις στην ίδια τάξη", editor.conflicts + preview.conflicts, delta=preview.conflicts,
+              delta_color="inverse")
+    for title, items in [("➕ Νέες σπασμένες", preview.broken_added), ("✅ Διορθώνονται", preview.broken_removed),
+                         ("⚠️ Νέες συγκρούσεις", preview.conflicts_added),
+                         ("✅ Φεύγουν συγκρούσεις", preview.conflicts_removed)]:
+        if items:
+            st.caption(f"{title}: " + "; ".join(f"{a} – {b}" for a, b in items))
+    if not preview.stats.empty:
+        st.dataframe(preview.stats, use_container_width=True)
+
+    b1, b2, b3 = st.columns(3)
+    if b1.button("✅ Εφαρμογή", key="edit_apply"):
+        apply()
+        RESULTS.refresh(_session_id(), "scenario_editor")   # το ιστορικό μεγαλώνει
+        st.rerun()
+    if b2.button("↩️ Αναίρεση", key="edit_undo", disabled=not editor.history):
+        editor.undo()
+        st.rerun()
+    if b3.button("♻️ Επαναφορά", key="edit_reset", disabled=not editor.history):
+        editor.reset()
+        st.rerun()
+
+    changes = editor.changes()
+    if not changes.empty:
+        st.markdown(f"**Στατιστικά μετά τις αλλαγές** ({len(changes)} μαθητές σε άλλο τμήμα)")
+        st.dataframe(editor.stats(), use_container_width=True)
+        st.dataframe(changes, use_container_width=True, hide_index=True)
+        # Χτίζεται μόνο όταν ζητηθεί (όπως το lazy_download_button) και για την τρέχουσα κατάσταση
+        label = "⬇️ Κατέβασε Excel με το νέο σενάριο (όλα τα sheets + *_EDIT1)"
+        state_key = (wb.digest, sheet, tuple(editor.cls))
+        prepared = _session_result("edited_export", state_key)
+        if prepared is None:
+            if not st.button(f"⚙️ Προετοιμασία: {label}", key="edit_prep"):
+                return
+            with st.spinner("Δημιουργία αναφοράς…"):
+                data = build_scenarios_workbook(wb, sheet, [editor.assignment()], suffix="EDIT").getvalue()
+            prepared = _store_session_result("edited_export", state_key, data)
+        st.download_button(
+            label,
+            data=prepared,
+            file_name=f"edited_{sanitize_sheet_name(sheet)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 
 # ---------------------------
-# Export helpers
+# Workbook cache (parse/normalize once per upload)
 # ---------------------------
 
-def export_stats_to_excel(stats_df: pd.DataFrame) -> BytesIO:
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        stats_df.to_excel(writer, index=True, sheet_name="Στατιστικά", index_label="ΤΜΗΜΑ")
-        wb = writer.book
-        ws = writer.sheets["Στατιστικά"]
-        header_fmt = wb.add_format({"bold": True, "valign":"vcenter", "text_wrap": True, "border":1})
-        for col_idx, value in enumerate(["ΤΜΗΜΑ"] + list(stats_df.columns)):
-            ws.write(0, col_idx, value, header_fmt)
-        for i in range(0, len(stats_df.columns)+1):
-            ws.set_column(i, i, 18)
-    output.seek(0)
-    return output
-
-
-def sanitize_sheet_name(s: str) -> str:
-    s = str(s or "")
-    s = re.sub(r'[:\\/?*\\[\\]]', ' ', s)
-    return s[:31] if s else "SHEET"
+def _load_workbook(data: bytes, name: str, fuzzy: float = None) -> Workbook:
+    """
+    Ένα Workbook ανά (συνεδρία, περιεχόμενο αρχείου, ρύθμιση fuzzy) στη μνήμη αποτελεσμάτων
+    (όριο μνήμης, LRU/TTL, μόνο RAM)· το μέγεθός του ξαναμετριέται σε κάθε rerun καθώς μεγαλώνει.
+    Το `name` δίνει το όνομα του σεναρίου σε ένα μεμονωμένο CSV/Parquet/Arrow.
+    """
+    sid, key = _session_id(), ("workbook", content_hash(data), name, fuzzy)
+    wb = RESULTS.get(sid, key, lambda: open_workbook(data, fuzzy=fuzzy, name=name))
+    RESULTS.refresh(sid, key)
+    return wb
+
+with st.sidebar.expander("🔤 Αντιστοίχιση ονομάτων", expanded=False):
+    use_fuzzy = st.checkbox(
+        "Ανοχή σε ορθογραφικά λάθη", value=False, key="fuzzy_names",
+        help="Ονόματα στα ΦΙΛΟΙ/ΣΥΓΚΡΟΥΣΗ που δεν ταιριάζουν ακριβώς αντιστοιχίζονται στον πιο κοντινό μαθητή, "
+             "μόνο αν είναι μοναδικός. Οι αντιστοιχίσεις εμφανίζονται στη «Διάγνωση/Μετονομασίες».",
+    )
+    fuzzy_threshold = st.slider("Ελάχιστη ομοιότητα", 0.70, 0.99, FUZZY_THRESHOLD, 0.01, disabled=not use_fuzzy)
 
 # ---------------------------
 # Upload (with resettable key)
 # ---------------------------
 
+with st.sidebar:
+    export_fmt = st.selectbox(
+        "📦 Μορφή λήψης πινάκων", list(TABLE_FORMATS), key="export_fmt",
+        help="Στατιστικά, πίνακας μαθητών και σπασμένες δυάδες ανά sheet. Οι CSV/Parquet/Arrow γράφονται πολύ ταχύτερα από το xlsx.",
+    )
+export_ext, export_mime = TABLE_FORMATS[export_fmt]
+
 st.markdown("### 📥 Εισαγωγή Αρχείου Excel")
 uploaded = st.file_uploader(
-    "Επίλεξε **Excel** με ένα ή περισσότερα sheets (σενάρια)",
-    type=["xlsx","xls"],
+    "Επίλεξε **Excel** με ένα ή περισσότερα sheets (σενάρια) ή **CSV/Parquet/Arrow** (ένα σενάριο ανά αρχείο, ή zip με πολλά)",
+    type=UPLOAD_TYPES,
     key=f"uploader_{st.session_state['uploader_key']}"
 )
 
@@ -484,149 +304,272 @@ if not uploaded:
     st.stop()
 
 try:
-    xl = pd.ExcelFile(uploaded)
+    data = uploaded.getvalue()
+    xl = _load_workbook(data, uploaded.name, fuzzy_threshold if use_fuzzy else None)
     st.success(f"✅ Επεξεργασία αρχείου: **{uploaded.name}** — Βρέθηκαν {len(xl.sheet_names)} sheet(s).")
 except Exception as e:
     st.error(f"❌ Σφάλμα ανάγνωσης: {e}")
     st.stop()
 
+# ---------------------------
+# Background analysis (όλα τα sheets) με πρόοδο & ακύρωση
+# ---------------------------
+
+def _analysis_job(wb: Workbook):
+    """Το job παρασκηνίου του workbook· ακυρώνει το job του προηγούμενου αρχείου της συνεδρίας."""
+    previous = st.session_state.get("analysis_job")
+    if previous is not None and previous.wb is not wb:
+        previous.cancel()
+    if st.session_state.get("analysis_paused") == wb.digest:
+        job = wb.job or wb.start_analysis()
+    else:
+        job = wb.start_analysis()
+    st.session_state["analysis_job"] = job
+    return job
+
+def _job_state(job) -> tuple:
+    finished = job.finished         # πρώτα: αν έχει τελειώσει, οι μετρητές είναι τελικοί
+    return finished, len(job.done), len(job.errors)
+
+@st.fragment(run_every=1.0)
+def render_analysis_progress(job, shown: tuple):
+    """Πρόοδος ανά sheet· όταν αλλάξει η κατάσταση του job (από το `shown` που εμφανίζεται) ξανατρέχει όλη η σελίδα."""
+    # το πολύ ένα πλήρες rerun ανά δευτερόλεπτο, όσο κι αν είναι γρήγορα τα sheets
+    if _job_state(job) != shown and time.monotonic() - st.session_state.get("analysis_shown_at", 0.0) >= 1.0:
+        st.rerun()
+    failed = job.failed
+    if failed:
+        st.error("❌ Σφάλμα ανάλυσης σε " + str(len(failed)) + " sheet(s):\n"
+                 + "\n".join(f"- **{s}**: {job.errors[s]}" for s in failed))
+    if job.complete or (job.finished and not job.cancelled):
+        return
+    elif job.finished and job.cancelled:
+        st.warning(f"⏸️ Η ανάλυση σταμάτησε στα {len(job.done)}/{job.total} sheets.")
+        if st.button("▶️ Συνέχεια ανάλυσης"):
+            st.session_state.pop("analysis_paused", None)
+            job.wb.start_analysis()
+            st.rerun()
+    else:
+        st.progress(job.progress, text=f"Ανάλυση sheets: {len(job.done)}/{job.total}")
+        if st.button("⏹️ Ακύρωση ανάλυσης", help="Δεν ξεκινούν νέα sheets· όσα αναλύονται ήδη ολοκληρώνονται"):
+            job.cancel()
+            st.session_state["analysis_paused"] = job.wb.digest
+            st.rerun()
+
+job = _analysis_job(xl)
+job_state = _job_state(job)
+ready = list(job.done)                      # στιγμιότυπο: τα tabs δείχνουν μόνο τα έτοιμα sheets
+st.session_state["analysis_shown_at"] = time.monotonic()
+all_ready = len(ready) == len(xl.sheet_names)
+if not (all_ready and job.finished):
+    render_analysis_progress(job, job_state)
+
+def _wait_for_all():
+    failed = job.failed
+    if job_state[0] and failed and not job.cancelled:
+        st.error(f"❌ Μη διαθέσιμο: απέτυχε η ανάλυση των sheets {', '.join(failed)} (βλ. το σφάλμα παραπάνω).")
+    else:
+        st.info(f"⏳ Διαθέσιμο όταν ολοκληρωθεί η ανάλυση όλων των sheets ({len(ready)}/{len(xl.sheet_names)}).")
+
 # ---------------------------
 # Tabs (NO conflict pairs tab)
 # ---------------------------
 
-tab_stats, tab_broken, tab_mass = st.tabs([
+tab_stats, tab_broken, tab_compare, tab_optimize, tab_mass = st.tabs([
     "📊 Στατιστικά (1 sheet)",
     "🧩 Σπασμένες αμοιβαίες (όλα τα sheets) — Έξοδος: Πλήρες αντίγραφο + Σύνοψη",
+    "🔀 Σύγκριση σεναρίων",
+    "🧠 Βελτιστοποίηση",
     "📦 Μαζικές αναφορές",
 ])
 
 with tab_stats:
     st.subheader("📊 Υπολογισμός Στατιστικών για Επιλεγμένο Sheet")
     sheet = st.selectbox("Διάλεξε sheet", options=xl.sheet_names, index=0)
-    df_raw = xl.parse(sheet_name=sheet)
-    df_norm, ren_map = auto_rename_columns(df_raw)
-
-    # ✅ Μετρητής ΣΥΓΚΡΟΥΣΗ & ονόματα (χωρίς ζεύγη A–B)
-    try:
-        conflict_counts, conflict_names = compute_conflict_counts_and_names(df_norm)
-        df_with = df_norm.copy()
-        df_with["ΣΥΓΚΡΟΥΣΗ"] = conflict_counts.astype(int)
-        df_with["ΣΥΓΚΡΟΥΣΗ_ΟΝΟΜΑ"] = conflict_names
-        # 🧩 Σπασμένες αμοιβαίες ανά μαθητή (μετρητής + ονόματα)
-        try:
-            broken_counts_ps, broken_names_ps = compute_broken_friend_names_per_student(df_norm)
-            df_with["ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ"] = broken_counts_ps.astype(int)
-            df_with["ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ_ΟΝΟΜΑ"] = broken_names_ps
-        except Exception:
-            pass
-    except Exception:
-        df_with = df_norm
-
-    missing = [c for c in REQUIRED_COLS if c not in df_norm.columns]
+    df_norm, ren_map = xl.normalized(sheet)
+    analysis = xl.analysis(sheet)
+
+    # ✅ Μετρητής ΣΥΓΚΡΟΥΣΗ & ονόματα (χωρίς ζεύγη A–B) + 🧩 σπασμένες αμοιβαίες ανά μαθητή
+    df_with = students_table(df_norm, analysis)
+
+    missing = missing_columns(df_norm)
     with st.expander("🔎 Διάγνωση/Μετονομασίες", expanded=False):
         st.write("Αναγνωρισμένες στήλες:", list(df_norm.columns))
         if ren_map:
             st.write("Αυτόματες μετονομασίες:", ren_map)
         if missing:
             st.error("❌ Λείπουν υποχρεωτικές στήλες: " + ", ".join(missing))
+        if use_fuzzy:
+            matches = name_matches(analysis)
+            if matches.empty:
+                st.write("Δεν χρειάστηκε ασαφής αντιστοίχιση ονομάτων.")
+            else:
+                st.write("Ασαφείς αντιστοιχίσεις ονομάτων (τα «αμφίσημα» **δεν** μετρήθηκαν):")
+                st.dataframe(matches, use_container_width=True, hide_index=True)
 
     if not missing:
         with st.expander("👁️ Πίνακας μαθητών (με ΣΥΓΚΡΟΥΣΗ & ονόματα)", expanded=False):
-            st.dataframe(df_with, use_container_width=True)
-            # Λήψη ως Excel
-            bio_conf = BytesIO()
-            with pd.ExcelWriter(bio_conf, engine="xlsxwriter") as writer:
-                df_with.to_excel(writer, index=False, sheet_name="Μαθητές_Σύγκρουση")
-            bio_conf.seek(0)
-            st.download_button(
+            render_paged_table(df_with, f"students_{sheet}")
+            # Λήψη στη μορφή του sidebar (χτίζεται μόνο όταν ζητηθεί)
+            # Η εξαγωγή κρατά και τις υπόλοιπες στήλες του σχολείου (η ανάλυση διάβασε μόνο όσες χρειάζεται)
+            lazy_download_button(
+                xl, ("students", sheet, export_fmt),
+                lambda: export_students(students_table(xl.normalized(sheet, all_columns=True)[0], analysis), export_fmt),
                 "⬇️ Κατέβασε πίνακα μαθητών (με ΣΥΓΚΡΟΥΣΗ & ονόματα)",
-                data=bio_conf.getvalue(),
-                file_name=f"students_conflicts_{sanitize_sheet_name(sheet)}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                file_name=f"students_conflicts_{sanitize_sheet_name(sheet)}{export_ext}",
+                mime=export_mime
             )
 
-        # 🧮 Στατιστικά ανά τμήμα
-        stats_df = generate_stats(df_norm)
-        # Διασφάλιση ύπαρξης στήλης "ΣΥΓΚΡΟΥΣΗ" στα στατιστικά
-        if "ΣΥΓΚΡΟΥΣΗ" not in stats_df.columns:
-            try:
-                conf_counts, _conf_names = compute_conflict_counts_and_names(df_norm)
-                if "ΤΜΗΜΑ" in df_norm:
-                    cls = df_norm["ΤΜΗΜΑ"].astype(str).str.strip()
-                    conflict_by_class = conf_counts.groupby(cls).sum().astype(int)
-                else:
-                    conflict_by_class = pd.Series(dtype=int)
-                stats_df["ΣΥΓΚΡΟΥΣΗ"] = [int(conflict_by_class.get(str(idx).strip(), 0)) for idx in stats_df.index]
-                cols = list(stats_df.columns)
-                if "ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ" in cols:
-                    cols.insert(cols.index("ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ"), cols.pop(cols.index("ΣΥΓΚΡΟΥΣΗ")))
-                    stats_df = stats_df[cols]
-            except Exception:
-                pass
+        # 🧮 Στατιστικά ανά τμήμα (περιλαμβάνει ήδη ΣΥΓΚΡΟΥΣΗ & ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ)
+        stats_df = analysis.stats()
 
         st.dataframe(stats_df, use_container_width=True)
-        st.download_button(
-            "💾 Λήψη Πίνακα Στατιστικών (Excel)",
-            data=export_stats_to_excel(stats_df).getvalue(),
-            file_name=f"statistika_{sanitize_sheet_name(sheet)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        lazy_download_button(
+            xl, ("stats", sheet, export_fmt),
+            lambda: export_stats(stats_df, export_fmt),
+            f"💾 Λήψη Πίνακα Στατιστικών ({export_fmt})",
+            file_name=f"statistika_{sanitize_sheet_name(sheet)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{export_ext}",
+            mime=export_mime,
             type="primary"
         )
+
+        with st.expander("👥 Ομάδες φίλων (τρίγωνα και μεγαλύτερες ομάδες αμοιβαίων φίλων)", expanded=False):
+            groups = analysis.friend_groups()
+            if groups.empty:
+                st.info("— Καμία ομάδα φίλων με 3+ μέλη —")
+            else:
+                st.caption("ΠΛΗΡΗΣ = όλοι αμοιβαίοι φίλοι με όλους · ΜΑΖΙ = τα περισσότερα μέλη στο ίδιο τμήμα")
+                if st.checkbox("Μόνο διασπασμένες ομάδες", value=True, key=f"groups_split_{sheet}"):
+                    groups = groups[groups["ΤΜΗΜΑΤΑ"] > 1]
+                render_paged_table(groups, f"groups_{sheet}", class_cols=(), name_cols=("ΟΝΟΜΑΤΑ",), student_filters=False)
+
+        with st.expander("🔁 Τι θα γίνει αν… (μετακίνηση/ανταλλαγή μαθητών)", expanded=False):
+            render_scenario_editor(xl, sheet, df_norm, analysis)
     else:
         st.info("Συμπλήρωσε/διόρθωσε τις στήλες που λείπουν στο Excel και ξαναφόρτωσέ το.")
 
 with tab_broken:
     st.subheader("🧩 Αναφορά Σπασμένων Πλήρως Αμοιβαίων Δυάδων (όλα τα sheets)")
-    summary_rows = []
-    for sheet in xl.sheet_names:
-        df_raw = xl.parse(sheet_name=sheet)
-        df_norm, _ = auto_rename_columns(df_raw)
-        broken_df = list_broken_mutual_pairs(df_norm)
-        summary_rows.append({"Σενάριο (sheet)": sheet, "Σπασμένες Δυάδες": int(len(broken_df))})
-    summary = pd.DataFrame(summary_rows).sort_values("Σενάριο (sheet)")
+    summary = broken_summary(xl, ready)
     st.dataframe(summary, use_container_width=True)
-
-    # Build full report: copy originals + *_BROKEN + Σύνοψη
-    def build_broken_report(xl_file: pd.ExcelFile) -> BytesIO:
-        bio = BytesIO()
-        rows = []
-        with pd.ExcelWriter(bio, engine="xlsxwriter") as writer:
-            for sheet in xl_file.sheet_names:
-                df_raw = xl_file.parse(sheet_name=sheet)
-                df_raw.to_excel(writer, index=False, sheet_name=sanitize_sheet_name(sheet))
-            for sheet in xl_file.sheet_names:
-                df_raw = xl_file.parse(sheet_name=sheet)
-                df_norm, _ = auto_rename_columns(df_raw)
-                broken_df = list_broken_mutual_pairs(df_norm)
-                rows.append({"Σενάριο (sheet)": sheet, "Σπασμένες Δυάδες": int(len(broken_df))})
-                out_name = sanitize_sheet_name(f"{sheet}_BROKEN")
-                if broken_df.empty:
-                    pd.DataFrame({"info": ["— καμία σπασμένη —"]}).to_excel(writer, index=False, sheet_name=out_name)
-                else:
-                    broken_df.to_excel(writer, index=False, sheet_name=out_name)
-            pd.DataFrame(rows).sort_values("Σενάριο (sheet)").to_excel(writer, index=False, sheet_name="Σύνοψη")
-        bio.seek(0)
-        return bio
-
-    st.download_button(
-        "⬇️ Κατέβασε αναφορά (Πλήρες αντίγραφο + σπασμένες + σύνοψη)",
-        data=build_broken_report(xl).getvalue(),
-        file_name=f"broken_friends_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    dups = xl.duplicates()
+    if dups:
+        st.caption("ℹ️ Πανομοιότυπα sheets (αναλύθηκαν μία φορά): " + ", ".join(f"{s} = {first}" for s, first in dups.items()))
+
+    # Full report: copy originals + *_BROKEN + Σύνοψη (stats_core.build_broken_report)
+    if all_ready:
+        lazy_download_button(
+            xl, ("broken",),
+            lambda: build_broken_report(xl).getvalue(),
+            "⬇️ Κατέβασε αναφορά (Πλήρες αντίγραφο + σπασμένες + σύνοψη)",
+            file_name=f"broken_friends_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+    else:
+        _wait_for_all()
 
     with st.expander("🔍 Προβολή αναλυτικών ζευγών & διάγνωση ανά sheet"):
-        for sheet in xl.sheet_names:
-            df_raw = xl.parse(sheet_name=sheet)
-            df_norm, _ = auto_rename_columns(df_raw)
-            broken_df = list_broken_mutual_pairs(df_norm)
-            # Διάγνωση αντιστοίχισης ονομάτων
-            # (προαιρετικά μπορεί να προστεθεί λεπτομερής διάγνωση όπως στο app3)
-            st.markdown(f"**{sheet}**")
+        if ready:
+            # ένα sheet τη φορά, φιλτραρισμένο και σε σελίδες (όχι όλα τα broken_df μαζί)
+            pairs_sheet = st.selectbox("Sheet", ready, key="pairs_sheet")
+            broken_df = xl.analysis(pairs_sheet).broken_pairs()
             if broken_df.empty:
                 st.info("— Καμία σπασμένη πλήρως αμοιβαία δυάδα —")
             else:
-                st.dataframe(broken_df, use_container_width=True)
+                render_paged_table(broken_df, f"pairs_{pairs_sheet}", class_cols=("A_ΤΜΗΜΑ", "B_ΤΜΗΜΑ"),
+                                   name_cols=("A", "B"), student_filters=False)
+                lazy_download_button(
+                    xl, ("broken_pairs", pairs_sheet, export_fmt),
+                    lambda: export_broken_pairs(broken_df, export_fmt),
+                    f"⬇️ Σπασμένες δυάδες: {pairs_sheet} ({export_fmt})",
+                    file_name=f"broken_pairs_{sanitize_sheet_name(pairs_sheet)}{export_ext}",
+                    mime=export_mime
+                )
+
+# ===========================
+# 🔀 Scenario comparison (all sheets)
+# ===========================
+
+with tab_compare:
+    st.subheader("🔀 Σύγκριση σεναρίων — ποιες αμοιβαίες δυάδες σπάνε σε ποιο σενάριο")
+    if not all_ready:
+        _wait_for_all()
+    else:
+        with st.spinner("Σύγκριση σεναρίων…"):
+            comparison = compare_workbook(xl)
+
+        st.markdown("**Διαφορές ανά ζεύγος σεναρίων** (πλήθος δυάδων που είναι σπασμένες στο ένα αλλά όχι στο άλλο)")
+        st.dataframe(comparison.difference(), use_container_width=True)
+
+        st.markdown("**Αμοιβαίες δυάδες × σενάρια** (✔ = σπασμένη στο σενάριο)")
+        pairs_df = comparison.pairs()
+        if not st.checkbox("Εμφάνιση και των δυάδων που δεν σπάνε σε κανένα σενάριο", value=False):
+            pairs_df = pairs_df[pairs_df["Σπασμένη σε (σενάρια)"] > 0]
+        st.dataframe(pairs_df, use_container_width=True, hide_index=True)
+
+        st.markdown("**Σταθερότητα ανά μαθητή** (σε πόσα σενάρια σπάει τουλάχιστον μία αμοιβαία φιλία του)")
+        st.dataframe(comparison.students().round(2), use_container_width=True, hide_index=True)
+
+        lazy_download_button(
+            xl, ("comparison",),
+            lambda: build_comparison_report(xl).getvalue(),
+            "⬇️ Κατέβασε σύγκριση σεναρίων (Excel)",
+            file_name=f"scenario_comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+# ===========================
+# 🧠 Optimizer (local search over ΤΜΗΜΑ)
+# ===========================
+
+with tab_optimize:
+    st.subheader("🧠 Αυτόματη αναζήτηση κατανομών από ένα σενάριο")
+    st.caption(
+        "Ξεκινά από το επιλεγμένο sheet και αλλάζει ΤΜΗΜΑ (μετακινήσεις/ανταλλαγές μαθητών) ώστε να μειωθούν "
+        "οι σπασμένες αμοιβαίες φιλίες και οι συγκρούσεις στην ίδια τάξη, με τις στήλες των στατιστικών "
+        "ισορροπημένες εντός των ανοχών (μέγιστη διαφορά μεταξύ τμημάτων)."
+    )
+    opt_sheet = st.selectbox("Αρχικό sheet", options=xl.sheet_names, index=0, key="opt_sheet")
+    c1, c2 = st.columns(2)
+    n_best = c1.number_input("Πλήθος λύσεων (νέα sheets)", min_value=1, max_value=10, value=3, step=1)
+    time_limit = c2.slider("Χρόνος αναζήτησης (s)", min_value=2, max_value=60, value=10)
+    with st.expander("⚖️ Ανοχές ισορροπίας (max − min ανά τμήμα)", expanded=False):
+        cols = st.columns(len(DEFAULT_TOLERANCES))
+        tolerances = {
+            col: int(box.number_input(col, min_value=0, max_value=50, value=tol, step=1, key=f"opt_tol_{col}"))
+            for box, (col, tol) in zip(cols, DEFAULT_TOLERANCES.items())
+        }
+
+    opt_key = (xl.digest, opt_sheet, int(n_best), int(time_limit), tuple(sorted(tolerances.items())),
+               fuzzy_threshold if use_fuzzy else None)
+    if st.button("▶️ Εκτέλεση βελτιστοποίησης", type="primary"):
+        try:
+            with st.spinner(f"Αναζήτηση για {time_limit} s…"):
+                baseline, results = optimize_sheet(xl, opt_sheet, n_best=int(n_best), time_limit=float(time_limit),
+                                                   tolerances=tolerances, fuzzy=fuzzy_threshold if use_fuzzy else None)
+            _store_session_result("optimizer", opt_key, {
+                "baseline": baseline, "results": results,
+                "data": build_scenarios_workbook(xl, opt_sheet, [r.classes for r in results]).getvalue()
+                        if results else None,
+            })
+        except ValueError as e:
+            st.error(f"❌ {e}")
+
+    opt = _session_result("optimizer", opt_key)
+    if opt:
+        rows = [{"Σενάριο": f"{opt_sheet} (αρχικό)", **opt["baseline"].summary()}]
+        rows += [{"Σενάριο": f"{opt_sheet}_OPT{k}", **r.summary()} for k, r in enumerate(opt["results"], start=1)]
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        if not opt["results"]:
+            st.info("ℹ️ Δεν βρέθηκε κατανομή καλύτερη από το αρχικό sheet (δοκίμασε περισσότερο χρόνο ή "
+                    "μεγαλύτερες ανοχές). Δεν δημιουργήθηκαν νέα sheets.")
+        else:
+            st.download_button(
+                "⬇️ Κατέβασε Excel με τα νέα σενάρια (όλα τα sheets + *_OPT)",
+                data=opt["data"],
+                file_name=f"optimized_{sanitize_sheet_name(opt_sheet)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
 
 # ===========================
 # 📦 Mass report (all sheets): broken friendships + conflicts (per-student only)
@@ -635,72 +578,35 @@ with tab_broken:
 with tab_mass:
     st.subheader("📦 Μαζικές αναφορές — Σπασμένες φιλίες & Συγκρούσεις (χωρίς ζεύγη σύγκρουσης)")
 
-    def build_mass_broken_and_conflicts_report(xl_file: pd.ExcelFile) -> BytesIO:
-        bio = BytesIO()
-        summary_rows = []
-        with pd.ExcelWriter(bio, engine="xlsxwriter") as writer:
-            for idx, sheet in enumerate(xl_file.sheet_names, start=1):
-                df_raw = xl_file.parse(sheet_name=sheet)
-                df_norm, _ = auto_rename_columns(df_raw)
-
-                broken_pairs = list_broken_mutual_pairs(df_norm)
-                conf_counts, conf_names = compute_conflict_counts_and_names(df_norm)
-
-                broken_counts_ps, broken_names_ps = compute_broken_friend_names_per_student(df_norm)
-                df_ps_broken = pd.DataFrame({
-                    "ΟΝΟΜΑ": df_norm.get("ΟΝΟΜΑ", pd.Series(dtype=str)),
-                    "ΤΜΗΜΑ": df_norm.get("ΤΜΗΜΑ", pd.Series(dtype=str)),
-                    "ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ": broken_counts_ps.astype(int),
-                    "ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ_ΟΝΟΜΑ": broken_names_ps,
-                })
-                df_ps_conf = pd.DataFrame({
-                    "ΟΝΟΜΑ": df_norm.get("ΟΝΟΜΑ", pd.Series(dtype=str)),
-                    "ΤΜΗΜΑ": df_norm.get("ΤΜΗΜΑ", pd.Series(dtype=str)),
-                    "ΣΥΓΚΡΟΥΣΗ": conf_counts.astype(int),
-                    "ΣΥΓΚΡΟΥΣΗ_ΟΝΟΜΑ": conf_names,
-                })
-
-                bp_name  = f"S{idx}_BP"   # broken pairs
-                bps_name = f"S{idx}_BPS"  # broken per student
-                cps_name = f"S{idx}_CPS"  # conflicts per student
-
-                (broken_pairs if not broken_pairs.empty else pd.DataFrame({"info":["— καμία —"]})).to_excel(writer, index=False, sheet_name=bp_name)
-                df_ps_broken.to_excel(writer, index=False, sheet_name=bps_name)
-                df_ps_conf.to_excel(writer, index=False, sheet_name=cps_name)
-
-                summary_rows.append({
-                    "Index": idx,
-                    "Original sheet name": sheet,
-                    "S-code": f"S{idx}",
-                    "Broken Pairs (rows)": int(len(broken_pairs)),
-                    "Students with ≥1 Broken Friendship": int((broken_counts_ps.fillna(0) > 0).sum()),
-                    "Students with ≥1 Conflict in Same Class": int((conf_counts.fillna(0) > 0).sum()),
-                })
-
-            pd.DataFrame(summary_rows).to_excel(writer, index=False, sheet_name="SUMMARY")
-        bio.seek(0)
-        return bio
-
     # Ζωντανή σύνοψη
     summary_rows = []
-    for sheet in xl.sheet_names:
-        df_raw = xl.parse(sheet_name=sheet)
-        df_norm, _ = auto_rename_columns(df_raw)
-        bp = list_broken_mutual_pairs(df_norm)
-        bc_ps, _ = compute_broken_friend_names_per_student(df_norm)
-        conf_counts, _ = compute_conflict_counts_and_names(df_norm)
+    for sheet in ready:
+        analysis = xl.analysis(sheet)
+        bp = analysis.broken_pairs()
+        bc_ps, _ = analysis.broken_per_student()
+        conf_counts, _ = analysis.conflicts_per_student()
+        groups = analysis.friend_groups()
         summary_rows.append({
             "Σενάριο (sheet)": sheet,
             "Σπασμένες Δυάδες (pairs)": int(len(bp)),
             "Μαθητές με Σπασμένη Φιλία (>=1)": int((bc_ps.fillna(0) > 0).sum()),
             "Μαθητές με Σύγκρουση στην ίδια τάξη (>=1)": int((conf_counts.fillna(0) > 0).sum()),
+            "Ομάδες φίλων (3+)": int(len(groups)),
+            "Διασπασμένες ομάδες": int((groups["ΤΜΗΜΑΤΑ"] > 1).sum()),
         })
-    st.dataframe(pd.DataFrame(summary_rows).sort_values("Σενάριο (sheet)"), use_container_width=True)
-
-    st.download_button(
-        "⬇️ Κατέβασε ΜΑΖΙΚΗ αναφορά (όλα τα sheets)",
-        data=build_mass_broken_and_conflicts_report(xl).getvalue(),
-        file_name=f"mass_broken_conflicts_names_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        type="primary"
-    )
+    if summary_rows:
+        st.dataframe(pd.DataFrame(summary_rows).sort_values("Σενάριο (sheet)"), use_container_width=True)
+
+    if all_ready:
+        lazy_download_button(
+            xl, ("mass",),
+            lambda: build_mass_broken_and_conflicts_report(xl).getvalue(),
+            "⬇️ Κατέβασε ΜΑΖΙΚΗ αναφορά (όλα τα sheets)",
+            file_name=f"mass_broken_conflicts_names_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            type="primary"
+        )
+    else:
+        _wait_for_all()
+
+render_diagnostics(xl)
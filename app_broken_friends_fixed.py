@@ -1,29 +1,30 @@
-
+import uuid
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import re
 from io import BytesIO
 
-from friends_utils import detect_broken_mutuals, auto_rename_columns
+from stats_core import open_workbook, sanitize_sheet_name, filter_table, page_of, PAGE_SIZES
+from workbook_utils import Workbook, content_hash, UPLOAD_TYPES, XLSX_ENGINE_KWARGS
+from instrumentation import memory_tracing, set_memory_tracing
+from result_cache import RESULTS
 
 # ---------------------------
 # 🔄 Restart helpers
 # ---------------------------
+def _session_id() -> str:
+    """Σταθερό id της συνεδρίας (κλειδί απομόνωσης στη μνήμη αποτελεσμάτων)."""
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return st.session_state["session_id"]
+
 def _restart_app():
-    """Clear caches & widget states (including file_uploader) and rerun."""
+    """Clear this session's results & widget states (including file_uploader) and rerun."""
     st.session_state["uploader_key"] = st.session_state.get("uploader_key", 0) + 1
     for k in list(st.session_state.keys()):
         if str(k).startswith("uploader_"):
             del st.session_state[k]
-    try:
-        st.cache_data.clear()
-    except Exception:
-        pass
-    try:
-        st.cache_resource.clear()
-    except Exception:
-        pass
+    RESULTS.clear_session(_session_id())
     st.rerun()
 
 st.set_page_config(page_title="🔎 Έλεγχος Σπασμένων Αμοιβαίων Δυάδων", page_icon="🧩", layout="wide")
@@ -45,19 +46,38 @@ with st.sidebar:
     if st.button("🔄 Επανεκκίνηση εφαρμογής", help="Καθαρίζει μνήμη/φορτώσεις και ξεκινά από την αρχή"):
         _restart_app()
 
-def sanitize_sheet_name(s: str) -> str:
-    s = str(s or "")
-    s = re.sub(r'[:\\/?*\\[\\]]', ' ', s)
-    return s[:31] if s else "SHEET"
-
-def build_report(xl: pd.ExcelFile) -> BytesIO:
+def render_diagnostics(wb: Workbook):
+    """Χρόνοι/μνήμη ανά στάδιο (από το Workbook.diagnostics) σε expander στο sidebar."""
+    with st.sidebar.expander("🩺 Διαγνωστικά απόδοσης", expanded=False):
+        mem = st.checkbox(
+            "Μέτρηση μνήμης (tracemalloc)", value=memory_tracing(), key="diag_tracemalloc",
+            help="Επιβαρύνει ελαφρά όλη την εφαρμογή όσο είναι ενεργό· μετρά τα στάδια που τρέχουν μετά την ενεργοποίηση.",
+        )
+        if mem != memory_tracing():
+            set_memory_tracing(mem)
+        diag = wb.diagnostics()
+        if diag.empty:
+            st.caption("Δεν έχει καταγραφεί κανένα στάδιο ακόμη.")
+            return
+        per_stage = diag.groupby("Στάδιο", sort=False).agg(
+            {"Κλήσεις": "sum", "Χρόνος (s)": "sum", "Peak μνήμη (MB)": "max"}
+        ).sort_values("Χρόνος (s)", ascending=False)
+        st.dataframe(per_stage.round(4), use_container_width=True)
+        st.caption("Ανά sheet:")
+        st.dataframe(diag.round(4), use_container_width=True, hide_index=True)
+
+def _load_workbook(data: bytes, name: str) -> Workbook:
+    """Ένα Workbook ανά (συνεδρία, περιεχόμενο αρχείου) στη μνήμη αποτελεσμάτων (όριο μνήμης, LRU/TTL, μόνο RAM)."""
+    sid, key = _session_id(), ("workbook", content_hash(data), name)
+    wb = RESULTS.get(sid, key, lambda: open_workbook(data, name=name))
+    RESULTS.refresh(sid, key)
+    return wb
+
+def build_report(xl: Workbook) -> BytesIO:
     bio = BytesIO()
-    with pd.ExcelWriter(bio, engine="xlsxwriter") as writer:
-        for sheet in xl.sheet_names:
-            df_raw = xl.parse(sheet_name=sheet)
-            df, mapping = auto_rename_columns(df_raw)
-
-            broken_df = detect_broken_mutuals(df, name_col="name", friends_col="friends", class_col="class")
+    with pd.ExcelWriter(bio, engine="xlsxwriter", engine_kwargs=XLSX_ENGINE_KWARGS) as writer:
+        for sheet, analysis in zip(xl.sheet_names, xl.analyze_all()):
+            broken_df = analysis.broken_pairs()
             out_name = sanitize_sheet_name(f"{sheet}_BROKEN")
 
             if broken_df.empty:
@@ -67,11 +87,12 @@ def build_report(xl: pd.ExcelFile) -> BytesIO:
     bio.seek(0)
     return bio
 
-up = st.file_uploader("📤 Μεταφόρτωση Excel", type=["xlsx", "xls"], key=f"uploader_{st.session_state['uploader_key']}")
+up = st.file_uploader("📤 Μεταφόρτωση Excel (ή CSV/Parquet/Arrow/zip)", type=UPLOAD_TYPES, key=f"uploader_{st.session_state['uploader_key']}")
 
 if up:
     try:
-        xl = pd.ExcelFile(up)
+        data = up.getvalue()
+        xl = _load_workbook(data, up.name)
         cols1, cols2 = st.columns([1, 2], gap="large")
 
         with cols1:
@@ -81,32 +102,39 @@ if up:
         with cols2:
             st.subheader("🔍 Σύνοψη")
             summary_rows = []
-            for sheet in xl.sheet_names:
-                df_raw = xl.parse(sheet_name=sheet)
-                df, _ = auto_rename_columns(df_raw)
-                broken_df = detect_broken_mutuals(df)
-                summary_rows.append({"Σενάριο": sheet, "Σπασμένες Δυάδες": int(len(broken_df))})
+            for sheet, analysis in zip(xl.sheet_names, xl.analyze_all()):
+                summary_rows.append({"Σενάριο": sheet, "Σπασμένες Δυάδες": int(len(analysis.broken_pairs()))})
             summary = pd.DataFrame(summary_rows).sort_values("Σενάριο")
             st.dataframe(summary, use_container_width=True)
 
-        # Download
-        st.download_button(
-            "⬇️ Κατέβασε αναφορά (Excel)",
-            data=build_report(xl),
-            file_name=f"broken_friends_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-
-        # Optional: preview first non-empty
-        for sheet in xl.sheet_names:
-            df_raw = xl.parse(sheet_name=sheet)
-            df, _ = auto_rename_columns(df_raw)
-            broken_df = detect_broken_mutuals(df)
-            with st.expander(f"Προβολή: {sheet}"):
-                if broken_df.empty:
-                    st.info("— Καμία σπασμένη πλήρως αμοιβαία δυάδα —")
-                else:
-                    st.dataframe(broken_df, use_container_width=True)
+        # Download (η αναφορά χτίζεται μόνο όταν ζητηθεί, μία φορά ανά αρχείο)
+        if xl.has_report(("broken",)) or st.button("⚙️ Προετοιμασία αναφοράς (Excel)"):
+            st.download_button(
+                "⬇️ Κατέβασε αναφορά (Excel)",
+                data=xl.report(("broken",), lambda: build_report(xl).getvalue()),
+                file_name=f"broken_friends_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+        # Προβολή ενός sheet τη φορά, με αναζήτηση και σελίδες (στον browser πάει μόνο η σελίδα)
+        with st.expander("Προβολή ζευγών ανά σενάριο"):
+            sheet = st.selectbox("Σενάριο", xl.sheet_names, key="preview_sheet")
+            broken_df = xl.analysis(sheet).broken_pairs()
+            if broken_df.empty:
+                st.info("— Καμία σπασμένη πλήρως αμοιβαία δυάδα —")
+            else:
+                c1, c2, c3 = st.columns([2, 1, 1])
+                search = c1.text_input("Αναζήτηση ονόματος", key=f"preview_search_{sheet}")
+                view = filter_table(broken_df, name_cols=("A", "B"), search=search)
+                size = c2.selectbox("Γραμμές ανά σελίδα", PAGE_SIZES, index=1, key="preview_size")
+                pages = page_of(view, 1, size)[1]
+                if st.session_state.get(f"preview_page_{sheet}", 1) > pages:
+                    st.session_state[f"preview_page_{sheet}"] = pages
+                page = c3.number_input("Σελίδα", min_value=1, max_value=pages, step=1, key=f"preview_page_{sheet}")
+                st.dataframe(page_of(view, page, size)[0], use_container_width=True)
+                st.caption(f"{len(view)} από {len(broken_df)} ζεύγη")
+
+        render_diagnostics(xl)
 
     except Exception as e:
         st.error(f"Σφάλμα ανάγνωσης: {e}")
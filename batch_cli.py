@@ -0,0 +1,181 @@
+# Μαζική (headless) εκτέλεση της ανάλυσης του app.py χωρίς Streamlit.
+#
+#   python batch_cli.py σχολεία/ -o αποτελέσματα/ --format xlsx csv json --workers 4
+#
+# Είσοδος: Excel, ή CSV/Parquet/Arrow (ένα σενάριο ανά αρχείο) και zip με τέτοια αρχεία.
+# Για κάθε workbook γράφεται ένας φάκελος OUT/<αρχείο>/ με τις ίδιες αναφορές xlsx με την
+# εφαρμογή και/ή CSV/Parquet/Arrow/JSON, και στο OUT/ ένα batch_summary.csv με όλα τα sheets όλων των αρχείων.
+import argparse
+import json
+import os
+import re
+import sys
+import pandas as pd
+
+from workbook_utils import DEFAULT_ENGINE, TABLE_SUFFIXES, parallel_map
+from friends_utils import FUZZY_THRESHOLD
+from stats_core import (
+    open_workbook, missing_columns, students_table, mass_summary,
+    export_stats_to_excel, export_students_to_excel,
+    build_broken_report, build_mass_broken_and_conflicts_report, name_matches, export_table,
+)
+
+INPUT_SUFFIXES = (".xlsx", ".xls", ".zip") + tuple(TABLE_SUFFIXES)
+FORMATS = ("xlsx", "csv", "parquet", "arrow", "json")
+COLUMNAR = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def find_workbooks(inputs, recursive: bool = False) -> list:
+    """Αρχεία Excel/CSV/Parquet/Arrow/zip από αρχεία/φακέλους (ταξινομημένα, χωρίς τα ~$ lock files του Excel)."""
+    found = []
+    for path in inputs:
+        if os.path.isdir(path):
+            if recursive:
+                walk = ((d, f) for d, _, files in os.walk(path) for f in files)
+            else:
+                walk = ((path, f) for f in os.listdir(path))
+            found.extend(os.path.join(d, f) for d, f in walk
+                         if f.lower().endswith(INPUT_SUFFIXES) and not f.startswith("~$"))
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            raise FileNotFoundError(path)
+    return sorted(dict.fromkeys(found))
+
+def _file_stem(s: str) -> str:
+    return re.sub(r"[^\w\-]+", "_", str(s)).strip("_") or "SHEET"
+
+def _write_bytes(path: str, data: bytes):
+    with open(path, "wb") as fh:
+        fh.write(data)
+
+def _records(df: pd.DataFrame) -> list:
+    # μέσω to_json ώστε NaN -> null και numpy τύποι -> JSON
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+def process_workbook(job: tuple) -> dict:
+    """
+    Ένα workbook -> αναφορές στο `out_dir`. Top-level για να τρέχει σε process pool.
+    job = (path, out_dir, formats, engine, sheet_workers, fuzzy)
+    """
+    path, out_dir, formats, engine, sheet_workers, fuzzy = job
+    try:
+        with open(path, "rb") as fh:
+            xl = open_workbook(fh.read(), fuzzy=fuzzy, engine=engine, name=os.path.basename(path))
+        analyses = xl.analyze_all(workers=sheet_workers)
+        os.makedirs(out_dir, exist_ok=True)
+
+        sheets_json = []
+        for sheet, analysis in zip(xl.sheet_names, analyses):
+            df_norm, _ = xl.normalized(sheet)
+            missing = missing_columns(df_norm)
+            stem = _file_stem(sheet)
+            broken_df = analysis.broken_pairs()
+            stats_df = None if missing else analysis.stats()
+            df_with = None if missing else students_table(xl.normalized(sheet, all_columns=True)[0], analysis)
+            matches = name_matches(analysis) if fuzzy else None
+            groups = analysis.friend_groups()
+
+            if "xlsx" in formats and not missing:
+                _write_bytes(os.path.join(out_dir, f"statistika_{stem}.xlsx"), export_stats_to_excel(stats_df).getvalue())
+                _write_bytes(os.path.join(out_dir, f"students_conflicts_{stem}.xlsx"), export_students_to_excel(df_with).getvalue())
+            if "csv" in formats:
+                # utf-8-sig: το Excel ανοίγει σωστά τα ελληνικά
+                broken_df.to_csv(os.path.join(out_dir, f"broken_pairs_{stem}.csv"), index=False, encoding="utf-8-sig")
+                groups.to_csv(os.path.join(out_dir, f"friend_groups_{stem}.csv"), index=False, encoding="utf-8-sig")
+                if matches is not None:
+                    matches.to_csv(os.path.join(out_dir, f"name_matches_{stem}.csv"), index=False, encoding="utf-8-sig")
+                if not missing:
+                    stats_df.to_csv(os.path.join(out_dir, f"stats_{stem}.csv"), index_label="ΤΜΗΜΑ", encoding="utf-8-sig")
+                    df_with.to_csv(os.path.join(out_dir, f"students_{stem}.csv"), index=False, encoding="utf-8-sig")
+            for fmt, ext in COLUMNAR.items():
+                if fmt not in formats:
+                    continue
+                _write_bytes(os.path.join(out_dir, f"broken_pairs_{stem}{ext}"), export_table(broken_df, fmt))
+                _write_bytes(os.path.join(out_dir, f"friend_groups_{stem}{ext}"), export_table(groups, fmt))
+                if matches is not None:
+                    _write_bytes(os.path.join(out_dir, f"name_matches_{stem}{ext}"), export_table(matches, fmt))
+                if not missing:
+                    _write_bytes(os.path.join(out_dir, f"stats_{stem}{ext}"),
+                                 export_table(stats_df.rename_axis("ΤΜΗΜΑ").reset_index(), fmt))
+                    _write_bytes(os.path.join(out_dir, f"students_{stem}{ext}"), export_table(df_with, fmt))
+            if "json" in formats:
+                sheets_json.append({
+                    "sheet": sheet,
+                    "missing_columns": missing,
+                    "stats": None if missing else _records(stats_df.rename_axis("ΤΜΗΜΑ").reset_index()),
+                    "broken_pairs": _records(broken_df),
+                    "friend_groups": _records(groups),
+                    "students": None if missing else _records(df_with),
+                    "name_matches": None if matches is None else _records(matches),
+                })
+
+        summary = mass_summary(xl)
+        summary["Missing columns"] = [", ".join(missing_columns(xl.normalized(s)[0])) for s in xl.sheet_names]
+        if "xlsx" in formats:
+            _write_bytes(os.path.join(out_dir, "broken_friends_report.xlsx"), build_broken_report(xl).getvalue())
+            _write_bytes(os.path.join(out_dir, "mass_broken_conflicts_names.xlsx"), build_mass_broken_and_conflicts_report(xl).getvalue())
+        if "csv" in formats:
+            summary.to_csv(os.path.join(out_dir, "summary.csv"), index=False, encoding="utf-8-sig")
+        for fmt, ext in COLUMNAR.items():
+            if fmt in formats:
+                _write_bytes(os.path.join(out_dir, f"summary{ext}"), export_table(summary, fmt))
+        if "json" in formats:
+            with open(os.path.join(out_dir, "report.json"), "w", encoding="utf-8") as fh:
+                json.dump({"file": path, "sheets": sheets_json, "summary": _records(summary)}, fh, ensure_ascii=False, indent=1)
+        return {"file": path, "out_dir": out_dir, "summary": summary, "error": None}
+    except Exception as e:
+        return {"file": path, "out_dir": out_dir, "summary": None, "error": f"{type(e).__name__}: {e}"}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Στατιστικά, σπασμένες αμοιβαίες δυάδες και συγκρούσεις για πολλά Excel χωρίς Streamlit.")
+    parser.add_argument("inputs", nargs="+", help="αρχεία .xlsx/.xls/.csv/.parquet/.arrow/.zip ή φάκελοι")
+    parser.add_argument("-o", "--out", required=True, help="φάκελος εξόδου")
+    parser.add_argument("-f", "--format", nargs="+", choices=FORMATS, default=["xlsx"], help="μορφές εξόδου (προεπιλογή: xlsx)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="παράλληλες διεργασίες (προεπιλογή: όλοι οι πυρήνες)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="αναζήτηση και σε υποφακέλους")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, help="reader για Excel: auto, calamine, openpyxl, xlrd")
+    parser.add_argument("--fuzzy", type=float, nargs="?", const=FUZZY_THRESHOLD, default=None, metavar="ΚΑΤΩΦΛΙ",
+                        help=f"ανοχή σε ορθογραφικά λάθη ονομάτων (ελάχιστη ομοιότητα, προεπιλογή {FUZZY_THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    try:
+        paths = find_workbooks(args.inputs, args.recursive)
+    except FileNotFoundError as e:
+        parser.error(f"δεν βρέθηκε: {e}")
+    if not paths:
+        parser.error("δεν βρέθηκαν αρχεία εισόδου")
+
+    # Ένας φάκελος ανά workbook (αριθμός αν δύο αρχεία έχουν το ίδιο όνομα)
+    jobs, used = [], set()
+    formats = tuple(dict.fromkeys(args.format))
+    # Πολλά αρχεία: παράλληλα ανά αρχείο (σειριακά τα sheets)· ένα αρχείο: παράλληλα ανά sheet
+    sheet_workers = 1 if len(paths) > 1 else args.workers
+    for path in paths:
+        stem = base = _file_stem(os.path.splitext(os.path.basename(path))[0])
+        n = 1
+        while stem in used:
+            n += 1
+            stem = f"{base}_{n}"
+        used.add(stem)
+        jobs.append((path, os.path.join(args.out, stem), formats, args.engine, sheet_workers, args.fuzzy))
+
+    results = parallel_map(process_workbook, jobs, workers=args.workers, min_items=2)
+
+    summaries = []
+    for res in results:
+        if res["error"]:
+            print(f"✗ {res['file']}: {res['error']}", file=sys.stderr)
+            continue
+        summary = res["summary"]
+        print(f"✓ {res['file']} -> {res['out_dir']} ({len(summary)} sheets, {int(summary['Broken Pairs (rows)'].sum())} σπασμένες δυάδες)")
+        summaries.append(summary.assign(File=res["file"]))
+    if summaries:
+        os.makedirs(args.out, exist_ok=True)
+        batch = pd.concat(summaries, ignore_index=True)
+        batch = batch[["File"] + [c for c in batch.columns if c != "File"]]
+        batch.to_csv(os.path.join(args.out, "batch_summary.csv"), index=False, encoding="utf-8-sig")
+    failed = sum(1 for res in results if res["error"])
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
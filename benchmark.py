@@ -0,0 +1,139 @@
+# Benchmarks της ανάλυσης σε συνθετικά workbooks (synth_workbook.py) διαφόρων μεγεθών.
+#
+#   python benchmark.py --students 100 300 1000 --sheets 10 --repeat 3
+#   python benchmark.py --students 1000 --compare benchmark_results/20250101_120000.json
+#
+# Κάθε στάδιο χρονομετρείται `repeat` φορές (κρατιέται το ελάχιστο) και τα αποτελέσματα
+# αποθηκεύονται σε JSON στο benchmark_results/ ώστε να συγκρίνονται μεταξύ εκδόσεων.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+import pandas as pd
+
+import friends_utils
+from synth_workbook import synth_workbook
+from stats_core import (
+    open_workbook, auto_rename_columns, list_broken_mutual_pairs, compute_broken_friend_names_per_student,
+    compute_conflict_counts_and_names, generate_stats, export_stats_to_excel,
+    build_broken_report, build_mass_broken_and_conflicts_report,
+)
+
+RESULTS_DIR = "benchmark_results"
+
+def _clear_caches():
+    """Cold run: χωρίς τα module-level caches της προηγούμενης επανάληψης."""
+    friends_utils._CELL_CACHE.clear()
+    friends_utils._RENAME_CACHE.clear()
+    friends_utils._canon_name_str.cache_clear()
+
+def _time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        _clear_caches()
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def bench_size(n_students: int, n_sheets: int, repeat: int, workers, seed: int = 0, messy_headers: bool = True,
+               **synth_kwargs) -> list:
+    """[{stage, students, sheets, seconds}, ...] για ένα μέγεθος workbook."""
+    data = synth_workbook(n_students, n_sheets, messy_headers=messy_headers, seed=seed, **synth_kwargs)
+    wb = open_workbook(data)
+    raw = wb.raw(wb.sheet_names[0])
+    df, _ = auto_rename_columns(raw)
+
+    def full_workbook(fresh):
+        # κάθε «ολόκληρο workbook» στάδιο ξεκινά από νέο Workbook (χωρίς memoized αποτελέσματα)
+        return lambda: fresh(open_workbook(data))
+
+    stages = {
+        # ανά sheet (το πρώτο σενάριο)
+        "auto_rename_columns": lambda: auto_rename_columns(raw),
+        "list_broken_mutual_pairs": lambda: list_broken_mutual_pairs(df),
+        "compute_broken_friend_names_per_student": lambda: compute_broken_friend_names_per_student(df),
+        "compute_conflict_counts_and_names": lambda: compute_conflict_counts_and_names(df),
+        "generate_stats": lambda: generate_stats(df),
+        "export_stats_to_excel": lambda: export_stats_to_excel(generate_stats(df)),
+        # ολόκληρο το workbook
+        "workbook_open": lambda: open_workbook(data),
+        "workbook_normalize_all": full_workbook(lambda wb: [wb.normalized(s) for s in wb.sheet_names]),
+        "workbook_analyze_all": full_workbook(lambda wb: wb.analyze_all(workers=workers)),
+        "build_broken_report": full_workbook(build_broken_report),
+        "build_mass_broken_and_conflicts_report": full_workbook(build_mass_broken_and_conflicts_report),
+    }
+    rows = []
+    for stage, func in stages.items():
+        rows.append({"stage": stage, "students": n_students, "sheets": n_sheets, "seconds": _time(func, repeat)})
+    return rows
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+def compare(current: pd.DataFrame, previous_path: str) -> pd.DataFrame:
+    """Πίνακας previous/current/speedup ανά (stage, students, sheets)."""
+    with open(previous_path, encoding="utf-8") as fh:
+        previous = pd.DataFrame(json.load(fh)["results"])
+    keys = ["stage", "students", "sheets"]
+    merged = previous.merge(current, on=keys, suffixes=("_previous", "_current"))
+    merged["speedup"] = merged["seconds_previous"] / merged["seconds_current"]
+    return merged
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Χρονομέτρηση των σταδίων ανάλυσης σε συνθετικά workbooks.")
+    parser.add_argument("--students", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--sheets", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="για το workbook_analyze_all (προεπιλογή: όλοι οι πυρήνες)")
+    parser.add_argument("--friends", type=float, default=2.0)
+    parser.add_argument("--conflicts", type=float, default=0.5)
+    parser.add_argument("--collisions", type=float, default=0.1)
+    parser.add_argument("--separators", default="mixed", help='"mixed" ή ένα διαχωριστικό, π.χ. ", "')
+    headers = parser.add_mutually_exclusive_group()
+    headers.add_argument("--messy-headers", dest="messy_headers", action="store_true", default=True,
+                         help="επικεφαλίδες με κενά/πεζά/συνώνυμα, όπως στα πραγματικά αρχεία (προεπιλογή)")
+    headers.add_argument("--clean-headers", dest="messy_headers", action="store_false",
+                         help="οι κανονικές επικεφαλίδες (χωρίς το κόστος της αναγνώρισης στηλών)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help=f"αρχείο JSON (προεπιλογή: {RESULTS_DIR}/<ημερομηνία>.json)")
+    parser.add_argument("--compare", default=None, help="προηγούμενο JSON για σύγκριση")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for n in args.students:
+        rows += bench_size(n, args.sheets, args.repeat, args.workers, args.seed, messy_headers=args.messy_headers,
+                           friends=args.friends, conflicts=args.conflicts, collisions=args.collisions,
+                           separators=args.separators)
+    results = pd.DataFrame(rows)
+    table = results.pivot(index="stage", columns="students", values="seconds").reindex(results["stage"].unique())
+    print(table.round(4).to_string())
+
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    meta = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+    }
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump({"meta": meta, "results": rows}, fh, ensure_ascii=False, indent=1)
+    print(f"\nΑποθηκεύτηκε: {out}")
+
+    if args.compare:
+        merged = compare(results, args.compare)
+        print("\n" + merged.round(4).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
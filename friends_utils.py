@@ -1,5 +1,7 @@
 
 import re, ast, unicodedata
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 
 # ---------- Name & column normalization ----------
@@ -7,108 +9,453 @@ def strip_diacritics(s: str) -> str:
     nfkd = unicodedata.normalize("NFD", s)
     return "".join(ch for ch in nfkd if not unicodedata.combining(ch))
 
-def canon_name(s: str) -> str:
-    s = (str(s) if s is not None else "").strip()
+@lru_cache(maxsize=65536)
+def _canon_name_str(s: str) -> str:
+    s = s.strip()
     s = s.strip("[]'\" ")
     s = re.sub(r"\s+", " ", s)
     s = strip_diacritics(s).upper()
     return s
 
+def canon_name(s: str) -> str:
+    # Τα ίδια ονόματα επαναλαμβάνονται σε κάθε sheet/κελί: bounded cache στο str
+    return _canon_name_str(str(s) if s is not None else "")
+
+# ---------- Fuzzy name matching ----------
+FUZZY_THRESHOLD = 0.85     # ελάχιστη ομοιότητα (1 - απόσταση Levenshtein / μήκος) για ασαφή αντιστοίχιση
+FUZZY_MARGIN = 0.05        # δεύτερος υποψήφιος τόσο κοντά στον πρώτο -> αμφίσημο (καμία αντιστοίχιση)
+FUZZY_MAX_CANDIDATES = 8   # πόσοι υποψήφιοι (κατά κοινά τρίγραμμα) ελέγχονται με απόσταση επεξεργασίας
+
+def _trigrams(s: str) -> set:
+    s = f" {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+def edit_distance(a: str, b: str, limit: int = None) -> int:
+    """Απόσταση Levenshtein· με `limit` σταματά νωρίς και επιστρέφει limit + 1 όταν την ξεπερνά."""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if limit is not None and min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+def similarity(a: str, b: str, threshold: float = 0.0) -> float:
+    """1 - Levenshtein / max μήκος (0 όταν είναι σίγουρα κάτω από το `threshold`)."""
+    longest = max(len(a), len(b))
+    if not longest:
+        return 1.0
+    limit = int((1.0 - threshold) * longest)
+    d = edit_distance(a, b, limit)
+    return 0.0 if d > limit else 1.0 - d / longest
+
+class FuzzyIndex:
+    """
+    Ανεστραμμένο ευρετήριο τριγράμμων πάνω σε ένα σύνολο strings.
+    Μια αναζήτηση διαβάζει μόνο τις λίστες των τριγράμμων του ερωτήματος (όχι όλα τα strings)
+    και υπολογίζει απόσταση επεξεργασίας μόνο για τους λίγους υποψηφίους με τα περισσότερα κοινά.
+    """
+
+    def __init__(self, strings):
+        self.strings = sorted(set(strings))
+        self.grams = [len(_trigrams(s)) for s in self.strings]
+        self.postings = {}
+        for i, s in enumerate(self.strings):
+            for g in _trigrams(s):
+                self.postings.setdefault(g, []).append(i)
+
+    def candidates(self, query: str, threshold: float = FUZZY_THRESHOLD) -> list:
+        """[(string, ομοιότητα), ...] με ομοιότητα ≥ threshold, φθίνουσα σειρά."""
+        q = _trigrams(query)
+        shared = {}
+        for g in q:
+            for i in self.postings.get(g, ()):
+                shared[i] = shared.get(i, 0) + 1
+        # Φίλτρο πλήθους: κάθε διόρθωση χαλά το πολύ 3 τρίγραμμα (+ όσα αλλάζουν με την αναδιάταξη λέξεων)
+        slack = 2 * query.count(" ")
+        keep = [i for i, c in shared.items()
+                if c >= max(len(q), self.grams[i]) - 3 * (1.0 - threshold) * max(len(query), len(self.strings[i])) - slack]
+        keep.sort(key=lambda i: -shared[i])
+        out = []
+        query_sorted = _sorted_tokens(query)
+        for i in keep[:FUZZY_MAX_CANDIDATES]:
+            s = self.strings[i]
+            score = similarity(query, s, threshold)
+            if score < threshold and " " in s:
+                score = similarity(query_sorted, _sorted_tokens(s), threshold)   # αντεστραμμένη σειρά λέξεων
+            if score >= threshold:
+                out.append((s, score))
+        out.sort(key=lambda x: (-x[1], x[0]))
+        return out
+
+def _sorted_tokens(s: str) -> str:
+    return " ".join(sorted(s.split()))
+
+class NameIndex:
+    """
+    Ευρετήριο επίλυσης ονομάτων για ένα roster (κανονικοποιημένα ονόματα).
+    resolve(name) -> πλήρες κανονικό όνομα μαθητή ή None:
+      - ακριβές πλήρες όνομα
+      - ≥2 tokens: μοναδικός μαθητής στην τομή (ή στην ένωση) των tokens
+      - 1 token: μοναδικός μαθητής με αυτό το token
+      - (με `fuzzy` = κατώφλι ομοιότητας) ορθογραφικά λάθη/παραλλαγές: ο μοναδικός καλύτερος
+        υποψήφιος από FuzzyIndex πάνω στα ονόματα (ή στα tokens για όνομα μίας λέξης)
+    Τα αποτελέσματα κρατούνται ανά index (ίδιο δηλωμένο όνομα -> μία επίλυση).
+    Οι ασαφείς και οι αμφίσημες αντιστοιχίσεις καταγράφονται (βλ. fuzzy_report).
+    """
+
+    def __init__(self, canon_names, fuzzy: float = None):
+        self.names = set(canon_names)
+        self.token_sets = {}
+        for full in self.names:
+            for t in full.split():
+                self.token_sets.setdefault(t, set()).add(full)
+        self._memo = {}
+        self.fuzzy = fuzzy
+        self._fuzzy_names = None
+        self._fuzzy_tokens = None
+        self.fuzzy_matches = {}    # δηλωμένο -> (μαθητής, ομοιότητα)
+        self.ambiguous = {}        # δηλωμένο -> [υποψήφιοι μαθητές]
+
+    def __contains__(self, name) -> bool:
+        return name in self.names
+
+    def resolve(self, name: str):
+        """`name` πρέπει να είναι ήδη κανονικοποιημένο (canon_name)."""
+        try:
+            return self._memo[name]
+        except KeyError:
+            pass
+        r = self._resolve(name)
+        if r is None and self.fuzzy and name.strip():
+            r = self._resolve_fuzzy(name)
+        self._memo[name] = r
+        return r
+
+    def _resolve(self, s: str):
+        if not s:
+            return None
+        if s in self.names:
+            return s
+        toks = s.split()
+        if not toks:
+            return None
+        if len(toks) >= 2:
+            sets = [self.token_sets.get(t, set()) for t in toks]
+            inter = set.intersection(*sets)
+            if len(inter) == 1:
+                return next(iter(inter))
+            union = set().union(*sets)
+            if len(union) == 1:
+                return next(iter(union))
+            return None
+        group = self.token_sets.get(toks[0], set())
+        return next(iter(group)) if len(group) == 1 else None
+
+    def _resolve_fuzzy(self, s: str):
+        toks = s.split()
+        if all(t in self.token_sets for t in toks):
+            # Όλα τα tokens υπάρχουν: δεν είναι λάθος γραφής αλλά πραγματική αμφισημία
+            cands = set.intersection(*(self.token_sets[t] for t in toks)) or set().union(*(self.token_sets[t] for t in toks))
+            self.ambiguous[s] = sorted(cands)
+            return None
+        if self._fuzzy_names is None:
+            self._fuzzy_names = FuzzyIndex(self.names)
+        scored = dict(self._fuzzy_names.candidates(s, self.fuzzy))
+        if len(toks) == 1:
+            # Μία λέξη: μικρό όνομα/επώνυμο με λάθος (ή πλήρες όνομα χωρίς το κενό)
+            if self._fuzzy_tokens is None:
+                self._fuzzy_tokens = FuzzyIndex(self.token_sets)
+            for tok, score in self._fuzzy_tokens.candidates(s, self.fuzzy):
+                for full in self.token_sets[tok]:
+                    scored[full] = max(score, scored.get(full, 0.0))
+        ranked = sorted(scored.items(), key=lambda x: (-x[1], x[0]))
+        if not ranked:
+            return None
+        best, score = ranked[0]
+        close = [name for name, sc in ranked if sc >= score - FUZZY_MARGIN]
+        if len(close) > 1:
+            self.ambiguous[s] = close
+            return None
+        self.fuzzy_matches[s] = (best, score)
+        return best
+
+    def fuzzy_report(self, display: dict = None) -> pd.DataFrame:
+        """Ασαφείς (αποδεκτές) και αμφίσημες (απορριφθείσες) αντιστοιχίσεις, για έλεγχο από τον χρήστη."""
+        show = (lambda n: display.get(n, n)) if display else (lambda n: n)
+        rows = [{"Δηλωμένο όνομα": s, "Αντιστοίχιση": show(t), "Ομοιότητα": round(sc, 3), "Κατάσταση": "ασαφής"}
+                for s, (t, sc) in sorted(self.fuzzy_matches.items())]
+        rows += [{"Δηλωμένο όνομα": s, "Αντιστοίχιση": ", ".join(show(c) for c in cands), "Ομοιότητα": None,
+                  "Κατάσταση": "αμφίσημο"}
+                 for s, cands in sorted(self.ambiguous.items())]
+        return pd.DataFrame(rows, columns=["Δηλωμένο όνομα", "Αντιστοίχιση", "Ομοιότητα", "Κατάσταση"])
+
 def canon_col(s: str) -> str:
     return "".join((s or "").replace("_"," ").split()).upper()
 
 CANON_TARGETS = {
     "ΟΝΟΜΑ": {"ΟΝΟΜΑ"},
+    "ΦΥΛΟ": {"ΦΥΛΟ"},
+    "ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ": {"ΠΑΙΔΙΕΚΠΑΙΔΕΥΤΙΚΟΥ", "ΠΑΙΔΙ-ΕΚΠΑΙΔΕΥΤΙΚΟΥ"},
+    "ΖΩΗΡΟΣ": {"ΖΩΗΡΟΣ"},
+    "ΙΔΙΑΙΤΕΡΟΤΗΤΑ": {"ΙΔΙΑΙΤΕΡΟΤΗΤΑ"},
+    "ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ": {"ΚΑΛΗΓΝΩΣΗΕΛΛΗΝΙΚΩΝ", "ΓΝΩΣΗΕΛΛΗΝΙΚΩΝ"},
+    "ΦΙΛΟΙ": {"ΦΙΛΟΙ", "ΦΙΛΙΑ", "ΦΙΛΟΣ"},
+    "ΣΥΓΚΡΟΥΣΗ": {"ΣΥΓΚΡΟΥΣΗ", "ΣΥΓΚΡΟΥΣΕΙΣ"},
     "ΤΜΗΜΑ": {"ΤΜΗΜΑ"},
-    "ΦΙΛΟΙ": {"ΦΙΛΟΙ", "ΦΙΛΙΑ"},
 }
+REQUIRED_COLS = ["ΟΝΟΜΑ","ΦΥΛΟ","ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ","ΖΩΗΡΟΣ","ΙΔΙΑΙΤΕΡΟΤΗΤΑ","ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ","ΦΙΛΟΙ","ΣΥΓΚΡΟΥΣΗ","ΤΜΗΜΑ"]
+
+_CANON_LOOKUP = {key: target for target, keys in CANON_TARGETS.items() for key in keys}
+PROFILE_ROWS = 500         # γραμμές δείγματος ανά στήλη για την ανίχνευση ρόλων (ΤΜΗΜΑ fallback)
+_RENAME_CACHE = {}         # επικεφαλίδα (tuple στηλών) -> (mapping, στήλες για ΦΙΛΟΙ, χρειάζεται ΤΜΗΜΑ fallback)
+_RENAME_CACHE_MAX = 1024
+_EMPTY_MARKS = ("-", "NA", "NAN")
+
+def _looks_like_class(col: pd.Series, sample: bool = False) -> bool:
+    """
+    Σύντομες τιμές (διάμεσο μήκος ≤ 4) με λίγες διαφορετικές (≤ 10): πιθανή στήλη ΤΜΗΜΑ.
+    Δουλεύει πάνω στις μοναδικές τιμές (factorize) + πλήθη, όχι σε κάθε κελί ως string.
+    sample=True (δείγμα γραμμών): μόνο το πλήθος διαφορετικών τιμών, που στο δείγμα δεν ξεπερνά ποτέ
+    αυτό όλης της στήλης· το διάμεσο μήκος κρίνεται μόνο σε όλη τη στήλη.
+    """
+    codes, uniques = pd.factorize(col)
+    if not len(uniques):
+        return sample
+    stripped = [str(u).strip() for u in np.asarray(uniques, dtype=object)]
+    if len(set(stripped)) > 10:
+        return False
+    if sample:
+        return True
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return float(np.median(np.repeat([len(s) for s in stripped], counts))) <= 4
+
+def _guess_class_column(df: pd.DataFrame):
+    """
+    Η τελευταία στήλη που μοιάζει με ΤΜΗΜΑ (όποιος κι αν είναι ο ρόλος της στην επικεφαλίδα, όπως στο baseline):
+    το δείγμα απορρίπτει γρήγορα τις στήλες με πολλές τιμές, η απόφαση παίρνεται σε όλη τη στήλη.
+    """
+    head = df.iloc[:PROFILE_ROWS]
+    for pos in range(df.shape[1] - 1, -1, -1):
+        if _looks_like_class(head.iloc[:, pos], sample=True) and _looks_like_class(df.iloc[:, pos]):
+            return df.columns[pos]
+    return None
+
+def _column_plan(columns) -> tuple:
+    """Ρόλοι στηλών από την επικεφαλίδα: (mapping, στήλες που ενώνονται σε ΦΙΛΟΙ ή None, χρειάζεται ΤΜΗΜΑ fallback)."""
+    mapping, seen = {}, set()
+    canon = [canon_col(str(col)) for col in columns]
+    for col, c in zip(columns, canon):
+        target = _CANON_LOOKUP.get(c)
+        if target is not None and target not in seen:
+            mapping[col] = target
+            seen.add(target)
+    names = {mapping.get(col, col) for col in columns}
+    friends = None
+    if not names & {"ΦΙΛΟΙ", "ΦΙΛΙΑ", "ΦΙΛΟΣ"}:
+        friends = [col for col, c in zip(columns, canon) if "ΦΙΛ" in c or "FRIEND" in c] or None
+    return mapping, friends, "ΤΜΗΜΑ" not in names
+
+def _join_columns(df: pd.DataFrame, cols: list) -> list:
+    """Ένωση πολλών στηλών ανά γραμμή με ", " (χωρίς κενά / - / NA), διανυσματικά ανά στήλη."""
+    out = None
+    for col in cols:
+        v = df[col].astype(str).fillna("").str.strip()
+        v = v.where(v.ne("") & ~v.str.upper().isin(_EMPTY_MARKS), "").to_numpy(dtype=object)
+        if out is None:
+            out = v
+        else:
+            both = (out != "") & (v != "")
+            out = np.where(both, out + ", " + v, np.where(out != "", out, v))
+    return out.tolist()
 
 def auto_rename_columns(df: pd.DataFrame):
-    mapping = {}
-    seen = set()
-    for col in df.columns:
-        c = canon_col(col)
-        found_target = None
-        for target, keys in CANON_TARGETS.items():
-            if c in keys and target not in seen:
-                found_target = target
-                seen.add(target)
-                break
-        if found_target:
-            mapping[col] = found_target
-    return df.rename(columns=mapping), mapping
-
-# ---------- Friends parsing ----------
-def parse_friends(cell):
-    raw = str(cell) if cell is not None else ""
-    raw = raw.strip()
-    if not raw:
+    """
+    Map κοινές ελληνικές στήλες σε κανονική μορφή. Αν δεν βρεθούν, δημιουργούνται/συνενώνονται όπου χρειάζεται.
+    Οι ρόλοι που προκύπτουν από την επικεφαλίδα υπολογίζονται μία φορά ανά υπογραφή επικεφαλίδας·
+    μόνο το ΤΜΗΜΑ fallback εξαρτάται από τα δεδομένα και εξετάζει δείγμα γραμμών κάθε sheet.
+    """
+    key = tuple(df.columns)
+    plan = _RENAME_CACHE.get(key)
+    if plan is None:
+        plan = _column_plan(key)
+        if len(_RENAME_CACHE) >= _RENAME_CACHE_MAX:
+            _RENAME_CACHE.clear()
+        _RENAME_CACHE[key] = plan
+    mapping, friends, needs_class = plan
+    # ΤΜΗΜΑ fallback: η στήλη μετονομάζεται μαζί με τις υπόλοιπες (ένα rename). Όπως στο baseline, το όνομα
+    # class_col εφαρμόζεται **μετά** το mapping: γίνεται ΤΜΗΜΑ η στήλη που μετά το mapping λέγεται class_col
+    # (π.χ. μια στήλη «ΦΥΛΟ» χωρίς στήλη τμήματος), ενώ μια στήλη που μετονομάστηκε αλλιώς μένει ως έχει.
+    class_col = _guess_class_column(df) if needs_class else None
+    if class_col is not None:
+        rename = {col: mapping.get(col, col) for col in df.columns}
+        renamed = df.rename(columns={col: "ΤΜΗΜΑ" if name == class_col else name for col, name in rename.items()})
+    else:
+        renamed = df.rename(columns=mapping)
+
+    # ΦΙΛΟΙ fallback: συνένωση όλων των στηλών «ΦΙΛ…»/«FRIEND…»
+    if friends:
+        renamed["ΦΙΛΟΙ"] = _join_columns(df, friends)
+
+    # ΣΥΓΚΡΟΥΣΗ fallback
+    if "ΣΥΓΚΡΟΥΣΗ" not in renamed.columns:
+        if "ΣΥΓΚΡΟΥΣΕΙΣ" in renamed.columns:
+            renamed = renamed.rename(columns={"ΣΥΓΚΡΟΥΣΕΙΣ": "ΣΥΓΚΡΟΥΣΗ"})
+        else:
+            renamed["ΣΥΓΚΡΟΥΣΗ"] = ""
+    return renamed, dict(mapping)
+
+def select_columns(header):
+    """
+    Θέσεις των στηλών που χρειάζεται το auto_rename_columns (για column-selective ανάγνωση):
+    όσες αντιστοιχούν σε CANON_TARGETS + υποψήφιες για το ΦΙΛΟΙ fallback.
+    None (= όλες) όταν λείπει το ΤΜΗΜΑ, αφού το fallback του σαρώνει κάθε στήλη.
+    """
+    canon = [canon_col(str(c)) for c in header]
+    if not any(c in CANON_TARGETS["ΤΜΗΜΑ"] for c in canon):
+        return None
+    keys = set().union(*CANON_TARGETS.values())
+    return [i for i, c in enumerate(canon) if c in keys or "ΦΙΛ" in c or "FRIEND" in c]
+
+def missing_columns(df_norm: pd.DataFrame) -> list:
+    return [c for c in REQUIRED_COLS if c not in df_norm.columns]
+
+# ---------- Column parsing (ΦΙΛΟΙ / ΣΥΓΚΡΟΥΣΗ) ----------
+_SPLIT_RE = re.compile(r"\s*(?:,|;|/|\||\band\b|\bκαι\b|\+|\n)\s*", flags=re.IGNORECASE)
+_CELL_CACHE = {}           # raw κελί -> tuple κανονικών ονομάτων (κοινό για όλα τα sheets)
+_CELL_CACHE_MAX = 200_000
+
+def _split_bracketed(raw: str) -> list:
+    """Κελί τύπου "['A','B']": literal_eval, αλλιώς split σε ;/, μέσα στις αγκύλες."""
+    try:
+        val = ast.literal_eval(raw)
+        if isinstance(val, (list, tuple)):
+            return [x for x in val if str(x).strip()]
+    except Exception:
+        pass
+    return re.split(r"[;,]", raw.strip("[]"))
+
+def _parse_cells(raws: pd.Series) -> pd.Series:
+    """Μοναδικά raw κελιά (RangeIndex) -> tuple κανονικών ονομάτων ανά κελί."""
+    s = raws.str.strip()
+    is_list = s.str.startswith("[") & s.str.endswith("]")
+    parts = s[~is_list].str.split(_SPLIT_RE)
+    if is_list.any():
+        parts = pd.concat([parts, s[is_list].map(_split_bracketed)]).sort_index()
+    flat = parts.explode()
+    flat = flat[flat.notna()].map(canon_name)
+    flat = flat[flat != ""]
+    # Το explode κρατά τη σειρά: κόβουμε τον πίνακα ονομάτων στα όρια κάθε κελιού
+    owner = flat.index.to_numpy()
+    bounds = np.searchsorted(owner, np.arange(len(raws) + 1))
+    values = flat.to_numpy(dtype=object)
+    return pd.Series([tuple(values[bounds[i]:bounds[i + 1]]) for i in range(len(raws))], index=raws.index, dtype=object)
+
+def parse_name_column(col: pd.Series) -> pd.DataFrame:
+    """
+    Ολόκληρη στήλη ΦΙΛΟΙ/ΣΥΓΚΡΟΥΣΗ -> long format (student_idx, name):
+    μία γραμμή ανά δηλωμένο όνομα, student_idx = θέση (0..n-1) του μαθητή στο sheet.
+    Διαχωριστικά: , ; / | + και/and, αλλαγή γραμμής, ή λίστα σε αγκύλες. Κενά/NaN κελιά -> κανένα όνομα.
+    Κάθε διαφορετικό κελί γίνεται parse μία φορά (και ξαναχρησιμοποιείται στα επόμενα sheets).
+    """
+    codes, uniques = pd.factorize(col)
+    raws = [str(u) for u in uniques]
+    if len(_CELL_CACHE) + len(raws) > _CELL_CACHE_MAX:
+        _CELL_CACHE.clear()
+    todo = pd.Series(list(dict.fromkeys(r for r in raws if r not in _CELL_CACHE)), dtype=object)
+    if len(todo):
+        _CELL_CACHE.update(zip(todo, _parse_cells(todo)))
+    per_unique = np.empty(len(raws), dtype=object)
+    per_unique[:] = [_CELL_CACHE[r] for r in raws]
+    rows = np.flatnonzero(codes >= 0)
+    long = pd.Series(per_unique[codes[rows]], index=rows, dtype=object).explode().dropna()
+    return pd.DataFrame({"student_idx": long.index.to_numpy(dtype=np.int64), "name": long.to_numpy(dtype=object)})
+
+def parse_friends(cell) -> list:
+    """Ένα κελί ΦΙΛΟΙ/ΣΥΓΚΡΟΥΣΗ -> λίστα κανονικών ονομάτων (ίδιοι κανόνες και cache με το parse_name_column)."""
+    if cell is None or (not isinstance(cell, (list, tuple)) and pd.isna(cell)):
         return []
-    # Try python-like list: ['A','B']
-    if raw.startswith("[") and raw.endswith("]"):
-        try:
-            val = ast.literal_eval(raw)
-            if isinstance(val, (list, tuple)):
-                return [canon_name(x) for x in val if str(x).strip()]
-        except Exception:
-            pass
-        raw2 = raw.strip("[]")
-        parts = re.split(r"[;,]", raw2)
-        return [canon_name(p) for p in parts if canon_name(p)]
-    # Fallback split
-    parts = re.split(r"[;,]", raw)
-    return [canon_name(p) for p in parts if canon_name(p)]
-
-# ---------- Core detection ----------
-def detect_broken_mutuals(df: pd.DataFrame):
-    """
-    Return:
-      - broken_by_class: pd.Series index=class, value=count_of_broken_pairs_counted_for_this_class
-      - broken_pairs_df: DataFrame rows for each broken mutual pair with A/B names & classes
-      - mutual_pairs_count: int total mutual pairs (regardless of broken or not)
-      - broken_unique_pairs_count: int broken mutual pairs (each pair counted once)
-    Notes:
-      * Mutual means A lists B and B lists A (after normalization).
-      * A broken pair is a mutual pair with different, non-empty classes.
-      * broken_by_class counts each broken pair once for each involved class.
-    """
-    # Ensure required columns exist (after renaming if needed)
-    df, _ = auto_rename_columns(df)
-    if not {"ΟΝΟΜΑ","ΤΜΗΜΑ","ΦΙΛΟΙ"}.issubset(df.columns):
-        empty = pd.Series(dtype=int)
-        return empty, pd.DataFrame(), 0, 0
-
-    # Build maps (canonical -> original/class/friends)
-    df = df.copy()
-    df["__CAN_NAME__"] = df["ΟΝΟΜΑ"].map(canon_name)
-    name_to_original = dict(zip(df["__CAN_NAME__"], df["ΟΝΟΜΑ"].astype(str)))
-    class_by_name = dict(zip(df["__CAN_NAME__"], df["ΤΜΗΜΑ"].astype(str).str.strip()))
-    friends_by_name = dict(zip(df["__CAN_NAME__"], df["ΦΙΛΙΟΙ"].map(parse_friends) if "ΦΙΛΙΟΙ" in df.columns else df["ΦΙΛΟΙ"].map(parse_friends)))
-
-    # Build set of mutual pairs
-    mutual_pairs = set()
-    for a, flist in friends_by_name.items():
-        for b in flist:
-            if b in friends_by_name and a in friends_by_name[b]:
-                mutual_pairs.add(tuple(sorted([a,b])))
-
-    # Count broken
-    broken_rows = []
-    broken_by_class = {tmima: 0 for tmima in df["ΤΜΗΜΑ"].dropna().astype(str).str.strip().unique()}
-    broken_unique = 0
-    for a, b in sorted(mutual_pairs):
-        ta = class_by_name.get(a, "")
-        tb = class_by_name.get(b, "")
-        if ta and tb and ta != tb:
-            broken_unique += 1
-            broken_by_class[ta] = broken_by_class.get(ta, 0) + 1
-            broken_by_class[tb] = broken_by_class.get(tb, 0) + 1
-            broken_rows.append({
-                "A": name_to_original.get(a, a), "A_ΤΜΗΜΑ": ta,
-                "B": name_to_original.get(b, b), "B_ΤΜΗΜΑ": tb,
-            })
-
-    broken_by_class = pd.Series(broken_by_class).fillna(0).astype(int)
-    broken_pairs_df = pd.DataFrame(broken_rows)
-
-    return broken_by_class, broken_pairs_df, len(mutual_pairs), broken_unique
+    raw = str(cell)
+    if raw not in _CELL_CACHE:
+        _CELL_CACHE[raw] = _parse_cells(pd.Series([raw], dtype=object)).iat[0]
+    return list(_CELL_CACHE[raw])
+
+# ---------- Sparse pair backend ----------
+SPARSE_MIN_STUDENTS = 300  # backend="auto": κάτω από αυτό αρκεί ο απλός βρόχος
+
+def use_sparse(backend: str, n_students: int) -> bool:
+    if backend not in ("auto", "python", "sparse"):
+        raise ValueError(f"Unknown backend: {backend!r}")
+    return backend == "sparse" or (backend == "auto" and n_students >= SPARSE_MIN_STUDENTS)
+
+def mutual_pairs_sparse(src, dst, n: int):
+    """
+    Δηλώσεις src -> dst (ids 0..n-1) ως αραιός boolean πίνακας A σε μορφή συντεταγμένων
+    (κλειδί src*n + dst). Επιστρέφει (a, b) με a < b για τα μη μηδενικά του A & A.T,
+    ταξινομημένα κατά (a, b).
+    """
+    keys = np.unique(np.asarray(src, dtype=np.int64) * n + np.asarray(dst, dtype=np.int64))
+    a, b = np.divmod(keys, n)
+    mask = (a < b) & np.isin(b * n + a, keys, assume_unique=True)
+    return a[mask], b[mask]
+
+def union_find_components(n: int, a, b) -> np.ndarray:
+    """
+    Συνεκτικές συνιστώσες του γράφου με κόμβους 0..n-1 και ακμές (a, b): για κάθε κόμβο η ρίζα της
+    συνιστώσας του. Union-find με ένωση κατά μέγεθος και συμπίεση διαδρομής, O((n + m)·α(n)) —
+    χωρίς τετραγωνικό κόστος σε πυκνές λίστες φίλων.
+    """
+    parent = list(range(n))
+    size = [1] * n
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]    # halving
+            x = parent[x]
+        return x
+
+    for x, y in zip(np.asarray(a).tolist(), np.asarray(b).tolist()):
+        rx, ry = find(x), find(y)
+        if rx == ry:
+            continue
+        if size[rx] < size[ry]:
+            rx, ry = ry, rx
+        parent[ry] = rx
+        size[rx] += size[ry]
+    return np.fromiter((find(x) for x in range(n)), dtype=np.int64, count=n)
+
+def triangles_per_node(n: int, a, b) -> np.ndarray:
+    """
+    Τρίγωνα (τριάδες όπου όλοι είναι αμοιβαία φίλοι) του γράφου με ακμές (a, b), το καθένα μετρημένο
+    μία φορά στον «χαμηλότερο» κόμβο του κατά (βαθμό, id). Forward algorithm: κάθε ακμή προσανατολίζεται
+    προς τον «υψηλότερο» κόμβο, άρα κάθε λίστα έχει O(√m) κόμβους και το σύνολο είναι O(m·√m).
+    """
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    deg = np.bincount(a, minlength=n) + np.bincount(b, minlength=n)
+    forward = (deg[a] < deg[b]) | ((deg[a] == deg[b]) & (a < b))
+    lo, hi = np.where(forward, a, b), np.where(forward, b, a)
+    out = [set() for _ in range(n)]
+    for u, v in zip(lo.tolist(), hi.tolist()):
+        out[u].add(v)
+    tri = np.zeros(n, dtype=np.int64)
+    for u, v in zip(lo.tolist(), hi.tolist()):
+        tri[u] += len(out[u] & out[v])
+    return tri
+
+def broken_pair_mask(class_values, a, b):
+    """
+    Για αμοιβαίες δυάδες (a, b): True όπου είναι σε διαφορετικά, μη κενά τμήματα.
+    Σύγκριση με ακέραιους κωδικούς τμήματος (NaN δεν ισούται με τίποτα, όπως στο ta != tb).
+    """
+    values = pd.Series(class_values, dtype=object)
+    codes, _ = pd.factorize(values)
+    valid = (values != "").to_numpy()
+    ca, cb = codes[a], codes[b]
+    return valid[a] & valid[b] & ((ca != cb) | (ca < 0))
@@ -0,0 +1,105 @@
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+
+# ---------- Per-stage timing / memory ----------
+class StageTimer:
+    """
+    Χρόνος (wall), πλήθος κλήσεων και (προαιρετικά) peak μνήμης ανά (στάδιο, sheet).
+      - ο χρόνος μετριέται πάντα (δύο perf_counter ανά στάδιο: αρκετά φθηνό για production)
+      - η μνήμη μόνο όσο τρέχει το tracemalloc (βλ. set_memory_tracing), αφού επιβαρύνει κάθε allocation
+    Τα εμφωλευμένα στάδια μετρούν και μέσα στο εξωτερικό (inclusive). Picklable (π.χ. από worker process).
+    """
+
+    def __init__(self):
+        self._records = {}   # (stage, sheet) -> [calls, seconds, peak_bytes | None]
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        with self._lock:
+            return {"_records": {k: list(v) for k, v in self._records.items()}}
+
+    def __setstate__(self, state):
+        self._records = state["_records"]
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, sheet=None):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            _memory_enter()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            peak = _memory_exit() if tracing else None
+            self.add(name, sheet, seconds, peak)
+
+    def add(self, name: str, sheet, seconds: float, peak=None, calls: int = 1):
+        with self._lock:
+            rec = self._records.setdefault((name, sheet), [0, 0.0, None])
+            rec[0] += calls
+            rec[1] += seconds
+            if peak is not None:
+                rec[2] = peak if rec[2] is None else max(rec[2], peak)
+
+    def merge(self, other: "StageTimer", sheet=None):
+        """Προσθέτει τις μετρήσεις ενός άλλου timer (με `sheet` όπου εκείνος δεν έχει)."""
+        for (name, sh), (calls, seconds, peak) in other.__getstate__()["_records"].items():
+            self.add(name, sh if sh is not None else sheet, seconds, peak, calls)
+
+    def records(self) -> list:
+        with self._lock:
+            return [
+                {"Στάδιο": name, "Sheet": sheet, "Κλήσεις": calls, "Χρόνος (s)": seconds,
+                 "Peak μνήμη (MB)": None if peak is None else peak / 2**20}
+                for (name, sheet), (calls, seconds, peak) in self._records.items()
+            ]
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records(), columns=["Στάδιο", "Sheet", "Κλήσεις", "Χρόνος (s)", "Peak μνήμη (MB)"])
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+
+# tracemalloc έχει ένα μόνο peak ανά διεργασία: για εμφωλευμένα στάδια κρατάμε (ανά thread)
+# στοίβα με την τρέχουσα μνήμη στην είσοδο και το μέγιστο που «χάθηκε» σε κάθε reset_peak.
+_MEM = threading.local()
+
+def _memory_enter():
+    stack = _MEM.__dict__.setdefault("stack", [])
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    stack.append([current, 0])
+
+def _memory_exit() -> int:
+    stack = _MEM.__dict__.get("stack")
+    if not stack:
+        return None
+    start, seen = stack.pop()
+    if not tracemalloc.is_tracing():   # απενεργοποιήθηκε στο μεταξύ
+        return None
+    _current, peak = tracemalloc.get_traced_memory()
+    peak = max(peak, seen)
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    return max(0, peak - start)
+
+def set_memory_tracing(enabled: bool):
+    """
+    Ενεργοποιεί/απενεργοποιεί το tracemalloc για όλη τη διεργασία (επηρεάζει όλες τις συνεδρίες·
+    με ταυτόχρονες συνεδρίες οι τιμές peak είναι ενδεικτικές).
+    """
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def memory_tracing() -> bool:
+    return tracemalloc.is_tracing()
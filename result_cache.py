@@ -0,0 +1,180 @@
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from io import BytesIO
+import numpy as np
+import pandas as pd
+
+# Όρια της κοινής μνήμης αποτελεσμάτων (ανά διεργασία server, για όλες τις συνεδρίες)
+DEFAULT_BUDGET_MB = float(os.environ.get("RESULT_CACHE_MB", "512"))
+DEFAULT_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL", "1800"))   # αδράνεια πριν τη λήξη
+
+# ---------- Size estimate ----------
+_SKIP_TYPES = (type, type(sys), type(len), type(lambda: None), threading.Thread)
+
+# Τα κοινόχρηστα DataFrames είναι read-only, άρα το (ακριβό) deep memory_usage μετριέται μία φορά
+_FRAME_SIZES = {}        # id -> (weakref, bytes)· η εγγραφή φεύγει μαζί με το αντικείμενο
+
+def _frame_size(obj) -> int:
+    cached = _FRAME_SIZES.get(id(obj))
+    if cached is not None and cached[0]() is obj:
+        return cached[1]
+    usage = obj.memory_usage(deep=True)
+    size = int(usage.sum() if hasattr(usage, "sum") else usage)
+    key = id(obj)
+    _FRAME_SIZES[key] = (weakref.ref(obj, lambda _, key=key: _FRAME_SIZES.pop(key, None)), size)
+    return size
+
+def estimate_size(obj, seen: set = None) -> int:
+    """
+    Εκτίμηση bytes στη μνήμη για ένα αποτέλεσμα: DataFrames/Series (deep), numpy, bytes/BytesIO,
+    containers και τα πεδία (__dict__) αντικειμένων όπως ScenarioAnalysis. Κοινόχρηστα αντικείμενα
+    (π.χ. ίδιο df ή RosterGraph σε πολλές αναλύσεις) μετρούν μία φορά ανά `seen`.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, _SKIP_TYPES):
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        return _frame_size(obj)
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return obj.nbytes + sum(estimate_size(x, seen) for x in obj.ravel())
+        return obj.nbytes
+    if isinstance(obj, BytesIO):
+        return sys.getsizeof(obj) + obj.getbuffer().nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in list(obj.items()))
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(x, seen) for x in list(obj))
+    if hasattr(obj, "__dict__"):
+        return size + estimate_size(vars(obj), seen)
+    return size
+
+# ---------- Session-isolated, memory-budgeted cache ----------
+class _Entry:
+    __slots__ = ("value", "size", "created", "touched")
+
+    def __init__(self, value, size: int):
+        self.value = value
+        self.size = size
+        self.created = self.touched = time.monotonic()
+
+class ResultCache:
+    """
+    Μνήμη αποτελεσμάτων (π.χ. Workbook με parsed sheets, αναλύσεις, αναφορές) κοινή για τη διεργασία,
+    με απομόνωση ανά συνεδρία: το κλειδί είναι πάντα (session, key) και καμία συνεδρία δεν βλέπει
+    ή καθαρίζει τα αποτελέσματα άλλης.
+      - συνολικό όριο μνήμης `budget_bytes`: όταν ξεπερνιέται, φεύγουν οι λιγότερο πρόσφατα
+        χρησιμοποιημένες εγγραφές (LRU, από οποιαδήποτε συνεδρία)
+      - `ttl_seconds`: εγγραφές χωρίς πρόσβαση για τόσο χρόνο λήγουν (π.χ. κλειστές καρτέλες)
+      - μέγεθος ανά εγγραφή: `value.memory_estimate()` αν υπάρχει, αλλιώς estimate_size·
+        ξαναμετριέται με `refresh` (τα Workbook μεγαλώνουν όσο υπολογίζονται αποτελέσματα)
+      - μόνο στη μνήμη: τίποτα δεν γράφεται σε δίσκο· στην αφαίρεση καλείται `value.close()` αν υπάρχει
+    """
+
+    def __init__(self, budget_bytes: int = int(DEFAULT_BUDGET_MB * 2**20), ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.budget = budget_bytes
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()      # (session, key) -> _Entry, από τη λιγότερο πρόσφατη
+        self._total = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _measure(value) -> int:
+        measure = getattr(value, "memory_estimate", None)
+        return int(measure()) if callable(measure) else estimate_size(value)
+
+    def get(self, session: str, key, build=None):
+        """Η τιμή του (session, key)· αν λείπει και δοθεί `build`, χτίζεται (εκτός lock) και αποθηκεύεται."""
+        with self._lock:
+            self._expire()
+            entry = self._entries.get((session, key))
+            if entry is not None:
+                self._entries.move_to_end((session, key))
+                entry.touched = time.monotonic()
+                return entry.value
+        if build is None:
+            return None
+        value = build()
+        self.put(session, key, value)
+        return value
+
+    def put(self, session: str, key, value):
+        size = self._measure(value)
+        with self._lock:
+            old = self._entries.pop((session, key), None)
+            if old is not None:
+                self._total -= old.size
+                if old.value is not value:
+                    self._close(old.value)
+            self._entries[(session, key)] = _Entry(value, size)
+            self._total += size
+            self._evict(keep=(session, key))
+
+    def refresh(self, session: str, key):
+        """Ξαναμετρά το μέγεθος μιας εγγραφής (που μεγάλωσε) και αφαιρεί LRU εγγραφές πάνω από το όριο."""
+        with self._lock:
+            entry = self._entries.get((session, key))
+        if entry is None:
+            return
+        size = self._measure(entry.value)          # εκτός lock: μπορεί να διαρκέσει
+        with self._lock:
+            if self._entries.get((session, key)) is entry:
+                self._total += size - entry.size
+                entry.size = size
+                self._evict(keep=(session, key))
+
+    def clear_session(self, session: str):
+        """Αφαιρεί όλες τις εγγραφές **μόνο** αυτής της συνεδρίας."""
+        with self._lock:
+            for k in [k for k in self._entries if k[0] == session]:
+                self._remove(k)
+
+    def _remove(self, k):
+        entry = self._entries.pop(k)
+        self._total -= entry.size
+        self._close(entry.value)
+
+    @staticmethod
+    def _close(value):
+        close = getattr(value, "close", None)
+        if callable(close):
+            close()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for k in [k for k, e in self._entries.items() if e.touched < cutoff]:
+            self._remove(k)
+
+    def _evict(self, keep=None):
+        """LRU μέχρι να χωρά στο όριο· η εγγραφή `keep` (αυτή που χρησιμοποιείται τώρα) μένει πάντα."""
+        self._expire()
+        for k in list(self._entries):
+            if self._total <= self.budget:
+                break
+            if k != keep:
+                self._remove(k)
+
+    def usage(self, session: str = None) -> pd.DataFrame:
+        """Εγγραφές (όλες ή μιας συνεδρίας) με μέγεθος και ηλικία, από τη λιγότερο πρόσφατη."""
+        now = time.monotonic()
+        with self._lock:
+            rows = [{"Κλειδί": str(k[1]), "Μέγεθος (MB)": e.size / 2**20,
+                     "Αδράνεια (s)": now - e.touched, "Ηλικία (s)": now - e.created}
+                    for k, e in self._entries.items() if session is None or k[0] == session]
+        return pd.DataFrame(rows, columns=["Κλειδί", "Μέγεθος (MB)", "Αδράνεια (s)", "Ηλικία (s)"])
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+# Μία κοινή μνήμη ανά διεργασία (τα modules μένουν φορτωμένα ανάμεσα στα reruns του Streamlit)
+RESULTS = ResultCache()
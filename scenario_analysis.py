@@ -0,0 +1,502 @@
+import os
+import hashlib
+from functools import partial
+import numpy as np
+import pandas as pd
+
+from instrumentation import StageTimer
+from workbook_utils import parallel_map, parallel_completed, PARALLEL_MIN_SHEETS
+from friends_utils import (
+    canon_name, NameIndex, parse_name_column, use_sparse, mutual_pairs_sparse, broken_pair_mask, union_find_components,
+    triangles_per_node,
+)
+
+FRIENDS_COLS = ("ΦΙΛΟΙ", "ΦΙΛΙΑ", "ΦΙΛΟΣ")
+FLAG_COLS = ["ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ", "ΖΩΗΡΟΣ", "ΙΔΙΑΙΤΕΡΟΤΗΤΑ", "ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ"]
+BROKEN_COLUMNS = ["A", "A_ΤΜΗΜΑ", "B", "B_ΤΜΗΜΑ"]
+
+# Στήλες του generate_stats που προκύπτουν από σημαίες ανά μαθητή (βλ. student_features)
+BALANCE_COLUMNS = ["ΑΓΟΡΙΑ", "ΚΟΡΙΤΣΙΑ", "ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ", "ΖΩΗΡΟΙ", "ΙΔΙΑΙΤΕΡΟΤΗΤΑ", "ΓΝΩΣΗ ΕΛΛΗΝΙΚΩΝ"]
+# Οι στήλες του πίνακα του generate_stats (με αυτή τη σειρά)
+STATS_COLUMNS = BALANCE_COLUMNS + ["ΣΥΓΚΡΟΥΣΗ", "ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ", "ΣΥΝΟΛΟ ΜΑΘΗΤΩΝ"]
+# Ομάδες φίλων: συνιστώσες του γράφου αμοιβαίων φιλιών με τουλάχιστον τόσα μέλη (τρίγωνα και μεγαλύτερες)
+GROUP_MIN_SIZE = 3
+GROUP_COLUMNS = ["ΟΜΑΔΑ", "ΜΕΛΗ", "ΑΜΟΙΒΑΙΕΣ ΔΥΑΔΕΣ", "ΤΡΙΓΩΝΑ", "ΠΛΗΡΗΣ", "ΤΜΗΜΑΤΑ", "ΜΑΖΙ", "ΚΑΤΑΝΟΜΗ", "ΟΝΟΜΑΤΑ"]
+# Στήλες που προσθέτει το stats() μετά τις STATS_COLUMNS: ομάδες με μέλη στο τμήμα / από αυτές διασπασμένες
+GROUP_STATS_COLUMNS = ["ΟΜΑΔΕΣ ΦΙΛΩΝ", "ΔΙΑΣΠΑΣΜΕΝΕΣ ΟΜΑΔΕΣ"]
+_YES_VALUES = ("Ν", "ΝΑΙ", "NAI", "YES", "Y")
+
+# ---------- Per-student flags ----------
+def _yes_flags(col: pd.Series) -> np.ndarray:
+    """Στήλη Ν/Ο -> bool (ΝΑΙ/NAI/YES/Y -> Ν όπως στο generate_stats· μη κειμενικές στήλες -> όλα False)."""
+    if col.dtype != object and not pd.api.types.is_string_dtype(col):
+        return np.zeros(len(col), dtype=bool)
+    return col.fillna("").astype(str).str.strip().str.upper().isin(_YES_VALUES).to_numpy(dtype=bool)
+
+def student_features(df: pd.DataFrame) -> np.ndarray:
+    """(μαθητές × BALANCE_COLUMNS) bool: ποιες στήλες του generate_stats «μετρά» κάθε μαθητής."""
+    n = len(df)
+    gender = df["ΦΥΛΟ"].fillna("").astype(str).str.strip().str.upper() if "ΦΥΛΟ" in df else pd.Series([""] * n)
+    cols = [gender.eq("Α").to_numpy(dtype=bool), gender.eq("Κ").to_numpy(dtype=bool)]
+    for col in FLAG_COLS:
+        cols.append(_yes_flags(df[col]) if col in df else np.zeros(n, dtype=bool))
+    return np.column_stack(cols) if n else np.zeros((0, len(BALANCE_COLUMNS)), dtype=bool)
+
+def class_vector(df: pd.DataFrame):
+    """
+    ΤΜΗΜΑ ανά γραμμή -> (ετικέτες, κωδικοί, τμήματα). Κοινός κανόνας για ανάλυση, editor και optimizer:
+    κενό, NaN ή το κείμενο "nan" = χωρίς τμήμα (ετικέτα "", κωδικός -1)· δεν σπάει δυάδες, δεν μετρά
+    σε ΣΥΓΚΡΟΥΣΗ και δεν εμφανίζεται στα στατιστικά.
+    """
+    values = df["ΤΜΗΜΑ"].fillna("").astype(str).str.strip()
+    values = values.where(values.str.lower() != "nan", "")
+    codes, labels = pd.factorize(values.where(values != ""))
+    return values, codes, [str(lb) for lb in labels]
+
+# ---------- Roster graph (κοινό για σενάρια με ίδιο roster) ----------
+class RosterGraph:
+    """
+    Ό,τι **δεν** εξαρτάται από το ΤΜΗΜΑ: κανονικά ονόματα, NameIndex, επιλυμένες δηλώσεις
+    ΦΙΛΟΙ/ΣΥΓΚΡΟΥΣΗ και πλήρως αμοιβαίες δυάδες. Σενάρια με το ίδιο roster (ίδιο roster_key)
+    μοιράζονται έναν γράφο και το καθένα αποτιμάται μόνο ως νέο διάνυσμα τμημάτων.
+    `fuzzy`: κατώφλι ομοιότητας για ασαφή επίλυση ονομάτων (None = μόνο ακριβής, βλ. NameIndex).
+    """
+
+    def __init__(self, df: pd.DataFrame, backend: str = "auto", timer: StageTimer = None, fuzzy: float = None):
+        self.df = df
+        self.backend = backend
+        self.fuzzy = fuzzy
+        self.fcol = next((c for c in FRIENDS_COLS if c in df.columns), None)
+        self.timer = timer if timer is not None else StageTimer()
+        self._declared = {}
+        self._mutual_pairs = None
+        self._mutual_ids = None
+        self._conflict_edges = None
+        self._groups = None
+        with self.timer.stage("name_index"):
+            self.canon = df["ΟΝΟΜΑ"].map(canon_name).tolist()
+            self.display = dict(zip(self.canon, df["ΟΝΟΜΑ"].astype(str)))
+            self.index = NameIndex(self.canon, fuzzy=fuzzy)
+            self.last_row = {cn: i for i, cn in enumerate(self.canon)}   # διπλότυπα: μετρά η τελευταία γραμμή
+
+    @property
+    def sparse(self) -> bool:
+        return use_sparse(self.backend, len(self.canon))
+
+    def declared(self, col: str) -> pd.DataFrame:
+        """
+        Επιλυμένες δηλώσεις μιας στήλης ως (student_idx, me, target), με τη σειρά του κελιού.
+        Διπλότυπα ονόματα μαθητών: μετρά μόνο η τελευταία γραμμή του ονόματος.
+        """
+        if col not in self._declared:
+            with self.timer.stage("name_resolution"):
+                long = parse_name_column(self.df[col])
+                canon = np.array(self.canon, dtype=object)
+                is_last = np.array([self.last_row[cn] == i for i, cn in enumerate(self.canon)], dtype=bool)
+                long = long[is_last[long["student_idx"].to_numpy()]]
+                out = pd.DataFrame({
+                    "student_idx": long["student_idx"].to_numpy(),
+                    "me": canon[long["student_idx"].to_numpy()],
+                    "target": long["name"].map(self.index.resolve).to_numpy(dtype=object),
+                })
+                self._declared[col] = out[out["target"].notna() & (out["target"] != out["me"])].reset_index(drop=True)
+        return self._declared[col]
+
+    @property
+    def mutual_pairs(self) -> set:
+        """Σύνολο (a, b) με a < b όπου ο a δηλώνει τον b και ο b τον a."""
+        if self._mutual_pairs is None:
+            if self.fcol is None:
+                self._mutual_pairs = set()
+            elif self.sparse:
+                names, a, b = self.sparse_mutual()
+                self._mutual_pairs = {(names[i], names[j]) for i, j in zip(a, b)}
+            else:
+                edges = self.declared(self.fcol)
+                with self.timer.stage("pair_detection"):
+                    edge_set = set(zip(edges["me"], edges["target"]))
+                    mutual = set()
+                    for a, b in edge_set:
+                        if (b, a) in edge_set:
+                            mutual.add((a, b) if a < b else (b, a))
+                self._mutual_pairs = mutual
+        return self._mutual_pairs
+
+    def sparse_mutual(self):
+        """(ονόματα ταξινομημένα, a_ids, b_ids): ids κατά αλφαβητική σειρά, άρα ίδια σειρά με sorted()."""
+        if self._mutual_ids is None:
+            names = sorted(set(self.canon))
+            edges = self.declared(self.fcol)
+            with self.timer.stage("pair_detection"):
+                src = pd.Categorical(edges["me"], categories=names).codes
+                dst = pd.Categorical(edges["target"], categories=names).codes
+                a, b = mutual_pairs_sparse(src, dst, len(names))
+            self._mutual_ids = (names, a, b)
+        return self._mutual_ids
+
+    def friend_groups(self) -> list:
+        """
+        Ομάδες φίλων: συνεκτικές συνιστώσες (union-find) του γράφου των πλήρως αμοιβαίων φιλιών με
+        ≥ GROUP_MIN_SIZE μέλη, ως [(ids μελών στα ονόματα του sparse_mutual, αμοιβαίες δυάδες, τρίγωνα)],
+        από τη μεγαλύτερη. Σχεδόν γραμμικό στο πλήθος μαθητών + δυάδων (βλ. triangles_per_node).
+        """
+        if self._groups is None:
+            groups = []
+            if self.fcol is not None:
+                names, a, b = self.sparse_mutual()
+                with self.timer.stage("friend_groups"):
+                    root = union_find_components(len(names), a, b)
+                    sizes = np.bincount(root, minlength=len(names))
+                    pairs = np.bincount(root[a], minlength=len(names))
+                    triangles = np.bincount(root, weights=triangles_per_node(len(names), a, b), minlength=len(names))
+                    ids = np.flatnonzero(sizes[root] >= GROUP_MIN_SIZE)
+                    ids = ids[np.argsort(root[ids], kind="stable")]          # μέλη κάθε ομάδας συνεχόμενα
+                    if len(ids):
+                        cuts = np.flatnonzero(np.diff(root[ids])) + 1
+                        groups = [(m, int(pairs[root[m[0]]]), int(triangles[root[m[0]]])) for m in np.split(ids, cuts)]
+                        groups.sort(key=lambda g: (-len(g[0]), names[g[0][0]]))
+            self._groups = groups
+        return self._groups
+
+    def conflict_edges(self):
+        """ΣΥΓΚΡΟΥΣΗ ως πίνακες (student_idx, γραμμή του target, εμφανιζόμενο όνομα target) για αποτίμηση ανά σενάριο."""
+        if self._conflict_edges is None:
+            edges = self.declared("ΣΥΓΚΡΟΥΣΗ")
+            self._conflict_edges = (
+                edges["student_idx"].to_numpy(dtype=np.int64),
+                np.array([self.last_row[t] for t in edges["target"]], dtype=np.int64),
+                [self.display.get(t, t) for t in edges["target"]],
+            )
+        return self._conflict_edges
+
+def frame_digest(df: pd.DataFrame, columns=None) -> str:
+    """Hash περιεχομένου (τιμές + index + ονόματα στηλών) για τις `columns` (None = όλες)."""
+    positions = range(df.shape[1]) if columns is None else [i for i, c in enumerate(df.columns) if c in set(columns)]
+    h = hashlib.sha1(repr([df.columns[i] for i in positions]).encode("utf-8"))
+    h.update(repr(df.index.tolist()).encode("utf-8"))
+    for i in positions:
+        # repr κρατά και τον τύπο (1 != 1.0 != '1', nan != 'nan')
+        h.update(repr(df.iloc[:, i].tolist()).encode("utf-8"))
+    return h.hexdigest()
+
+def roster_key(df: pd.DataFrame) -> str:
+    """Ίδιο κλειδί <=> ίδιος RosterGraph (ίδια ΟΝΟΜΑ, ΦΙΛΟΙ, ΣΥΓΚΡΟΥΣΗ· το ΤΜΗΜΑ δεν μετρά)."""
+    fcol = next((c for c in FRIENDS_COLS if c in df.columns), None)
+    return frame_digest(df, [c for c in df.columns if c in ("ΟΝΟΜΑ", "ΣΥΓΚΡΟΥΣΗ") or c == fcol])
+
+# ---------- Per-sheet analysis ----------
+class ScenarioAnalysis:
+    """
+    Ανάλυση **ενός** sheet (σεναρίου), υπολογισμένη μία φορά:
+      - RosterGraph: κανονικοποίηση ονομάτων + NameIndex, γράφος ΦΙΛΟΙ/ΣΥΓΚΡΟΥΣΗ, αμοιβαίες δυάδες
+        (δίνεται έτοιμος `graph` όταν το roster είναι ίδιο με άλλου σεναρίου)
+      - το διάνυσμα τμημάτων του σεναρίου: σπασμένες δυάδες, ΣΥΓΚΡΟΥΣΗ ανά μαθητή, στατιστικά
+    Όλα τα αποτελέσματα βγαίνουν από τα ίδια δομικά στοιχεία και αποθηκεύονται· αντιμετωπίζονται ως read-only.
+    backend: "python", "sparse" (ids + αραιός πίνακας A & A.T) ή "auto" (ανάλογα με το μέγεθος).
+    fuzzy: κατώφλι ομοιότητας για ονόματα με ορθογραφικά λάθη (None = μόνο ακριβής αντιστοίχιση).
+    `timer`: χρόνοι των σταδίων name_index / name_resolution / pair_detection / conflicts / generate_stats.
+    """
+
+    def __init__(self, df: pd.DataFrame, backend: str = "auto", graph: RosterGraph = None, fuzzy: float = None):
+        self.df = df
+        self.backend = backend
+        self.fcol = next((c for c in FRIENDS_COLS if c in df.columns), None)
+        self.has_roster = {"ΟΝΟΜΑ", "ΤΜΗΜΑ"}.issubset(df.columns)
+        self._broken = None
+        self._broken_pairs = None
+        self._broken_ps = None
+        self._conflicts_ps = None
+        self._conflict_rows = np.zeros(0, dtype=np.int64)
+        self._groups = None
+        self._group_classes = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool))
+        self._stats = None
+        self.timer = StageTimer()
+        self.graph = None
+        with self.timer.stage("class_vector"):
+            # Συμπαγής μορφή: ακέραιος κωδικός τμήματος ανά γραμμή + σημαίες ως πίνακας bool
+            self.features = student_features(df)
+            if "ΤΜΗΜΑ" in df.columns:
+                # class_codes -> class_labels· γραμμές χωρίς τμήμα (κενό / NaN / "nan") -> -1
+                classes, self.class_codes, self.class_labels = class_vector(df)
+        if self.has_roster:
+            self.graph = graph if graph is not None else RosterGraph(df, backend, self.timer, fuzzy=fuzzy)
+            self.canon = self.graph.canon
+            self.display = self.graph.display
+            self.index = self.graph.index
+            self.class_by_name = dict(zip(self.canon, classes))
+
+    # ---------- Friendship graph ----------
+    @property
+    def mutual_pairs(self) -> set:
+        """Σύνολο (a, b) με a < b όπου ο a δηλώνει τον b και ο b τον a."""
+        if self.fcol is None or not self.has_roster:
+            return set()
+        return self.graph.mutual_pairs
+
+    def _declared(self, col: str) -> pd.DataFrame:
+        return self.graph.declared(col)
+
+    @property
+    def _sparse(self) -> bool:
+        return use_sparse(self.backend, len(self.canon) if self.has_roster else 0)
+
+    def _sparse_mutual(self):
+        return self.graph.sparse_mutual()
+
+    def _broken_canon(self):
+        """Σπασμένες αμοιβαίες δυάδες ως (a, ta, b, tb) σε κανονική μορφή, ταξινομημένες."""
+        if self._broken is None and self._sparse and self.fcol is not None:
+            names, a, b = self._sparse_mutual()
+            with self.timer.stage("pair_detection"):
+                classes = [self.class_by_name.get(name, "") for name in names]
+                mask = broken_pair_mask(classes, a, b)
+                self._broken = [(names[i], classes[i], names[j], classes[j]) for i, j in zip(a[mask], b[mask])]
+        if self._broken is None:
+            mutual = self.mutual_pairs
+            with self.timer.stage("pair_detection"):
+                rows = []
+                for a, b in sorted(mutual):
+                    ta = self.class_by_name.get(a, "")
+                    tb = self.class_by_name.get(b, "")
+                    if ta and tb and ta != tb:
+                        rows.append((a, ta, b, tb))
+            self._broken = rows
+        return self._broken
+
+    # ---------- Results ----------
+    def broken_pairs(self) -> pd.DataFrame:
+        """Κάθε **σπασμένη πλήρως αμοιβαία δυάδα** (A/B + τμήματα)."""
+        if self._broken_pairs is None:
+            if self.fcol is None or not self.has_roster:
+                self._broken_pairs = pd.DataFrame(columns=BROKEN_COLUMNS)
+            else:
+                self._broken_pairs = pd.DataFrame([
+                    {"A": self.display.get(a, a), "A_ΤΜΗΜΑ": ta, "B": self.display.get(b, b), "B_ΤΜΗΜΑ": tb}
+                    for a, ta, b, tb in self._broken_canon()
+                ])
+        return self._broken_pairs
+
+    def broken_per_student(self):
+        """(counts_series, names_series) ανά μαθητή για σπασμένες πλήρως αμοιβαίες δυάδες."""
+        if self._broken_ps is None:
+            idx = self.df.index
+            if not self.has_roster:
+                self._broken_ps = (pd.Series([0]*len(idx), index=idx), pd.Series([""]*len(idx), index=idx))
+            else:
+                broken_map = {}
+                for a, _ta, b, _tb in self._broken_canon():
+                    broken_map.setdefault(a, []).append(self.display.get(b, b))
+                    broken_map.setdefault(b, []).append(self.display.get(a, a))
+                lists = [broken_map.get(cn, []) for cn in self.canon]
+                self._broken_ps = (
+                    pd.Series([len(lst) for lst in lists], index=idx),
+                    pd.Series([", ".join(lst) for lst in lists], index=idx),
+                )
+        return self._broken_ps
+
+    def conflicts_per_student(self):
+        """
+        (counts_series, names_series) ανά μαθητή:
+        πόσοι/ποιοι από τους δηλωμένους στη ΣΥΓΚΡΟΥΣΗ βρίσκονται στην **ίδια τάξη**.
+        """
+        if self._conflicts_ps is None:
+            idx = self.df.index
+            counts = [0]*len(idx)
+            names = [""]*len(idx)
+            if self.has_roster and "ΣΥΓΚΡΟΥΣΗ" in self.df.columns:
+                student, target_row, target_name = self.graph.conflict_edges()
+                with self.timer.stage("conflicts"):
+                    me_code = self.class_codes[student]
+                    same = np.flatnonzero((me_code >= 0) & (me_code == self.class_codes[target_row]))
+                    self._conflict_rows = student[same]
+                    for k in same:
+                        i = student[k]
+                        counts[i] += 1
+                        names[i] = target_name[k] if not names[i] else names[i] + ", " + target_name[k]
+            self._conflicts_ps = (pd.Series(counts, index=idx), pd.Series(names, index=idx))
+        return self._conflicts_ps
+
+    def friend_groups(self) -> pd.DataFrame:
+        """
+        Πώς μοιράζεται κάθε ομάδα φίλων (RosterGraph.friend_groups) στα τμήματα του σεναρίου:
+        μέλη, αμοιβαίες δυάδες, τρίγωνα, ΠΛΗΡΗΣ (Ν = όλοι αμοιβαίοι φίλοι με όλους), πλήθος τμημάτων,
+        ΜΑΖΙ (τα περισσότερα μέλη στο ίδιο τμήμα) και κατανομή ανά τμήμα.
+        """
+        if self._groups is None:
+            rows, group_codes, group_split = [], [], []
+            if self.has_roster and self.fcol is not None:
+                names = self._sparse_mutual()[0]
+                last_row = self.graph.last_row
+                with self.timer.stage("friend_groups"):
+                    for g, (members, n_pairs, n_triangles) in enumerate(self.graph.friend_groups(), start=1):
+                        member_names = [names[i] for i in members]
+                        codes = self.class_codes[[last_row[nm] for nm in member_names]]
+                        codes = codes[codes >= 0]
+                        placed, counts = np.unique(codes, return_counts=True)
+                        order = np.argsort(-counts, kind="stable")
+                        k = len(members)
+                        rows.append((
+                            g, k, n_pairs, n_triangles, "Ν" if n_pairs == k * (k - 1) // 2 else "Ο", len(placed),
+                            int(counts.max()) if len(counts) else 0,
+                            " · ".join(f"{self.class_labels[placed[j]]}: {counts[j]}" for j in order),
+                            ", ".join(self.display.get(nm, nm) for nm in member_names),
+                        ))
+                        group_codes.extend(placed.tolist())
+                        group_split.extend([len(placed) > 1] * len(placed))
+            self._groups = pd.DataFrame(rows, columns=GROUP_COLUMNS)
+            self._group_classes = (np.asarray(group_codes, dtype=np.int64), np.asarray(group_split, dtype=bool))
+        return self._groups
+
+    def compute(self) -> "ScenarioAnalysis":
+        """Υπολογίζει όλα τα αποτελέσματα τώρα (π.χ. μέσα σε worker process) και επιστρέφει self."""
+        self.broken_pairs()
+        self.broken_per_student()
+        self.conflicts_per_student()
+        self.friend_groups()
+        self.stats()
+        return self
+
+    def stats(self) -> pd.DataFrame:
+        """Πίνακας στατιστικών ανά ΤΜΗΜΑ (ΑΓΟΡΙΑ … ΣΥΝΟΛΟ ΜΑΘΗΤΩΝ, και ΟΜΑΔΕΣ ΦΙΛΩΝ / ΔΙΑΣΠΑΣΜΕΝΕΣ ΟΜΑΔΕΣ)."""
+        if self._stats is None:
+            with self.timer.stage("generate_stats"):
+                self._stats = self._build_stats()
+        return self._stats
+
+    def _build_stats(self) -> pd.DataFrame:
+        """
+        Όλες οι στήλες από τους ακέραιους κωδικούς τμήματος: ένα bincount για (τμήμα, σημαία)
+        και ένα για καθεμία από ΣΥΝΟΛΟ / ΣΥΓΚΡΟΥΣΗ / ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ (χωρίς φιλτραρισμένα αντίγραφα του df).
+        """
+        if "ΤΜΗΜΑ" not in self.df.columns:
+            return pd.DataFrame(columns=STATS_COLUMNS + GROUP_STATS_COLUMNS).astype(int)
+        k, m = len(self.class_labels), len(BALANCE_COLUMNS)
+        codes = self.class_codes
+        valid = codes >= 0
+        rows, cols = np.nonzero(self.features[valid])
+        flags = np.bincount(codes[valid][rows] * m + cols, minlength=k * m).reshape(k, m)
+        total = np.bincount(codes[valid], minlength=k)
+
+        # ΣΥΓΚΡΟΥΣΗ ανά τμήμα = άθροισμα των μετρητών ανά μαθητή (κάθε δήλωση στο τμήμα του μαθητή)
+        self.conflicts_per_student()
+        conflicts = np.bincount(codes[self._conflict_rows], minlength=k)
+
+        # Σπασμένες φιλίες ανά τμήμα (κάθε δυάδα μετρά μία φορά σε κάθε τμήμα της)
+        ends = []
+        if self.has_roster:
+            last_row = self.graph.last_row
+            for a, _ta, b, _tb in self._broken_canon():
+                ends += [last_row[a], last_row[b]]
+        ends = codes[np.asarray(ends, dtype=np.int64)]
+        broken = np.bincount(ends[ends >= 0], minlength=k)
+
+        # Ομάδες φίλων με μέλη στο τμήμα (κάθε ομάδα μία φορά ανά τμήμα) και πόσες από αυτές είναι διασπασμένες
+        self.friend_groups()
+        group_codes, group_split = self._group_classes
+        groups = np.bincount(group_codes, minlength=k)
+        split = np.bincount(group_codes[group_split], minlength=k)
+
+        table = np.column_stack([flags, conflicts, broken, total, groups, split])
+        stats = pd.DataFrame(table, index=pd.Index(self.class_labels),
+                             columns=STATS_COLUMNS + GROUP_STATS_COLUMNS).astype(int).sort_index()
+        try:
+            stats = stats.sort_index(key=lambda x: x.str.extract(r"(\d+)")[0].astype(float))
+        except Exception:
+            pass
+        return stats
+
+def analyze_sheet(df: pd.DataFrame, fuzzy: float = None) -> ScenarioAnalysis:
+    """Πλήρης ανάλυση ενός sheet (top-level ώστε να μπορεί να τρέξει σε process pool)."""
+    return ScenarioAnalysis(df, fuzzy=fuzzy).compute()
+
+class SheetAnalyzer:
+    """
+    analyze_sheet για sheets που έρχονται **ένα-ένα** (π.χ. από νήμα παρασκηνίου), με τις ίδιες
+    κοινοποιήσεις με το analyze_sheets: πανομοιότυπο sheet -> το ίδιο αντικείμενο ανάλυσης,
+    ίδιο roster -> ο ίδιος RosterGraph. Οι κλήσεις πρέπει να είναι σειριακές (π.χ. υπό το lock του Workbook).
+    """
+
+    def __init__(self, fuzzy: float = None):
+        self.fuzzy = fuzzy
+        self._by_digest = {}
+        self._graphs = {}
+
+    def __call__(self, df: pd.DataFrame) -> ScenarioAnalysis:
+        digest = frame_digest(df)
+        if digest not in self._by_digest:
+            key = roster_key(df) if {"ΟΝΟΜΑ", "ΤΜΗΜΑ"}.issubset(df.columns) else None
+            analysis = ScenarioAnalysis(df, graph=self._graphs.get(key), fuzzy=self.fuzzy).compute()
+            if key is not None:
+                self._graphs.setdefault(key, analysis.graph)
+            self._by_digest[digest] = analysis
+        return self._by_digest[digest]
+
+def _analyze_group(frames: list, fuzzy: float = None) -> list:
+    """Σενάρια με ίδιο roster: ένας RosterGraph, ένα διάνυσμα τμημάτων ανά σενάριο."""
+    results, graph = [], None
+    for df in frames:
+        analysis = ScenarioAnalysis(df, graph=graph, fuzzy=fuzzy).compute()
+        graph = graph or analysis.graph
+        results.append(analysis)
+    return results
+
+def _plan_chunks(frames: list, workers, chunk_size: int = None):
+    """
+    (first_of, digests, chunks, workers) για το analyze_sheets / iter_analyze_sheets: μοναδικά sheets
+    ανά frame_digest, ομάδες ανά roster_key, κομμάτια (θέσεις στο `frames`) για το process pool.
+    """
+    digests = [frame_digest(df) for df in frames]
+    first_of, groups = {}, {}
+    for i, (df, digest) in enumerate(zip(frames, digests)):
+        if digest in first_of:
+            continue
+        first_of[digest] = i
+        key = roster_key(df) if {"ΟΝΟΜΑ", "ΤΜΗΜΑ"}.issubset(df.columns) else digest
+        groups.setdefault(key, []).append(i)
+
+    unique = len(first_of)
+    if unique < PARALLEL_MIN_SHEETS:
+        workers = 1
+    n_workers = workers if workers is not None else (os.cpu_count() or 1)
+    size = -(-unique // n_workers) if len(groups) < n_workers else unique
+    if chunk_size is not None:
+        size = min(size, chunk_size)
+    chunks = [g[k:k + size] for g in groups.values() for k in range(0, len(g), max(size, 1))]
+    return first_of, digests, chunks, workers
+
+def analyze_sheets(frames: list, workers=None, fuzzy: float = None) -> list:
+    """
+    Πλήρης ανάλυση πολλών sheets (με τη σειρά τους):
+      - πανομοιότυπα sheets (ίδιο frame_digest) -> το **ίδιο** αντικείμενο ανάλυσης
+      - sheets με ίδιο roster (roster_key) -> ένας RosterGraph για όλη την ομάδα
+    Οι ομάδες μοιράζονται σε process pool· αν είναι λιγότερες από τους workers, οι μεγάλες
+    σπάνε σε κομμάτια (ένας γράφος ανά κομμάτι) ώστε να δουλεύουν όλοι οι πυρήνες.
+    """
+    first_of, digests, chunks, workers = _plan_chunks(frames, workers)
+    done = parallel_map(partial(_analyze_group, fuzzy=fuzzy), [[frames[i] for i in chunk] for chunk in chunks],
+                        workers=workers, min_items=1)
+
+    by_index = {}
+    for chunk, analyses in zip(chunks, done):
+        by_index.update(zip(chunk, analyses))
+    return [by_index[first_of[digest]] for digest in digests]
+
+def iter_analyze_sheets(frames: list, workers=None, fuzzy: float = None, chunk_size: int = None):
+    """
+    Όπως το analyze_sheets, αλλά generator με τη σειρά ολοκλήρωσης (για πρόοδο στο AnalysisJob):
+    ανά κομμάτι (θέσεις στο `frames`, αναλύσεις ή None, εξαίρεση ή None). Οι θέσεις περιλαμβάνουν
+    και τα πανομοιότυπα sheets του κομματιού. `chunk_size`: το πολύ τόσα sheets ανά κομμάτι.
+    """
+    first_of, digests, chunks, workers = _plan_chunks(frames, workers, chunk_size)
+    copies = {}
+    for i, digest in enumerate(digests):
+        copies.setdefault(first_of[digest], []).append(i)
+    results = parallel_completed(partial(_analyze_group, fuzzy=fuzzy), [[frames[i] for i in chunk] for chunk in chunks],
+                                 workers=workers, min_items=1)
+    for k, analyses, error in results:
+        positions = [i for first in chunks[k] for i in copies[first]]
+        if error is not None:
+            yield positions, None, error
+        else:
+            by_first = dict(zip(chunks[k], analyses))
+            yield positions, [by_first[first_of[digests[i]]] for i in positions], None
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# ---------- Cross-scenario comparison ----------
+SCENARIO_PREFIX = "Σενάριο: "      # στήλες ανά σενάριο στο pairs()
+
+class ScenarioComparison:
+    """
+    Σύγκριση όλων των σεναρίων ενός workbook πάνω στις πλήρως αμοιβαίες δυάδες:
+      - broken: πίνακας bool (δυάδες × σενάρια) — True όπου η δυάδα είναι σπασμένη στο σενάριο
+      - mutual: ίδιο σχήμα — True όπου η δυάδα είναι αμοιβαία στο roster του σεναρίου
+    Από αυτούς βγαίνουν με πράξεις πινάκων (χωρίς joins ανά sheet):
+      - pairs():       κάθε αμοιβαία δυάδα μία φορά + σε ποια σενάρια σπάει
+      - students():    σταθερότητα ανά μαθητή σε όλα τα σενάρια
+      - difference():  πίνακας σεναρίων × σεναρίων: σε πόσες δυάδες διαφέρουν (σπασμένη/όχι)
+    `analyses`: ScenarioAnalysis ανά sheet (με τη σειρά των `sheet_names`).
+    """
+
+    def __init__(self, sheet_names, analyses):
+        self.sheet_names = list(sheet_names)
+        self.analyses = list(analyses)
+        pair_ids, display = {}, {}
+        for analysis in self.analyses:
+            if analysis.fcol is None or not analysis.has_roster:
+                continue
+            display.update(analysis.display)
+            for pair in analysis.mutual_pairs:
+                pair_ids.setdefault(pair, len(pair_ids))
+        # σταθερή σειρά: αλφαβητικά κατά (A, B)
+        order = sorted(pair_ids)
+        pair_ids = {pair: i for i, pair in enumerate(order)}
+        self.pair_list = order
+        self.display = display
+
+        n_pairs, n_scen = len(order), len(self.analyses)
+        self.broken = np.zeros((n_pairs, n_scen), dtype=bool)
+        self.mutual = np.zeros((n_pairs, n_scen), dtype=bool)
+        for j, analysis in enumerate(self.analyses):
+            if analysis.fcol is None or not analysis.has_roster:
+                continue
+            self.mutual[[pair_ids[p] for p in analysis.mutual_pairs], j] = True
+            self.broken[[pair_ids[(a, b)] for a, _ta, b, _tb in analysis._broken_canon()], j] = True
+
+        students = sorted({name for pair in order for name in pair})
+        self.student_list = students
+        student_ids = {name: i for i, name in enumerate(students)}
+        self._a = np.array([student_ids[a] for a, _b in order], dtype=np.int64)
+        self._b = np.array([student_ids[b] for _a, b in order], dtype=np.int64)
+
+    def _name(self, canon: str) -> str:
+        return self.display.get(canon, canon)
+
+    def pairs(self) -> pd.DataFrame:
+        """
+        Μία γραμμή ανά αμοιβαία δυάδα: A, B, σε πόσα σενάρια σπάει, και True/False ανά σενάριο
+        (στήλες `SCENARIO_PREFIX + sheet`, ώστε ένα sheet με όνομα π.χ. «A» να μη συμπίπτει με τις σταθερές).
+        """
+        out = pd.DataFrame({
+            "A": [self._name(a) for a, _b in self.pair_list],
+            "B": [self._name(b) for _a, b in self.pair_list],
+            "Σπασμένη σε (σενάρια)": self.broken.sum(axis=1),
+            "Αμοιβαία σε (σενάρια)": self.mutual.sum(axis=1),
+        })
+        flags = pd.DataFrame(self.broken, columns=[SCENARIO_PREFIX + s for s in self.sheet_names])
+        return pd.concat([out, flags], axis=1)
+
+    def per_student_broken(self) -> np.ndarray:
+        """(μαθητές × σενάρια): σπασμένες αμοιβαίες φιλίες κάθε μαθητή σε κάθε σενάριο."""
+        counts = np.zeros((len(self.student_list), len(self.sheet_names)), dtype=np.int64)
+        np.add.at(counts, self._a, self.broken)
+        np.add.at(counts, self._b, self.broken)
+        return counts
+
+    def students(self) -> pd.DataFrame:
+        """Σταθερότητα ανά μαθητή (μόνο όσοι έχουν τουλάχιστον μία αμοιβαία φιλία)."""
+        counts = self.per_student_broken()
+        mutual = np.zeros(len(self.student_list), dtype=np.int64)
+        np.add.at(mutual, self._a, 1)
+        np.add.at(mutual, self._b, 1)
+        n_scen = max(1, len(self.sheet_names))
+        with_broken = (counts > 0).sum(axis=1)
+        return pd.DataFrame({
+            "ΟΝΟΜΑ": [self._name(s) for s in self.student_list],
+            "Αμοιβαίοι φίλοι": mutual,
+            "Σενάρια με σπασμένη φιλία": with_broken,
+            "Μ.Ο. σπασμένων ανά σενάριο": counts.mean(axis=1) if counts.size else np.zeros(len(self.student_list)),
+            "Σταθερότητα (%)": 100.0 * (n_scen - with_broken) / n_scen,
+        }).sort_values(["Σενάρια με σπασμένη φιλία", "ΟΝΟΜΑ"], ascending=[False, True], ignore_index=True)
+
+    def difference(self) -> pd.DataFrame:
+        """
+        D[i, j] = πλήθος δυάδων που είναι σπασμένες σε ακριβώς ένα από τα σενάρια i, j
+        (Hamming απόσταση στηλών: c_i + c_j - 2·BᵀB, ένας πολλαπλασιασμός πινάκων).
+        """
+        b = self.broken.astype(np.float64)
+        gram = b.T @ b
+        c = np.diag(gram)
+        d = np.rint(c[:, None] + c[None, :] - 2 * gram).astype(np.int64)
+        return pd.DataFrame(d, index=self.sheet_names, columns=self.sheet_names)
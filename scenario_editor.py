@@ -0,0 +1,311 @@
+import re
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+from friends_utils import canon_name
+from scenario_analysis import ScenarioAnalysis, BALANCE_COLUMNS, STATS_COLUMNS
+
+TOTAL_COLUMN = "ΣΥΝΟΛΟ ΜΑΘΗΤΩΝ"
+
+def _class_order(label: str):
+    """Σειρά τμημάτων όπως στο generate_stats: κατά τον πρώτο αριθμό του ονόματος (Α1, Α2, …, Α10)."""
+    m = re.search(r"(\d+)", label)
+    return (0, float(m.group(1)), label) if m else (1, 0.0, label)
+
+# ---------- Incremental class-assignment state ----------
+class AssignmentState:
+    """
+    Το διάνυσμα ΤΜΗΜΑ ενός sheet σε μορφή κατάλληλη για τοπικές αλλαγές:
+      - ακέραιος κωδικός τμήματος ανά γραμμή, από το class_vector (-1 = χωρίς ΤΜΗΜΑ: δεν μετακινείται και δεν μετρά)
+      - αμοιβαίοι φίλοι και δηλώσεις ΣΥΓΚΡΟΥΣΗ (εξερχόμενες/εισερχόμενες) ανά γραμμή, από τον RosterGraph
+      - counts[στήλη][τμήμα] για τις στήλες BALANCE_COLUMNS + ΣΥΝΟΛΟ ΜΑΘΗΤΩΝ
+    Οι ορισμοί είναι ίδιοι με το list_broken_mutual_pairs / compute_conflict_counts_and_names, οπότε
+    μια μετακίνηση αποτιμάται σε χρόνο ανάλογο των φίλων/συγκρούσεων του μαθητή (+ των τμημάτων).
+    Οι υποκλάσεις καλούν `_set_state(self.original)` στο τέλος του __init__.
+    """
+
+    def __init__(self, df: pd.DataFrame, graph=None):
+        analysis = ScenarioAnalysis(df, graph=graph)
+        if not analysis.has_roster:
+            raise ValueError("Το sheet χρειάζεται στήλες ΟΝΟΜΑ και ΤΜΗΜΑ")
+        self.df = df
+        self.graph = analysis.graph
+
+        # Οι κωδικοί της ανάλυσης (ίδιος κανόνας για γραμμές χωρίς τμήμα), αναριθμημένοι κατά _class_order
+        order = sorted(range(len(analysis.class_labels)), key=lambda c: _class_order(analysis.class_labels[c]))
+        rank = np.empty(len(order) + 1, dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        rank[-1] = -1
+        self.labels = [analysis.class_labels[c] for c in order]
+        self.code_of = {lb: c for c, lb in enumerate(self.labels)}
+        self.original = rank[analysis.class_codes].tolist()
+        self.movable = [i for i, c in enumerate(self.original) if c >= 0]
+        self.k = len(self.labels)
+        n = len(self.original)
+
+        # Αμοιβαίοι φίλοι ανά γραμμή (διπλότυπα ονόματα: η τελευταία γραμμή, όπως στην ανάλυση)
+        self.friends = [[] for _ in range(n)]
+        last_row = self.graph.last_row
+        for a, b in analysis.mutual_pairs:
+            i, j = last_row[a], last_row[b]
+            self.friends[i].append(j)
+            self.friends[j].append(i)
+        # ΣΥΓΚΡΟΥΣΗ: εξερχόμενες και εισερχόμενες δηλώσεις (με πολλαπλότητα)
+        self.conf_out = [[] for _ in range(n)]
+        self.conf_in = [[] for _ in range(n)]
+        if "ΣΥΓΚΡΟΥΣΗ" in df.columns:
+            student, target_row, _names = self.graph.conflict_edges()
+            for s, t in zip(student.tolist(), target_row.tolist()):
+                self.conf_out[s].append(t)
+                self.conf_in[t].append(s)
+
+        # Στήλες ανά μαθητή: οι σημαίες του generate_stats + ΣΥΝΟΛΟ ΜΑΘΗΤΩΝ (πάντα 1)
+        self.columns = BALANCE_COLUMNS + [TOTAL_COLUMN]
+        if n:
+            feats = np.column_stack([analysis.features, np.ones(n, dtype=bool)])
+        else:
+            feats = np.zeros((0, len(self.columns)), dtype=bool)
+        self.features = [np.flatnonzero(row).tolist() for row in feats]
+
+    def _set_state(self, classes: list):
+        self.cls = list(classes)
+        self.counts = [[0] * self.k for _ in self.columns]
+        for i, c in enumerate(self.cls):
+            if c >= 0:
+                for f in self.features[i]:
+                    self.counts[f][c] += 1
+        self.broken = sum(
+            1 for i in range(len(self.cls)) for j in self.friends[i]
+            if i < j and self.cls[i] >= 0 and self.cls[j] >= 0 and self.cls[i] != self.cls[j]
+        )
+        self.conflicts = sum(
+            1 for s in range(len(self.cls)) for t in self.conf_out[s]
+            if self.cls[s] >= 0 and self.cls[s] == self.cls[t]
+        )
+
+    def assignment(self, classes: list = None) -> list:
+        """ΤΜΗΜΑ ανά γραμμή (οι γραμμές χωρίς ΤΜΗΜΑ κρατούν την αρχική τιμή)."""
+        classes = self.cls if classes is None else classes
+        original = self.df["ΤΜΗΜΑ"].tolist()
+        return [self.labels[c] if c >= 0 else original[i] for i, c in enumerate(classes)]
+
+    def moved(self, classes: list = None) -> int:
+        classes = self.cls if classes is None else classes
+        return sum(1 for a, b in zip(classes, self.original) if a != b)
+
+# ---------- What-if editor ----------
+class MoveDelta:
+    """
+    Αποτέλεσμα μιας μετακίνησης/ανταλλαγής:
+      - broken_added / broken_removed: σπασμένες αμοιβαίες δυάδες (A, B) που προκύπτουν / διορθώνονται
+      - conflicts_added / conflicts_removed: (μαθητής, δηλωμένος) ΣΥΓΚΡΟΥΣΗ που μπαίνουν / βγαίνουν από κοινή τάξη
+      - stats: μεταβολή του πίνακα του generate_stats (τμήματα × στήλες, μόνο τα τμήματα που αλλάζουν)
+    """
+
+    def __init__(self, changes, broken_added, broken_removed, conflicts_added, conflicts_removed, stats):
+        self.changes = changes
+        self.broken_added = broken_added
+        self.broken_removed = broken_removed
+        self.conflicts_added = conflicts_added
+        self.conflicts_removed = conflicts_removed
+        self.stats = stats
+
+    @property
+    def broken(self) -> int:
+        return len(self.broken_added) - len(self.broken_removed)
+
+    @property
+    def conflicts(self) -> int:
+        return len(self.conflicts_added) - len(self.conflicts_removed)
+
+    def combine(self, other: "MoveDelta") -> "MoveDelta":
+        """Η συνολική μεταβολή του self και μετά του other (ό,τι προστίθεται και αφαιρείται αλληλοαναιρείται)."""
+        def net(added, removed, other_added, other_removed):
+            plus = Counter(added) + Counter(other_added)
+            minus = Counter(removed) + Counter(other_removed)
+            return list((plus - minus).elements()), list((minus - plus).elements())
+        broken_added, broken_removed = net(self.broken_added, self.broken_removed, other.broken_added, other.broken_removed)
+        conf_added, conf_removed = net(self.conflicts_added, self.conflicts_removed,
+                                       other.conflicts_added, other.conflicts_removed)
+        stats = self.stats.add(other.stats, fill_value=0).astype(int)
+        stats = stats.loc[(stats != 0).any(axis=1)]
+        return MoveDelta(self.changes + other.changes, broken_added, broken_removed, conf_added, conf_removed, stats)
+
+class ScenarioEditor(AssignmentState):
+    """
+    Κατάσταση ενός sheet για «τι θα γίνει αν…»: move(μαθητής, τμήμα) / swap(μαθητής, μαθητής) επιστρέφουν
+    MoveDelta (σπασμένες δυάδες, ΣΥΓΚΡΟΥΣΗ, στατιστικά ανά τμήμα) σε χρόνο ανάλογο των φίλων/συγκρούσεων
+    των μαθητών που αλλάζουν — χωρίς επανυπολογισμό όλου του sheet. Τα preview_* δεν αλλάζουν την κατάσταση.
+    Μαθητής = θέση γραμμής (0..n-1) ή όνομα (επιλύεται όπως στη ΦΙΛΟΙ/ΣΥΓΚΡΟΥΣΗ).
+    """
+
+    def __init__(self, df: pd.DataFrame, graph=None):
+        super().__init__(df, graph)
+        self.history = []
+        self._set_state(self.original)
+
+    def _set_state(self, classes: list):
+        super()._set_state(classes)
+        # ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ / ΣΥΓΚΡΟΥΣΗ ανά τμήμα όπως στο generate_stats
+        self.broken_by_class = [0] * self.k
+        self.conflicts_by_class = [0] * self.k
+        cls = self.cls
+        for i in range(len(cls)):
+            for j in self.friends[i]:
+                if i < j and cls[i] >= 0 and cls[j] >= 0 and cls[i] != cls[j]:
+                    self.broken_by_class[cls[i]] += 1
+                    self.broken_by_class[cls[j]] += 1
+            for t in self.conf_out[i]:
+                if cls[i] >= 0 and cls[i] == cls[t]:
+                    self.conflicts_by_class[cls[i]] += 1
+
+    # ---------- Lookup ----------
+    def student(self, who) -> int:
+        """Θέση γραμμής του μαθητή `who` (int ή όνομα)."""
+        if isinstance(who, (int, np.integer)):
+            if not 0 <= who < len(self.cls):
+                raise ValueError(f"Δεν υπάρχει μαθητής στη θέση {who}")
+            return int(who)
+        target = self.graph.index.resolve(canon_name(who))
+        if target is None:
+            raise ValueError(f"Δεν βρέθηκε (μοναδικός) μαθητής: {who}")
+        return self.graph.last_row[target]
+
+    def name(self, i: int) -> str:
+        return str(self.df["ΟΝΟΜΑ"].iat[i])
+
+    def class_of(self, who) -> str:
+        c = self.cls[self.student(who)]
+        return self.labels[c] if c >= 0 else ""
+
+    def _code(self, label) -> int:
+        label = str(label).strip()
+        if label not in self.code_of:
+            raise ValueError(f"Άγνωστο ΤΜΗΜΑ: {label} (υπάρχουν: {', '.join(self.labels)})")
+        return self.code_of[label]
+
+    # ---------- Changes ----------
+    def _apply(self, i: int, q: int) -> MoveDelta:
+        """Μετακινεί τη γραμμή i στο τμήμα q και επιστρέφει τη μεταβολή (μόνο οι γείτονες του i)."""
+        cls = self.cls
+        p = cls[i]
+        if p < 0:
+            raise ValueError(f"Ο/Η {self.name(i)} δεν έχει ΤΜΗΜΑ στο sheet")
+        stats = np.zeros((self.k, len(STATS_COLUMNS)), dtype=np.int64)
+        if p == q:
+            return MoveDelta([], [], [], [], [], pd.DataFrame(stats[:0], columns=STATS_COLUMNS))
+        col = {c: n for n, c in enumerate(STATS_COLUMNS)}
+        b_col, c_col = col["ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ"], col["ΣΥΓΚΡΟΥΣΗ"]
+        broken_added, broken_removed, conf_added, conf_removed = [], [], [], []
+        for j in self.friends[i]:
+            cj = cls[j]
+            if cj < 0:
+                continue
+            before, after = cj != p, cj != q
+            if before != after:
+                pair = tuple(sorted((self.name(i), self.name(j))))
+                if after:
+                    broken_added.append(pair)
+                    stats[q, b_col] += 1
+                    stats[cj, b_col] += 1
+                else:
+                    broken_removed.append(pair)
+                    stats[p, b_col] -= 1
+                    stats[cj, b_col] -= 1
+            elif before:
+                # παραμένει σπασμένη, αλλά μετρά πλέον στο νέο τμήμα του i
+                stats[p, b_col] -= 1
+                stats[q, b_col] += 1
+        for t in self.conf_out[i]:
+            ct = cls[t]
+            if ct == p:
+                conf_removed.append((self.name(i), self.name(t)))
+                stats[p, c_col] -= 1
+            elif ct == q:
+                conf_added.append((self.name(i), self.name(t)))
+                stats[q, c_col] += 1
+        for s in self.conf_in[i]:
+            cs = cls[s]
+            if cs == p:
+                conf_removed.append((self.name(s), self.name(i)))
+                stats[p, c_col] -= 1
+            elif cs == q:
+                conf_added.append((self.name(s), self.name(i)))
+                stats[q, c_col] += 1
+        for f in self.features[i]:
+            self.counts[f][p] -= 1
+            self.counts[f][q] += 1
+            stats[p, col[self.columns[f]]] -= 1
+            stats[q, col[self.columns[f]]] += 1
+        cls[i] = q
+        self.broken += len(broken_added) - len(broken_removed)
+        self.conflicts += len(conf_added) - len(conf_removed)
+        for c in range(self.k):
+            self.broken_by_class[c] += int(stats[c, b_col])
+            self.conflicts_by_class[c] += int(stats[c, c_col])
+        frame = pd.DataFrame(stats, index=self.labels, columns=STATS_COLUMNS)
+        frame = frame.loc[(stats != 0).any(axis=1)]
+        return MoveDelta([(self.name(i), self.labels[p], self.labels[q])], broken_added, broken_removed,
+                         conf_added, conf_removed, frame)
+
+    def move(self, who, label) -> MoveDelta:
+        """Μετακίνηση του μαθητή στο τμήμα `label` (εφαρμόζεται· βλ. undo)."""
+        i, q = self.student(who), self._code(label)
+        p = self.cls[i]
+        delta = self._apply(i, q)
+        self.history.append([(i, p)])
+        return delta
+
+    def swap(self, who_a, who_b) -> MoveDelta:
+        """Ανταλλαγή τμημάτων δύο μαθητών (εφαρμόζεται· βλ. undo)."""
+        i, j = self.student(who_a), self.student(who_b)
+        p, q = self.cls[i], self.cls[j]
+        if q < 0:
+            raise ValueError(f"Ο/Η {self.name(j)} δεν έχει ΤΜΗΜΑ στο sheet")
+        delta = self._apply(i, q)
+        delta = delta.combine(self._apply(j, p))
+        self.history.append([(i, p), (j, q)])
+        return delta
+
+    def undo(self) -> MoveDelta:
+        """Αναιρεί την τελευταία move/swap (None αν δεν υπάρχει)."""
+        if not self.history:
+            return None
+        delta = None
+        for i, p in reversed(self.history.pop()):
+            step = self._apply(i, p)
+            delta = step if delta is None else delta.combine(step)
+        return delta
+
+    def reset(self):
+        self.history = []
+        self._set_state(self.original)
+
+    def preview_move(self, who, label) -> MoveDelta:
+        delta = self.move(who, label)
+        self.undo()
+        return delta
+
+    def preview_swap(self, who_a, who_b) -> MoveDelta:
+        delta = self.swap(who_a, who_b)
+        self.undo()
+        return delta
+
+    # ---------- Current state ----------
+    def stats(self) -> pd.DataFrame:
+        """
+        Ο πίνακας του generate_stats για την τρέχουσα κατάσταση (από τους μετρητές, χωρίς επανυπολογισμό)·
+        μόνο οι STATS_COLUMNS (οι στήλες ομάδων φίλων δεν παρακολουθούνται ανά μετακίνηση).
+        """
+        data = {c: self.counts[self.columns.index(c)] for c in BALANCE_COLUMNS}
+        data["ΣΥΓΚΡΟΥΣΗ"] = self.conflicts_by_class
+        data["ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ"] = self.broken_by_class
+        data[TOTAL_COLUMN] = self.counts[self.columns.index(TOTAL_COLUMN)]
+        return pd.DataFrame(data, index=pd.Index(self.labels), columns=STATS_COLUMNS).astype(int)
+
+    def changes(self) -> pd.DataFrame:
+        """Οι μαθητές που άλλαξαν τμήμα σε σχέση με το sheet."""
+        rows = [{"ΟΝΟΜΑ": self.name(i), "Από": self.labels[p], "Σε": self.labels[c]}
+                for i, (c, p) in enumerate(zip(self.cls, self.original)) if c != p]
+        return pd.DataFrame(rows, columns=["ΟΝΟΜΑ", "Από", "Σε"])
@@ -0,0 +1,202 @@
+import math
+import random
+import time
+import pandas as pd
+
+from scenario_editor import AssignmentState, TOTAL_COLUMN
+
+# Μέγιστη επιτρεπτή διαφορά (max - min) μεταξύ τμημάτων ανά στήλη του generate_stats
+DEFAULT_TOLERANCES = {
+    "ΑΓΟΡΙΑ": 2, "ΚΟΡΙΤΣΙΑ": 2, "ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ": 1, "ΖΩΗΡΟΙ": 1,
+    "ΙΔΙΑΙΤΕΡΟΤΗΤΑ": 1, "ΓΝΩΣΗ ΕΛΛΗΝΙΚΩΝ": 2, TOTAL_COLUMN: 1,
+}
+# Βάρη του κόστους: σπασμένες δυάδες, ΣΥΓΚΡΟΥΣΗ στην ίδια τάξη, μονάδες εκτός ανοχής (όπου η ανάθεση
+# του sheet είναι ήδη εκτός ανοχής· αλλιώς η ανοχή είναι αυστηρός περιορισμός, βλ. AssignmentSearch)
+DEFAULT_WEIGHTS = {"broken": 1.0, "conflicts": 1.0, "balance": 5.0}
+
+# ---------- Result ----------
+class OptimizedAssignment:
+    """Μία λύση: ΤΜΗΜΑ ανά γραμμή του sheet + το κόστος της."""
+
+    def __init__(self, classes: list, broken: int, conflicts: int, excess: int, score: float, moved: int):
+        self.classes = classes
+        self.broken = broken
+        self.conflicts = conflicts
+        self.excess = excess
+        self.score = score
+        self.moved = moved
+
+    def summary(self) -> dict:
+        return {
+            "Σπασμένες δυάδες": self.broken,
+            "Συγκρούσεις (ίδια τάξη)": self.conflicts,
+            "Εκτός ανοχής": self.excess,
+            "Μετακινήσεις": self.moved,
+            "Κόστος": round(self.score, 3),
+        }
+
+# ---------- Local search ----------
+class AssignmentSearch(AssignmentState):
+    """
+    Τοπική αναζήτηση (simulated annealing) πάνω στο ΤΜΗΜΑ ενός sheet, ξεκινώντας από την ανάθεσή του.
+    Κόστος = w_broken·σπασμένες αμοιβαίες δυάδες + w_conflicts·ΣΥΓΚΡΟΥΣΗ στην ίδια τάξη
+             + w_balance·Σ max(0, (max - min ανά τμήμα) - ανοχή) για τις στήλες του generate_stats.
+    Οι ανοχές είναι αυστηρός περιορισμός: μια μετακίνηση/ανταλλαγή που ανεβάζει την υπέρβαση μιας στήλης
+    πάνω από όση έχει η ανάθεση του sheet (`cap`, 0 αν είναι εντός ανοχής) απορρίπτεται.
+    Η αποτίμηση κάθε μετακίνησης/ανταλλαγής είναι τοπική (βλ. AssignmentState): χρόνος ανάλογος
+    των φίλων/συγκρούσεων του μαθητή + των τμημάτων, όχι όλου του sheet.
+    """
+
+    def __init__(self, df: pd.DataFrame, tolerances: dict = None, weights: dict = None, graph=None):
+        super().__init__(df, graph)
+        tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.w_broken, self.w_conflicts, self.w_balance = weights["broken"], weights["conflicts"], weights["balance"]
+        self.tol = [int(tolerances.get(col, 0)) for col in self.columns]
+        self.cap = None
+        self._set_state(self.original)
+        self.cap = list(self.excess)                # υπέρβαση της αρχικής ανάθεσης ανά στήλη
+        self.violations = 0
+
+    def _set_state(self, classes: list):
+        super()._set_state(classes)
+        self.excess = [self._excess(f) for f in range(len(self.columns))]
+        if self.cap is not None:
+            self.violations = sum(x > c for x, c in zip(self.excess, self.cap))
+
+    def _excess(self, f: int) -> int:
+        row = self.counts[f]
+        return max(0, max(row) - min(row) - self.tol[f]) if row else 0
+
+    def score(self) -> float:
+        return self.w_broken * self.broken + self.w_conflicts * self.conflicts + self.w_balance * sum(self.excess)
+
+    def _move(self, i: int, q: int) -> float:
+        """Μετακινεί τον μαθητή i στο τμήμα q και επιστρέφει τη μεταβολή του κόστους."""
+        cls = self.cls
+        p = cls[i]
+        db = 0
+        for j in self.friends[i]:
+            cj = cls[j]
+            if cj >= 0:
+                db += (cj != q) - (cj != p)
+        dc = 0
+        for t in self.conf_out[i]:
+            ct = cls[t]
+            dc += (ct == q) - (ct == p)
+        for s in self.conf_in[i]:
+            cs = cls[s]
+            dc += (cs == q) - (cs == p)
+        cls[i] = q
+        dx = 0
+        for f in self.features[i]:
+            row = self.counts[f]
+            row[p] -= 1
+            row[q] += 1
+            new = self._excess(f)
+            old = self.excess[f]
+            dx += new - old
+            self.excess[f] = new
+            self.violations += (new > self.cap[f]) - (old > self.cap[f])
+        self.broken += db
+        self.conflicts += dc
+        return self.w_broken * db + self.w_conflicts * dc + self.w_balance * dx
+
+    def _result(self, classes: list) -> OptimizedAssignment:
+        self._set_state(classes)
+        return OptimizedAssignment(self.assignment(), self.broken, self.conflicts, sum(self.excess), self.score(),
+                                   self.moved())
+
+    def baseline(self) -> OptimizedAssignment:
+        """Το κόστος της ανάθεσης του sheet όπως είναι."""
+        return self._result(self.original)
+
+    def run(self, n_best: int = 3, time_limit: float = 10.0, restarts: int = None, seed=None,
+            max_steps: int = None, t_start: float = 2.0, t_end: float = 0.05) -> list:
+        """
+        Οι `n_best` καλύτερες **διαφορετικές** αναθέσεις (αύξουσα σειρά κόστους), μόνο όσες έχουν μικρότερο
+        κόστος από την ανάθεση του sheet (κενή λίστα = καμία βελτίωση· η αρχική ανάθεση δεν επιστρέφεται ποτέ)
+        και σε καμία στήλη υπέρβαση ανοχής μεγαλύτερη από της ανάθεσης του sheet.
+        Ο χρόνος `time_limit` (s) μοιράζεται σε `restarts` ανεξάρτητες εκτελέσεις (προεπιλογή: n_best),
+        όλες από την ανάθεση του sheet. `max_steps` (ανά εκτέλεση) για αναπαραγώγιμα αποτελέσματα με `seed`.
+        """
+        rng = random.Random(seed)
+        runs = max(1, restarts or n_best)
+        budget = time_limit / runs
+        top = {}                                   # tuple(classes) -> score
+        if self.k < 2 or not self.movable:
+            return []
+        movable, k = self.movable, self.k
+        self._set_state(self.original)
+        base = self.score()
+        for _run in range(runs):
+            self._set_state(self.original)
+            current = base
+            deadline = time.perf_counter() + budget
+            ratio = t_end / t_start
+            temp, step = t_start, 0
+            while True:
+                if step % 256 == 0:
+                    now = time.perf_counter()
+                    if max_steps is None:
+                        if now >= deadline:
+                            break
+                        frac = 1.0 - (deadline - now) / budget
+                    else:
+                        if step >= max_steps:
+                            break
+                        frac = step / max_steps
+                    temp = t_start * ratio ** frac
+                step += 1
+                i = movable[rng.randrange(len(movable))]
+                p = self.cls[i]
+                if rng.random() < 0.5:
+                    # ανταλλαγή με μαθητή άλλου τμήματος (κρατά τα μεγέθη των τμημάτων)
+                    j = movable[rng.randrange(len(movable))]
+                    q = self.cls[j]
+                    if q == p:
+                        continue
+                    delta = self._move(i, q) + self._move(j, p)
+                    if not self.violations and (delta <= 0 or rng.random() < math.exp(-delta / temp)):
+                        current += delta
+                    else:
+                        self._move(j, q)
+                        self._move(i, p)
+                        continue
+                else:
+                    q = rng.randrange(k - 1)
+                    q += q >= p
+                    delta = self._move(i, q)
+                    if not self.violations and (delta <= 0 or rng.random() < math.exp(-delta / temp)):
+                        current += delta
+                    else:
+                        self._move(i, p)
+                        continue
+                if delta < 0 and current < base - 1e-9:
+                    self._offer(top, current, n_best)
+        best = sorted(top.items(), key=lambda kv: kv[1])[:n_best]
+        return [self._result(list(classes)) for classes, _score in best]
+
+    def _offer(self, top: dict, score: float, n_best: int):
+        """Κρατά τις n_best καλύτερες διαφορετικές καταστάσεις που έχουν εμφανιστεί."""
+        if len(top) >= n_best:
+            worst = max(top, key=top.get)
+            if score >= top[worst] - 1e-9:
+                return
+            key = tuple(self.cls)
+            if key in top:
+                return
+            del top[worst]
+        else:
+            key = tuple(self.cls)
+        top[key] = min(score, top.get(key, score))
+
+def optimize_assignments(df: pd.DataFrame, n_best: int = 3, time_limit: float = 10.0, tolerances: dict = None,
+                         weights: dict = None, seed=None, graph=None, **kwargs):
+    """
+    (baseline, [OptimizedAssignment, ...]) για το sheet `df` (κανονικοποιημένο, βλ. auto_rename_columns)·
+    η λίστα είναι κενή όταν δεν βρέθηκε ανάθεση με μικρότερο κόστος από το baseline.
+    """
+    search = AssignmentSearch(df, tolerances=tolerances, weights=weights, graph=graph)
+    results = search.run(n_best=n_best, time_limit=time_limit, seed=seed, **kwargs)
+    return search.baseline(), results
@@ -0,0 +1,358 @@
+# Ανάλυση & αναφορές της κύριας εφαρμογής χωρίς Streamlit (app.py, batch_cli.py).
+import re
+from functools import partial
+from io import BytesIO
+import numpy as np
+import pandas as pd
+
+from friends_utils import CANON_TARGETS, REQUIRED_COLS, auto_rename_columns, select_columns, missing_columns, canon_name
+from scenario_analysis import ScenarioAnalysis, RosterGraph, SheetAnalyzer, analyze_sheets, iter_analyze_sheets
+from workbook_utils import Workbook, XlsxStreamWriter, XLSX_ENGINE_KWARGS
+# scenario_compare / scenario_optimizer φορτώνονται μόνο όταν ζητηθούν (compare_workbook / optimize_sheet)
+
+def open_workbook(data: bytes, fuzzy: float = None, **kwargs) -> Workbook:
+    """
+    Workbook με την κανονικοποίηση/ανάλυση της κύριας εφαρμογής.
+    `fuzzy`: κατώφλι ομοιότητας (π.χ. 0.85) για ονόματα ΦΙΛΟΙ/ΣΥΓΚΡΟΥΣΗ με ορθογραφικά λάθη· None = μόνο ακριβής.
+    """
+    analyze_many = partial(analyze_sheets, fuzzy=fuzzy) if fuzzy else analyze_sheets
+    analyze_iter = partial(iter_analyze_sheets, fuzzy=fuzzy) if fuzzy else iter_analyze_sheets
+    return Workbook(data, normalize=auto_rename_columns, analyze=SheetAnalyzer(fuzzy), analyze_many=analyze_many,
+                    analyze_iter=analyze_iter, usecols=select_columns, **kwargs)
+
+# ---------------------------
+# Friends / conflicts / stats (single-pass per sheet, see scenario_analysis.py)
+# ---------------------------
+
+def detect_broken_mutuals(df: pd.DataFrame, backend: str = "auto"):
+    """
+    (broken_counts_by_class, broken_pairs_df, mutual_pairs_count, broken_pairs_count)
+    για ένα κανονικοποιημένο sheet — η ίδια ανάλυση με την κύρια εφαρμογή.
+    """
+    analysis = ScenarioAnalysis(df, backend=backend)
+    stats = analysis.stats()
+    by_class = stats["ΣΠΑΣΜΕΝΗ ΦΙΛΙΑ"].astype(int) if len(stats) else pd.Series(dtype=int)
+    pairs = analysis.broken_pairs()
+    return by_class, pairs, len(analysis.mutual_pairs), len(pairs)
+
+
+def list_broken_mutual_pairs(df: pd.DataFrame) -> pd.DataFrame:
+    """Επιστρέφει DataFrame με κάθε **σπασμένη πλήρως αμοιβαία δυάδα** (A/B + τμήματα)."""
+    return ScenarioAnalysis(df).broken_pairs()
+
+
+def compute_broken_friend_names_per_student(df: pd.DataFrame):
+    """Return (counts_series, names_series) per student for σπασμένες πλήρως αμοιβαίες δυάδες."""
+    return ScenarioAnalysis(df).broken_per_student()
+
+
+def compute_conflict_counts_and_names(df: pd.DataFrame):
+    """
+    Return (counts_series, names_series) per student.
+    - counts_series: πόσοι από τους δηλωμένους βρίσκονται στην **ίδια τάξη** (μονόπλευρη δήλωση αρκεί).
+    - names_series: ονόματα αυτών των μαθητών (comma-separated).
+    """
+    return ScenarioAnalysis(df).conflicts_per_student()
+
+
+def generate_stats(df: pd.DataFrame) -> pd.DataFrame:
+    return ScenarioAnalysis(df).stats()
+
+
+def students_table(df_norm: pd.DataFrame, analysis: ScenarioAnalysis) -> pd.DataFrame:
+    """Ο πίνακας μαθητών με ΣΥΓΚΡΟΥΣΗ/ΣΥΓΚΡΟΥΣΗ_ΟΝΟΜΑ και ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ/ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ_ΟΝΟΜΑ."""
+    try:
+        conflict_counts, conflict_names = analysis.conflicts_per_student()
+        df_with = df_norm.copy()
+        df_with["ΣΥΓΚΡΟΥΣΗ"] = conflict_counts.astype(int)
+        df_with["ΣΥΓΚΡΟΥΣΗ_ΟΝΟΜΑ"] = conflict_names
+        try:
+            broken_counts_ps, broken_names_ps = analysis.broken_per_student()
+            df_with["ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ"] = broken_counts_ps.astype(int)
+            df_with["ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ_ΟΝΟΜΑ"] = broken_names_ps
+        except Exception:
+            pass
+    except Exception:
+        df_with = df_norm
+    return df_with
+
+# ---------------------------
+# Filtered / paged views (μόνο η ορατή σελίδα φτάνει στον browser)
+# ---------------------------
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+def filter_table(df: pd.DataFrame, classes=None, class_cols=("ΤΜΗΜΑ",), name_cols=("ΟΝΟΜΑ",), search: str = "",
+                 only_broken: bool = False, only_conflict: bool = False) -> pd.DataFrame:
+    """
+    Γραμμές του πίνακα μαθητών (ή ζευγών) που περνούν τα φίλτρα:
+      - `classes`: τμήματα σε οποιαδήποτε από τις `class_cols` (π.χ. A_ΤΜΗΜΑ/B_ΤΜΗΜΑ για ζεύγη)
+      - `search`: μέρος ονόματος σε οποιαδήποτε από τις `name_cols`, χωρίς τόνους/πεζά-κεφαλαία
+      - `only_broken` / `only_conflict`: ≥1 σπασμένη φιλία / ≥1 σύγκρουση (αν υπάρχουν οι στήλες)
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if classes:
+        wanted = set(map(str, classes))
+        in_class = np.zeros(len(df), dtype=bool)
+        for col in class_cols:
+            if col in df.columns:
+                in_class |= df[col].astype(str).str.strip().isin(wanted).to_numpy()
+        mask &= in_class
+    if only_broken and "ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ" in df.columns:
+        mask &= df["ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ"].to_numpy() > 0
+    if only_conflict and "ΣΥΓΚΡΟΥΣΗ" in df.columns:
+        mask &= df["ΣΥΓΚΡΟΥΣΗ"].to_numpy() > 0
+    query = canon_name(search) if search else ""
+    if query:
+        found = np.zeros(len(df), dtype=bool)
+        for col in name_cols:
+            if col in df.columns:
+                keys = df[col].fillna("").map(canon_name)
+                found |= keys.str.contains(query, regex=False).to_numpy()
+        mask &= found
+    return df if mask.all() else df[mask]
+
+def page_of(df: pd.DataFrame, page: int, page_size: int):
+    """(γραμμές της σελίδας `page` (από 1), πλήθος σελίδων)· η σελίδα περιορίζεται στο διαθέσιμο εύρος."""
+    pages = max(1, -(-len(df) // page_size))
+    page = min(max(1, int(page)), pages)
+    return df.iloc[(page - 1) * page_size: page * page_size], pages
+
+# ---------------------------
+# Export helpers
+# ---------------------------
+
+def sanitize_sheet_name(s: str) -> str:
+    s = str(s or "")
+    s = re.sub(r'[:\\/?*\\[\\]]', ' ', s)
+    return s[:31] if s else "SHEET"
+
+
+def export_stats_to_excel(stats_df: pd.DataFrame) -> BytesIO:
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter", engine_kwargs=XLSX_ENGINE_KWARGS) as writer:
+        stats_df.to_excel(writer, index=True, sheet_name="Στατιστικά", index_label="ΤΜΗΜΑ")
+        wb = writer.book
+        ws = writer.sheets["Στατιστικά"]
+        header_fmt = wb.add_format({"bold": True, "valign":"vcenter", "text_wrap": True, "border":1})
+        for col_idx, value in enumerate(["ΤΜΗΜΑ"] + list(stats_df.columns)):
+            ws.write(0, col_idx, value, header_fmt)
+        for i in range(0, len(stats_df.columns)+1):
+            ws.set_column(i, i, 18)
+    output.seek(0)
+    return output
+
+
+def export_students_to_excel(df_with: pd.DataFrame) -> BytesIO:
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter", engine_kwargs=XLSX_ENGINE_KWARGS) as writer:
+        df_with.to_excel(writer, index=False, sheet_name="Μαθητές_Σύγκρουση")
+    output.seek(0)
+    return output
+
+
+# ---------------------------
+# Columnar export (CSV / Parquet / Arrow) δίπλα στο xlsx
+# ---------------------------
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# μορφή -> (κατάληξη, mime)
+TABLE_FORMATS = {
+    "xlsx": (".xlsx", XLSX_MIME),
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+}
+
+def _arrow_ready(df: pd.DataFrame) -> pd.DataFrame:
+    """Στήλες object με ανάμεικτους τύπους (π.χ. αριθμοί και κείμενο) -> κείμενο, ώστε να γράφονται σε Arrow."""
+    mixed = [c for c in df.columns
+             if df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True).startswith("mixed")]
+    if not mixed and all(isinstance(c, str) for c in df.columns):
+        return df
+    out = df.copy()
+    for c in mixed:
+        out[c] = out[c].map(lambda v: None if pd.isna(v) else str(v))
+    out.columns = [str(c) for c in out.columns]
+    return out
+
+def export_table(df: pd.DataFrame, fmt: str) -> bytes:
+    """Ένας πίνακας (χωρίς index) ως CSV (utf-8-sig, για να τον ανοίγει σωστά το Excel), Parquet ή Arrow IPC."""
+    bio = BytesIO()
+    if fmt == "csv":
+        df.to_csv(bio, index=False, encoding="utf-8-sig")
+    elif fmt == "parquet":
+        _arrow_ready(df).to_parquet(bio, index=False)
+    elif fmt == "arrow":
+        _arrow_ready(df).reset_index(drop=True).to_feather(bio)
+    else:
+        raise ValueError(f"Άγνωστη μορφή: {fmt}")
+    return bio.getvalue()
+
+def export_stats(stats_df: pd.DataFrame, fmt: str = "xlsx") -> bytes:
+    if fmt == "xlsx":
+        return export_stats_to_excel(stats_df).getvalue()
+    return export_table(stats_df.rename_axis("ΤΜΗΜΑ").reset_index(), fmt)
+
+def export_students(df_with: pd.DataFrame, fmt: str = "xlsx") -> bytes:
+    if fmt == "xlsx":
+        return export_students_to_excel(df_with).getvalue()
+    return export_table(df_with, fmt)
+
+def export_broken_pairs(broken_df: pd.DataFrame, fmt: str = "xlsx") -> bytes:
+    if fmt == "xlsx":
+        with XlsxStreamWriter() as writer:
+            writer.write_frame("Σπασμένες", broken_df)
+        return writer.getvalue()
+    return export_table(broken_df, fmt)
+
+def broken_summary(xl_file: Workbook, sheets: list = None) -> pd.DataFrame:
+    """Σπασμένες δυάδες ανά sheet (ταξινομημένο κατά όνομα sheet)· `sheets`: μόνο αυτά (π.χ. όσα είναι έτοιμα)."""
+    if sheets is None:
+        sheets, analyses = xl_file.sheet_names, xl_file.analyze_all()
+    else:
+        analyses = [xl_file.analysis(s) for s in sheets]
+    rows = [{"Σενάριο (sheet)": sheet, "Σπασμένες Δυάδες": int(len(analysis.broken_pairs()))}
+            for sheet, analysis in zip(sheets, analyses)]
+    return pd.DataFrame(rows, columns=["Σενάριο (sheet)", "Σπασμένες Δυάδες"]).sort_values("Σενάριο (sheet)")
+
+
+def name_matches(analysis: ScenarioAnalysis) -> pd.DataFrame:
+    """Ασαφείς/αμφίσημες αντιστοιχίσεις ονομάτων του sheet (κενό αν η ασαφής επίλυση είναι ανενεργή)."""
+    if analysis.graph is None:
+        return pd.DataFrame(columns=["Δηλωμένο όνομα", "Αντιστοίχιση", "Ομοιότητα", "Κατάσταση"])
+    return analysis.graph.index.fuzzy_report(analysis.display)
+
+
+def build_broken_report(xl_file: Workbook) -> BytesIO:
+    """Πλήρες αντίγραφο των sheets + ένα *_BROKEN ανά sheet + Σύνοψη."""
+    bio = BytesIO()
+    with pd.ExcelWriter(bio, engine="xlsxwriter", engine_kwargs=XLSX_ENGINE_KWARGS) as writer:
+        for sheet in xl_file.sheet_names:
+            df_raw = xl_file.raw(sheet)
+            df_raw.to_excel(writer, index=False, sheet_name=sanitize_sheet_name(sheet))
+        for sheet, analysis in zip(xl_file.sheet_names, xl_file.analyze_all()):
+            broken_df = analysis.broken_pairs()
+            out_name = sanitize_sheet_name(f"{sheet}_BROKEN")
+            if broken_df.empty:
+                pd.DataFrame({"info": ["— καμία σπασμένη —"]}).to_excel(writer, index=False, sheet_name=out_name)
+            else:
+                broken_df.to_excel(writer, index=False, sheet_name=out_name)
+        broken_summary(xl_file).to_excel(writer, index=False, sheet_name="Σύνοψη")
+    bio.seek(0)
+    return bio
+
+
+def mass_summary(xl_file: Workbook) -> pd.DataFrame:
+    """Το SUMMARY της μαζικής αναφοράς (με τη σειρά του αρχείου)."""
+    rows = []
+    for idx, (sheet, analysis) in enumerate(zip(xl_file.sheet_names, xl_file.analyze_all()), start=1):
+        broken_counts_ps, _ = analysis.broken_per_student()
+        conf_counts, _ = analysis.conflicts_per_student()
+        groups = analysis.friend_groups()
+        rows.append({
+            "Index": idx,
+            "Original sheet name": sheet,
+            "S-code": f"S{idx}",
+            "Broken Pairs (rows)": int(len(analysis.broken_pairs())),
+            "Students with ≥1 Broken Friendship": int((broken_counts_ps.fillna(0) > 0).sum()),
+            "Students with ≥1 Conflict in Same Class": int((conf_counts.fillna(0) > 0).sum()),
+            "Friend Groups (≥3)": int(len(groups)),
+            "Split Friend Groups": int((groups["ΤΜΗΜΑΤΑ"] > 1).sum()),
+        })
+    return pd.DataFrame(rows)
+
+
+def build_mass_broken_and_conflicts_report(xl_file: Workbook) -> BytesIO:
+    """Streaming (constant-memory) xlsx: οι γραμμές κάθε sheet γράφονται μόλις υπολογιστούν."""
+    with XlsxStreamWriter() as writer:
+        for idx, (sheet, analysis) in enumerate(zip(xl_file.sheet_names, xl_file.analyze_all()), start=1):
+            df_norm, _ = xl_file.normalized(sheet)
+            n = len(df_norm)
+            names_col = df_norm["ΟΝΟΜΑ"] if "ΟΝΟΜΑ" in df_norm else [None]*n
+            class_col = df_norm["ΤΜΗΜΑ"] if "ΤΜΗΜΑ" in df_norm else [None]*n
+
+            broken_pairs = analysis.broken_pairs()
+            conf_counts, conf_names = analysis.conflicts_per_student()
+            broken_counts_ps, broken_names_ps = analysis.broken_per_student()
+
+            bp_name  = f"S{idx}_BP"   # broken pairs
+            bps_name = f"S{idx}_BPS"  # broken per student
+            cps_name = f"S{idx}_CPS"  # conflicts per student
+            grp_name = f"S{idx}_GRP"  # friend groups
+
+            if broken_pairs.empty:
+                writer.write_rows(bp_name, ["info"], [["— καμία —"]])
+            else:
+                writer.write_frame(bp_name, broken_pairs)
+            writer.write_rows(
+                bps_name, ["ΟΝΟΜΑ", "ΤΜΗΜΑ", "ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ", "ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ_ΟΝΟΜΑ"],
+                zip(names_col, class_col, broken_counts_ps.astype(int).tolist(), broken_names_ps),
+            )
+            writer.write_rows(
+                cps_name, ["ΟΝΟΜΑ", "ΤΜΗΜΑ", "ΣΥΓΚΡΟΥΣΗ", "ΣΥΓΚΡΟΥΣΗ_ΟΝΟΜΑ"],
+                zip(names_col, class_col, conf_counts.astype(int).tolist(), conf_names),
+            )
+            groups = analysis.friend_groups()
+            if groups.empty:
+                writer.write_rows(grp_name, ["info"], [["— καμία ομάδα φίλων —"]])
+            else:
+                writer.write_frame(grp_name, groups)
+
+        writer.write_frame("SUMMARY", mass_summary(xl_file))
+    return writer.output
+
+
+def compare_workbook(xl_file: Workbook):
+    """Σύγκριση όλων των σεναρίων (υπολογίζεται μία φορά ανά workbook)."""
+    from scenario_compare import ScenarioComparison
+    return xl_file.derived(("comparison",), lambda: ScenarioComparison(xl_file.sheet_names, xl_file.analyze_all()))
+
+
+def build_comparison_report(xl_file: Workbook) -> BytesIO:
+    """DIFF (σενάρια × σενάρια), PAIRS (δυάδα × σενάριο) και STUDENTS (σταθερότητα) σε streaming xlsx."""
+    comparison = compare_workbook(xl_file)
+    with XlsxStreamWriter() as writer:
+        writer.write_frame("DIFF", comparison.difference().rename_axis("Σενάριο").reset_index())
+        writer.write_frame("PAIRS", comparison.pairs())
+        writer.write_frame("STUDENTS", comparison.students())
+    return writer.output
+
+
+def optimize_sheet(xl_file: Workbook, sheet: str, fuzzy: float = None, **kwargs):
+    """
+    (baseline, αποτελέσματα) του optimize_assignments για όλο το sheet (όλες οι γραμμές του αρχείου).
+    `fuzzy`: ίδια ρύθμιση επίλυσης ονομάτων με το open_workbook.
+    """
+    df, _ = auto_rename_columns(xl_file.raw(sheet))
+    from scenario_optimizer import optimize_assignments
+    if fuzzy and "ΟΝΟΜΑ" in df.columns:
+        kwargs["graph"] = RosterGraph(df, fuzzy=fuzzy)
+    return optimize_assignments(df, **kwargs)
+
+
+def build_scenarios_workbook(xl_file: Workbook, sheet: str, assignments: list, suffix: str = "OPT") -> BytesIO:
+    """
+    Όλα τα sheets του αρχείου + ένα νέο sheet-σενάριο ανά ανάθεση (`<sheet>_<suffix><k>`): αντίγραφο του
+    αρχικού sheet με μόνο τη στήλη του ΤΜΗΜΑΤΟΣ αλλαγμένη, ώστε να ξαναφορτώνεται στην εφαρμογή.
+    `assignments`: λίστες ΤΜΗΜΑ ανά γραμμή (π.χ. OptimizedAssignment.classes, ScenarioEditor.assignment()).
+    """
+    raw = xl_file.raw(sheet)
+    renamed, _ = auto_rename_columns(raw)
+    pos = list(renamed.columns).index("ΤΜΗΜΑ")   # το rename κρατά τη σειρά των στηλών
+    used = set()
+    with XlsxStreamWriter() as writer:
+        for name in xl_file.sheet_names:
+            out_name = sanitize_sheet_name(name)
+            used.add(out_name)
+            writer.write_frame(out_name, xl_file.raw(name))
+        for k, classes in enumerate(assignments, start=1):
+            out = raw.copy()
+            out.isetitem(pos, classes)
+            out_name, n = sanitize_sheet_name(f"{str(sheet)[:24]}_{suffix}{k}"), 1
+            while out_name in used:
+                n += 1
+                out_name = sanitize_sheet_name(f"{str(sheet)[:21]}_{suffix}{k}_{n}")
+            used.add(out_name)
+            writer.write_frame(out_name, out)
+    return writer.output
@@ -0,0 +1,167 @@
+# Συνθετικά (ψευδώνυμα) Excel σεναρίων για benchmarks/δοκιμές — χωρίς πραγματικά δεδομένα μαθητών.
+#
+#   python synth_workbook.py demo.xlsx --students 300 --sheets 20 --messy-headers
+import argparse
+from io import BytesIO
+import numpy as np
+import pandas as pd
+
+FIRST = ["Γιώργος", "Μαρία", "Νίκος", "Ελένη", "Κώστας", "Άννα", "Δημήτρης", "Σοφία", "Πέτρος", "Κατερίνα",
+         "Ιωάννα", "Χρήστος", "Ανδρέας", "Δέσποινα", "Μιχάλης", "Χριστίνα", "Παναγιώτης", "Βασιλική", "Σταύρος",
+         "Ευαγγελία", "Θεόδωρος", "Αγγελική", "Λεωνίδας", "Ραφαέλα", "Αντώνης", "Φωτεινή", "Στέλιος", "Νεφέλη",
+         "Μάριος", "Ζωή", "Άγγελος", "Ξένια", "Ηλίας", "Μυρτώ", "Λουκάς", "Εβελίνα"]
+LAST = ["Παπαδόπουλος", "Γεωργίου", "Νικολάου", "Ιωάννου", "Κωνσταντίνου", "Χριστοδούλου", "Αντωνίου", "Μιχαήλ",
+        "Χαραλάμπους", "Σάββα", "Δημητρίου", "Παναγιώτου", "Λοΐζου", "Ευαγγέλου", "Θεοδώρου", "Κυριάκου",
+        "Ηλία", "Αθανασίου", "Στυλιανού", "Πετρίδης", "Ιακώβου", "Κλεάνθους", "Μενελάου", "Χατζηγεωργίου",
+        "Σωκράτους", "Αριστείδου", "Φιλίππου", "Ζαχαρίου", "Βασιλείου", "Ορφανίδης"]
+
+SEPARATORS = [", ", ";", " / ", " και ", "|", "\n"]
+
+# Παραλλαγές επικεφαλίδων που αναγνωρίζει το auto_rename_columns (κενά/underscore/πεζά/συνώνυμα)
+HEADER_VARIANTS = {
+    "ΟΝΟΜΑ": ["ΟΝΟΜΑ", "ονομα", " ΟΝΟΜΑ "],
+    "ΦΥΛΟ": ["ΦΥΛΟ", "φυλο"],
+    "ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ": ["ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ", "ΠΑΙΔΙ ΕΚΠΑΙΔΕΥΤΙΚΟΥ", "παιδι_εκπαιδευτικου"],
+    "ΖΩΗΡΟΣ": ["ΖΩΗΡΟΣ", "ζωηρος"],
+    "ΙΔΙΑΙΤΕΡΟΤΗΤΑ": ["ΙΔΙΑΙΤΕΡΟΤΗΤΑ", "ιδιαιτεροτητα"],
+    "ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ": ["ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ", "ΚΑΛΗ ΓΝΩΣΗ ΕΛΛΗΝΙΚΩΝ", "ΓΝΩΣΗ ΕΛΛΗΝΙΚΩΝ"],
+    "ΦΙΛΟΙ": ["ΦΙΛΟΙ", "ΦΙΛΙΑ", "φιλοι"],
+    "ΣΥΓΚΡΟΥΣΗ": ["ΣΥΓΚΡΟΥΣΗ", "ΣΥΓΚΡΟΥΣΕΙΣ", "συγκρουση"],
+    "ΤΜΗΜΑ": ["ΤΜΗΜΑ", "τμημα"],
+}
+NOISE_COLUMNS = ["Α/Α", "ΣΧΟΛΙΑ", "ΗΜ. ΓΕΝΝΗΣΗΣ", "ΤΗΛΕΦΩΝΟ ΚΗΔΕΜΟΝΑ"]
+
+def _names(n: int, rnd: np.random.Generator) -> list:
+    """n μοναδικά ονόματα· πέρα από FIRST×LAST προστίθεται αρχικό πατρώνυμου (π.χ. «Νίκος Γ. Ιωάννου»)."""
+    pool = [f"{f} {l}" for f in FIRST for l in LAST]
+    if n > len(pool):
+        initials = [f[0] + "." for f in FIRST]
+        pool += [f"{f} {i} {l}" for i in dict.fromkeys(initials) for f in FIRST for l in LAST]
+    if n > len(pool):
+        raise ValueError(f"Up to {len(pool)} unique synthetic names are supported")
+    idx = rnd.choice(len(pool), size=n, replace=False)
+    return [pool[i] for i in idx]
+
+def _mention(name: str, collisions: float, rnd: np.random.Generator) -> str:
+    """Πώς γράφει ο εκπαιδευτικός ένα όνομα: πλήρες, μόνο ένα token (πιθανή σύγκρουση ονομάτων) ή κεφαλαία."""
+    r = rnd.random()
+    if r < collisions:
+        toks = name.split()
+        return toks[0] if rnd.random() < 0.5 else toks[-1]
+    if r < collisions + 0.1:
+        return name.upper()
+    return name
+
+def _format_list(mentions: list, separators: str, rnd: np.random.Generator) -> str:
+    if not mentions:
+        return ""
+    if separators == "mixed":
+        if rnd.random() < 0.2:
+            return str(mentions)   # python-like λίστα ['Α', 'Β']
+        sep = SEPARATORS[rnd.integers(len(SEPARATORS))]
+    else:
+        sep = separators
+    return sep.join(mentions)
+
+def make_roster(n_students: int = 100, friends: float = 2.0, mutual: float = 0.7, conflicts: float = 0.5,
+                collisions: float = 0.1, separators: str = "mixed", seed: int = 0) -> pd.DataFrame:
+    """
+    Ένα roster (χωρίς ΤΜΗΜΑ):
+      friends    — μέσος αριθμός δηλωμένων φίλων ανά μαθητή (Poisson)
+      mutual     — πιθανότητα μια δήλωση φιλίας να είναι αμοιβαία
+      conflicts  — μέσος αριθμός δηλωμένων συγκρούσεων ανά μαθητή (Poisson)
+      collisions — ποσοστό αναφορών που γράφονται με ένα μόνο token (π.χ. «Μαρία»)
+      separators — "mixed" (όλα τα στυλ) ή ένα συγκεκριμένο διαχωριστικό
+    """
+    rnd = np.random.default_rng(seed)
+    names = _names(n_students, rnd)
+    n = len(names)
+    declared = [set() for _ in range(n)]
+    for i, k in enumerate(rnd.poisson(friends, size=n)):
+        for j in rnd.choice(n, size=min(int(k), n - 1), replace=False):
+            if j != i:
+                declared[i].add(int(j))
+                if rnd.random() < mutual:
+                    declared[int(j)].add(i)
+    conflict_lists = []
+    for i, k in enumerate(rnd.poisson(conflicts, size=n)):
+        targets = [int(j) for j in rnd.choice(n, size=min(int(k), n - 1), replace=False) if j != i and j not in declared[i]]
+        conflict_lists.append(targets)
+
+    def cells(lists):
+        return [_format_list([_mention(names[j], collisions, rnd) for j in sorted(lst)], separators, rnd) for lst in lists]
+
+    flags = ["Ν", "Ο", "ΝΑΙ", "ΟΧΙ", "", None]
+    return pd.DataFrame({
+        "ΟΝΟΜΑ": names,
+        "ΦΥΛΟ": rnd.choice(["Α", "Κ"], size=n),
+        "ΠΑΙΔΙ_ΕΚΠΑΙΔΕΥΤΙΚΟΥ": rnd.choice(flags, size=n, p=[0.1, 0.5, 0.02, 0.18, 0.1, 0.1]),
+        "ΖΩΗΡΟΣ": rnd.choice(["Ν", "Ο"], size=n, p=[0.2, 0.8]),
+        "ΙΔΙΑΙΤΕΡΟΤΗΤΑ": rnd.choice(["Ν", "Ο", "ΟΧΙ"], size=n, p=[0.1, 0.8, 0.1]),
+        "ΚΑΛΗ_ΓΝΩΣΗ_ΕΛΛΗΝΙΚΩΝ": rnd.choice(["Ν", "Ο"], size=n, p=[0.85, 0.15]),
+        "ΦΙΛΟΙ": cells(declared),
+        "ΣΥΓΚΡΟΥΣΗ": cells(conflict_lists),
+    })
+
+def make_scenarios(roster: pd.DataFrame, n_sheets: int = 5, n_classes: int = 4, moves: float = 0.2, seed: int = 0) -> dict:
+    """
+    {sheet: df}: το ίδιο roster με διαφορετικό ΤΜΗΜΑ ανά σενάριο. Το πρώτο σενάριο είναι ισοκατανεμημένο·
+    τα επόμενα μετακινούν ένα ποσοστό `moves` των μαθητών (όπως όταν ο εκπαιδευτικός δοκιμάζει παραλλαγές).
+    """
+    rnd = np.random.default_rng(seed + 1)
+    n = len(roster)
+    labels = np.array([f"Α{k + 1}" for k in range(n_classes)])
+    classes = labels[rnd.permutation(np.arange(n) % n_classes)]
+    out = {}
+    for s in range(n_sheets):
+        if s:
+            moved = rnd.random(n) < moves
+            classes = classes.copy()
+            classes[moved] = labels[rnd.integers(n_classes, size=int(moved.sum()))]
+        out[f"ΣΕΝΑΡΙΟ_{s + 1}"] = roster.assign(ΤΜΗΜΑ=classes)
+    return out
+
+def _messy(df: pd.DataFrame, rnd: np.random.Generator) -> pd.DataFrame:
+    renamed = df.rename(columns={c: HEADER_VARIANTS[c][rnd.integers(len(HEADER_VARIANTS[c]))] for c in df.columns})
+    for col in NOISE_COLUMNS:
+        renamed.insert(int(rnd.integers(renamed.shape[1] + 1)), col, "")
+    return renamed
+
+def write_workbook(target, sheets: dict, messy_headers: bool = False, seed: int = 0):
+    """Γράφει τα {sheet: df} σε xlsx (`target`: path ή file-like)."""
+    rnd = np.random.default_rng(seed + 2)
+    with pd.ExcelWriter(target, engine="xlsxwriter") as writer:
+        for name, df in sheets.items():
+            (_messy(df, rnd) if messy_headers else df).to_excel(writer, index=False, sheet_name=name)
+
+def synth_workbook(n_students: int = 100, n_sheets: int = 5, n_classes: int = 4, moves: float = 0.2,
+                   messy_headers: bool = False, seed: int = 0, **roster_kwargs) -> bytes:
+    """Τα bytes ενός συνθετικού xlsx (βλ. make_roster για τις παραμέτρους του roster)."""
+    roster = make_roster(n_students, seed=seed, **roster_kwargs)
+    bio = BytesIO()
+    write_workbook(bio, make_scenarios(roster, n_sheets, n_classes, moves, seed), messy_headers, seed)
+    return bio.getvalue()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Συνθετικό Excel σεναρίων (ψευδώνυμα) για benchmarks.")
+    parser.add_argument("out", help="αρχείο .xlsx")
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--sheets", type=int, default=5)
+    parser.add_argument("--classes", type=int, default=4)
+    parser.add_argument("--friends", type=float, default=2.0, help="μέσος αριθμός φίλων ανά μαθητή")
+    parser.add_argument("--mutual", type=float, default=0.7, help="πιθανότητα αμοιβαίας δήλωσης")
+    parser.add_argument("--conflicts", type=float, default=0.5, help="μέσος αριθμός συγκρούσεων ανά μαθητή")
+    parser.add_argument("--collisions", type=float, default=0.1, help="ποσοστό αναφορών με ένα μόνο όνομα")
+    parser.add_argument("--separators", default="mixed", help='"mixed" ή ένα διαχωριστικό, π.χ. ", "')
+    parser.add_argument("--moves", type=float, default=0.2, help="ποσοστό μετακινήσεων ανάμεσα σε σενάρια")
+    parser.add_argument("--messy-headers", action="store_true", help="παραλλαγές επικεφαλίδων + άσχετες στήλες")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    data = synth_workbook(args.students, args.sheets, args.classes, args.moves, args.messy_headers, args.seed,
+                          friends=args.friends, mutual=args.mutual, conflicts=args.conflicts,
+                          collisions=args.collisions, separators=args.separators)
+    with open(args.out, "wb") as fh:
+        fh.write(data)
+
+if __name__ == "__main__":
+    main()
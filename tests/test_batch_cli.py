@@ -0,0 +1,45 @@
+import json
+
+import pandas as pd
+
+import batch_cli
+from stats_core import open_workbook
+from synth_workbook import synth_workbook
+
+
+def test_main_writes_reports(tmp_path):
+    data = synth_workbook(n_students=60, n_sheets=3, seed=0)
+    path = tmp_path / "Σχολείο Α.xlsx"
+    path.write_bytes(data)
+    out = tmp_path / "out"
+    assert batch_cli.main([str(path), "-o", str(out), "--format", "xlsx", "csv", "json", "--workers", "1"]) == 0
+
+    wb = open_workbook(data)
+    folder = out / "Σχολείο_Α"
+    for name in ("broken_friends_report.xlsx", "mass_broken_conflicts_names.xlsx", "summary.csv", "report.json"):
+        assert (folder / name).is_file()
+    for sheet in wb.sheet_names:
+        for name in (f"statistika_{sheet}.xlsx", f"students_conflicts_{sheet}.xlsx",
+                     f"stats_{sheet}.csv", f"students_{sheet}.csv", f"broken_pairs_{sheet}.csv"):
+            assert (folder / name).is_file()
+        stats = pd.read_csv(folder / f"stats_{sheet}.csv", index_col="ΤΜΗΜΑ", encoding="utf-8-sig")
+        assert stats["ΣΥΝΟΛΟ ΜΑΘΗΤΩΝ"].sum() == 60
+        pairs = pd.read_csv(folder / f"broken_pairs_{sheet}.csv", encoding="utf-8-sig")
+        assert len(pairs) == len(wb.analysis(sheet).broken_pairs())
+
+    report = json.loads((folder / "report.json").read_text(encoding="utf-8"))
+    assert [s["sheet"] for s in report["sheets"]] == wb.sheet_names
+    assert all(not s["missing_columns"] and len(s["students"]) == 60 for s in report["sheets"])
+    assert len(report["summary"]) == len(wb.sheet_names)
+
+    batch = pd.read_csv(out / "batch_summary.csv", encoding="utf-8-sig")
+    assert batch["File"].tolist() == [str(path)] * len(wb.sheet_names)
+    with pd.ExcelFile(folder / "broken_friends_report.xlsx") as xl:
+        assert set(wb.sheet_names) <= set(xl.sheet_names)
+
+
+def test_main_reports_failed_inputs(tmp_path, capsys):
+    bad = tmp_path / "χαλασμένο.xlsx"
+    bad.write_bytes(b"not an excel file")
+    assert batch_cli.main([str(bad), "-o", str(tmp_path / "out")]) == 1
+    assert "χαλασμένο.xlsx" in capsys.readouterr().err
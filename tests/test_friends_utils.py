@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from friends_utils import auto_rename_columns, union_find_components
+
+
+def components(n, edges):
+    a = np.array([x for x, _ in edges], dtype=np.int64)
+    b = np.array([y for _, y in edges], dtype=np.int64)
+    roots = union_find_components(n, a, b)
+    groups = {}
+    for node, root in enumerate(np.asarray(roots).tolist()):
+        groups.setdefault(root, []).append(node)
+    return sorted(groups.values())
+
+
+# ---------- Union-find ----------
+def test_union_find_components():
+    assert components(7, [(0, 1), (1, 2), (4, 5), (5, 4), (2, 0)]) == [[0, 1, 2], [3], [4, 5], [6]]
+
+
+def test_union_find_without_edges():
+    assert components(3, []) == [[0], [1], [2]]
+    assert components(0, []) == []
+
+
+def test_union_find_chain_matches_brute_force():
+    rnd = np.random.default_rng(0)
+    n = 200
+    edges = [tuple(int(v) for v in rnd.integers(n, size=2)) for _ in range(150)]
+    # BFS αναφοράς
+    adjacency = [set() for _ in range(n)]
+    for x, y in edges:
+        adjacency[x].add(y)
+        adjacency[y].add(x)
+    seen, expected = set(), []
+    for start in range(n):
+        if start in seen:
+            continue
+        stack, group = [start], []
+        seen.add(start)
+        while stack:
+            x = stack.pop()
+            group.append(x)
+            for y in adjacency[x] - seen:
+                seen.add(y)
+                stack.append(y)
+        expected.append(sorted(group))
+    assert components(n, edges) == sorted(expected)
+
+
+# ---------- Column renaming ----------
+def test_class_fallback_uses_last_short_column():
+    df = pd.DataFrame({"ΟΝΟΜΑ": ["α", "β", "γ"], "Τάξη": ["Α1", "Α2", "Α1"], "Σχόλια": ["καλός μαθητής"] * 3})
+    renamed, mapping = auto_rename_columns(df)
+    assert list(renamed.columns) == ["ΟΝΟΜΑ", "ΤΜΗΜΑ", "Σχόλια", "ΣΥΓΚΡΟΥΣΗ"]
+    assert mapping == {"ΟΝΟΜΑ": "ΟΝΟΜΑ"}
+
+
+def test_class_fallback_may_pick_a_mapped_column():
+    # Όπως το baseline: χωρίς στήλη ΤΜΗΜΑ, η τελευταία «σύντομη» στήλη γίνεται ΤΜΗΜΑ ακόμη κι αν είναι η ΦΥΛΟ
+    df = pd.DataFrame({"ΟΝΟΜΑ": ["α", "β", "γ"], "ΦΥΛΟ": ["Α", "Κ", "Α"]})
+    renamed, _ = auto_rename_columns(df)
+    assert "ΤΜΗΜΑ" in renamed.columns and renamed["ΤΜΗΜΑ"].tolist() == ["Α", "Κ", "Α"]
+
+
+def test_class_fallback_checks_the_whole_column():
+    n = 300
+    df = pd.DataFrame({"ΟΝΟΜΑ": [f"μαθητής {i}" for i in range(n)], "Χ": ["μεγάλο κείμενο"] * 100 + ["Α1"] * 200})
+    renamed, _ = auto_rename_columns(df)
+    assert "ΤΜΗΜΑ" in renamed.columns
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from scenario_analysis import ScenarioAnalysis
+from scenario_compare import ScenarioComparison, SCENARIO_PREFIX
+
+
+def roster(classes):
+    return pd.DataFrame({
+        "ΟΝΟΜΑ": ["Άννα", "Βασίλης", "Γιώργος"],
+        "ΦΙΛΟΙ": ["Βασίλης", "Άννα", ""],
+        "ΤΜΗΜΑ": classes,
+    })
+
+
+def test_pairs_keep_scenarios_apart_from_fixed_columns():
+    # sheets με ονόματα ίδια με τις σταθερές στήλες
+    names = ["A", "B", "Σπασμένη σε (σενάρια)"]
+    analyses = [ScenarioAnalysis(roster(c)) for c in (["Α1", "Α2", "Α1"], ["Α1", "Α1", "Α2"], ["Α2", "Α1", "Α1"])]
+    pairs = ScenarioComparison(names, analyses).pairs()
+    assert pairs.columns.is_unique
+    assert pairs[["A", "B"]].values.tolist() == [["Άννα", "Βασίλης"]]
+    assert pairs["Σπασμένη σε (σενάρια)"].tolist() == [2]
+    assert [bool(pairs[SCENARIO_PREFIX + n].iloc[0]) for n in names] == [True, False, True]
@@ -0,0 +1,81 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scenario_analysis import ScenarioAnalysis, STATS_COLUMNS
+from scenario_editor import ScenarioEditor
+from synth_workbook import make_roster, make_scenarios
+
+
+def sheet(n=80, seed=0):
+    df = next(iter(make_scenarios(make_roster(n, seed=seed), n_sheets=1, seed=seed).values())).copy()
+    df["ΤΜΗΜΑ"] = df["ΤΜΗΜΑ"].astype(object)
+    df.loc[df.index[:3], "ΤΜΗΜΑ"] = ["", np.nan, "nan"]     # χωρίς τμήμα: δεν μετακινούνται, δεν μετρούν
+    return df
+
+
+def recompute(editor: ScenarioEditor) -> ScenarioAnalysis:
+    df = editor.df.copy()
+    df["ΤΜΗΜΑ"] = editor.assignment()
+    return ScenarioAnalysis(df)
+
+
+def assert_matches_full(editor: ScenarioEditor):
+    full = recompute(editor)
+    assert editor.broken == len(full.broken_pairs())
+    assert editor.conflicts == int(full.conflicts_per_student()[0].sum())
+    pd.testing.assert_frame_equal(editor.stats(), full.stats()[STATS_COLUMNS], check_names=False)
+
+
+def test_initial_state_matches_analysis():
+    editor = ScenarioEditor(sheet())
+    assert editor.original[:3] == [-1, -1, -1]
+    assert editor.labels == ["Α1", "Α2", "Α3", "Α4"]
+    assert_matches_full(editor)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_move_and_swap_deltas_match_recompute(seed):
+    editor = ScenarioEditor(sheet(seed=seed))
+    rnd = random.Random(seed)
+    for _ in range(25):
+        before = recompute(editor)
+        broken, conflicts = editor.broken, editor.conflicts
+        i = rnd.choice(editor.movable)
+        if rnd.random() < 0.5:
+            target = rnd.choice([lb for lb in editor.labels if lb != editor.class_of(i)])
+            delta = editor.move(i, target)
+        else:
+            j = rnd.choice([j for j in editor.movable if editor.cls[j] != editor.cls[i]])
+            delta = editor.swap(i, j)
+        after = recompute(editor)
+        assert editor.broken - broken == delta.broken == len(after.broken_pairs()) - len(before.broken_pairs())
+        assert editor.conflicts - conflicts == delta.conflicts
+        # μεταβολή στατιστικών = διαφορά δύο πλήρων υπολογισμών (μόνο τα τμήματα που αλλάζουν)
+        diff = (after.stats()[STATS_COLUMNS] - before.stats()[STATS_COLUMNS]).loc[delta.stats.index]
+        pd.testing.assert_frame_equal(delta.stats, diff, check_names=False)
+        assert_matches_full(editor)
+
+
+def test_preview_and_undo_leave_state_unchanged():
+    editor = ScenarioEditor(sheet())
+    start = list(editor.cls)
+    i = editor.movable[0]
+    target = next(lb for lb in editor.labels if lb != editor.class_of(i))
+    preview = editor.preview_move(i, target)
+    assert editor.cls == start and not editor.history
+    delta = editor.move(i, target)
+    assert (delta.broken, delta.conflicts) == (preview.broken, preview.conflicts)
+    editor.undo()
+    assert editor.cls == start
+    assert_matches_full(editor)
+
+
+def test_students_without_class_cannot_move():
+    editor = ScenarioEditor(sheet())
+    assert 0 not in editor.movable
+    with pytest.raises(ValueError):
+        editor.swap(editor.movable[0], 1)
+
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from scenario_analysis import ScenarioAnalysis
+from scenario_optimizer import AssignmentSearch, optimize_assignments, DEFAULT_TOLERANCES
+from synth_workbook import make_roster, make_scenarios
+
+
+def sheet(n=80, seed=0):
+    df = next(iter(make_scenarios(make_roster(n, seed=seed), n_sheets=1, seed=seed).values())).copy()
+    df["ΤΜΗΜΑ"] = df["ΤΜΗΜΑ"].astype(object)
+    df.loc[df.index[:3], "ΤΜΗΜΑ"] = ["", np.nan, "nan"]     # χωρίς τμήμα: δεν μετακινούνται, δεν μετρούν
+    return df
+
+
+def excess(df, classes, tolerances) -> dict:
+    """Υπέρβαση ανοχής ανά στήλη, από πλήρη ανάλυση της ανάθεσης `classes`."""
+    stats = ScenarioAnalysis(df.assign(ΤΜΗΜΑ=classes)).stats()
+    return {col: max(0, int(stats[col].max() - stats[col].min()) - tol) for col, tol in tolerances.items()}
+
+
+def test_optimizer_never_returns_the_original_assignment():
+    df = sheet(60)
+    search = AssignmentSearch(df)
+    baseline = search.baseline()
+    results = search.run(n_best=3, max_steps=2000, seed=0)
+    assert results
+    for r in results:
+        assert r.moved > 0 and r.score < baseline.score
+        assert r.classes[:3] == df["ΤΜΗΜΑ"].tolist()[:3]
+
+
+def test_optimizer_reports_no_improvement():
+    df = sheet(20)
+    df["ΤΜΗΜΑ"] = "Α1"                          # ένα τμήμα: τίποτα δεν μετακινείται
+    baseline, results = optimize_assignments(df, max_steps=100, seed=0)
+    assert results == [] and baseline.moved == 0
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_optimizer_respects_tolerances(seed):
+    # αυστηρές ανοχές και φτηνή ισορροπία: το κόστος θα «αγόραζε» υπερβάσεις για λιγότερες σπασμένες δυάδες
+    df = sheet(120, seed=seed)
+    tolerances = {**DEFAULT_TOLERANCES, "ΑΓΟΡΙΑ": 1, "ΚΟΡΙΤΣΙΑ": 1, "ΓΝΩΣΗ ΕΛΛΗΝΙΚΩΝ": 1}
+    baseline, results = optimize_assignments(df, tolerances=tolerances, weights={"balance": 0.1},
+                                             max_steps=4000, seed=seed)
+    before = excess(df, df["ΤΜΗΜΑ"].tolist(), tolerances)
+    assert sum(before.values()) == baseline.excess
+    for r in results:
+        after = excess(df, r.classes, tolerances)
+        assert all(after[col] <= before[col] for col in tolerances), (before, after)
+        assert r.excess == sum(after.values()) <= baseline.excess
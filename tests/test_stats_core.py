@@ -0,0 +1,118 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scenario_analysis import ScenarioAnalysis, STATS_COLUMNS
+from stats_core import (
+    list_broken_mutual_pairs, compute_conflict_counts_and_names, generate_stats, students_table, filter_table, page_of,
+    open_workbook,
+)
+from synth_workbook import make_roster, make_scenarios
+
+
+def roster():
+    """Μικρό roster: Άννα–Βασίλης και Γιώργος–Δήμητρα αμοιβαίοι, Άννα–Γιώργος μονόπλευρο, συγκρούσεις στην ίδια τάξη."""
+    return pd.DataFrame({
+        "ΟΝΟΜΑ": ["Άννα Αλεξίου", "Βασίλης Βλάχος", "Γιώργος Γεωργίου", "Δήμητρα Δήμου", "Ελένη Ευαγγέλου"],
+        "ΦΥΛΟ": ["Κ", "Α", "Α", "Κ", "Κ"],
+        "ΦΙΛΟΙ": ["Βασίλης Βλάχος, Γιώργος Γεωργίου", "Άννα Αλεξίου", "Δήμητρα Δήμου", "ΓΙΩΡΓΟΣ ΓΕΩΡΓΙΟΥ", ""],
+        "ΣΥΓΚΡΟΥΣΗ": ["Ελένη Ευαγγέλου", "", "", "Γιώργος Γεωργίου", ""],
+        "ΤΜΗΜΑ": ["Α1", "Α2", "Α1", "Α1", "Α1"],
+    })
+
+
+# ---------- Broken pairs / conflicts ----------
+def test_broken_mutual_pairs():
+    pairs = list_broken_mutual_pairs(roster())
+    assert list(pairs.columns) == ["A", "A_ΤΜΗΜΑ", "B", "B_ΤΜΗΜΑ"]
+    assert pairs.to_dict("records") == [
+        {"A": "Άννα Αλεξίου", "A_ΤΜΗΜΑ": "Α1", "B": "Βασίλης Βλάχος", "B_ΤΜΗΜΑ": "Α2"},
+    ]
+
+
+def test_conflicts_per_student():
+    counts, names = compute_conflict_counts_and_names(roster())
+    assert counts.tolist() == [1, 0, 0, 1, 0]
+    assert names.tolist() == ["Ελένη Ευαγγέλου", "", "", "Γιώργος Γεωργίου", ""]
+
+
+def test_conflict_in_other_class_does_not_count():
+    df = roster()
+    df.loc[4, "ΤΜΗΜΑ"] = "Α2"
+    counts, _ = compute_conflict_counts_and_names(df)
+    assert counts.tolist() == [0, 0, 0, 1, 0]
+
+
+def test_students_without_class_are_left_out():
+    # κενό, NaN και "nan": χωρίς τμήμα — ούτε σπασμένες δυάδες, ούτε συγκρούσεις, ούτε γραμμή στα στατιστικά
+    for missing in ("", np.nan, "nan"):
+        df = roster()
+        df["ΤΜΗΜΑ"] = df["ΤΜΗΜΑ"].astype(object)
+        df.loc[[1, 4], "ΤΜΗΜΑ"] = missing
+        assert list_broken_mutual_pairs(df).empty
+        assert compute_conflict_counts_and_names(df)[0].tolist() == [0, 0, 0, 1, 0]
+        stats = generate_stats(df)
+        assert list(stats.index) == ["Α1"]
+        assert stats.loc["Α1", "ΣΥΝΟΛΟ ΜΑΘΗΤΩΝ"] == 3
+
+
+def test_generate_stats():
+    stats = generate_stats(roster())[STATS_COLUMNS]
+    assert list(stats.index) == ["Α1", "Α2"]
+    assert stats.loc["Α1"].tolist() == [1, 3, 0, 0, 0, 0, 2, 1, 4]
+    assert stats.loc["Α2"].tolist() == [1, 0, 0, 0, 0, 0, 0, 1, 1]
+
+
+def test_students_export_keeps_extra_columns():
+    bio = BytesIO()
+    roster().assign(ΑΜ=range(5)).to_excel(bio, index=False, sheet_name="Σ1")
+    wb = open_workbook(bio.getvalue())
+    assert "ΑΜ" not in wb.normalized("Σ1")[0].columns          # η ανάλυση διαβάζει μόνο όσες στήλες χρειάζεται
+    table = students_table(wb.normalized("Σ1", all_columns=True)[0], wb.analysis("Σ1"))
+    assert table["ΑΜ"].tolist() == list(range(5))
+    assert table["ΣΠΑΣΜΕΝΗ_ΦΙΛΙΑ"].tolist() == [1, 1, 0, 0, 0]
+
+
+# ---------- Backends ----------
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_python_and_sparse_backends_agree(seed):
+    sheets = make_scenarios(make_roster(120, seed=seed), n_sheets=2, seed=seed)
+    for df in sheets.values():
+        df = df.copy()
+        df.loc[df.index[:5], "ΤΜΗΜΑ"] = ["", np.nan, "nan", "Α1", " Α2 "]
+        python, sparse = ScenarioAnalysis(df, backend="python"), ScenarioAnalysis(df, backend="sparse")
+        assert python.mutual_pairs == sparse.mutual_pairs
+        pd.testing.assert_frame_equal(python.broken_pairs(), sparse.broken_pairs())
+        for a, b in zip(python.broken_per_student(), sparse.broken_per_student()):
+            pd.testing.assert_series_equal(a, b)
+        pd.testing.assert_frame_equal(python.stats(), sparse.stats())
+        pd.testing.assert_frame_equal(python.friend_groups(), sparse.friend_groups())
+
+
+# ---------- Filtered / paged views ----------
+def test_filter_table():
+    df = students_table(roster(), ScenarioAnalysis(roster()))
+    assert filter_table(df) is df
+    assert filter_table(df, classes=["Α2"])["ΟΝΟΜΑ"].tolist() == ["Βασίλης Βλάχος"]
+    # χωρίς τόνους / πεζά-κεφαλαία
+    assert filter_table(df, search="γεωργιου")["ΟΝΟΜΑ"].tolist() == ["Γιώργος Γεωργίου"]
+    assert filter_table(df, only_broken=True)["ΟΝΟΜΑ"].tolist() == ["Άννα Αλεξίου", "Βασίλης Βλάχος"]
+    assert filter_table(df, classes=["Α1"], only_conflict=True)["ΟΝΟΜΑ"].tolist() == ["Άννα Αλεξίου", "Δήμητρα Δήμου"]
+    pairs = list_broken_mutual_pairs(roster())
+    assert len(filter_table(pairs, classes=["Α2"], class_cols=("A_ΤΜΗΜΑ", "B_ΤΜΗΜΑ"), name_cols=("A", "B"))) == 1
+    assert filter_table(pairs, search="δημου", name_cols=("A", "B")).empty
+
+
+def test_page_of():
+    df = pd.DataFrame({"x": range(53)})
+    rows, pages = page_of(df, 1, 25)
+    assert pages == 3 and rows["x"].tolist() == list(range(25))
+    rows, pages = page_of(df, 3, 25)
+    assert rows["x"].tolist() == [50, 51, 52]
+    # εκτός ορίων: η πρώτη / η τελευταία σελίδα
+    assert page_of(df, 0, 25)[0]["x"].iloc[0] == 0
+    assert page_of(df, 9, 25)[0]["x"].iloc[0] == 50
+    rows, pages = page_of(df.iloc[:0], 1, 25)
+    assert pages == 1 and rows.empty
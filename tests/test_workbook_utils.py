@@ -0,0 +1,26 @@
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+
+from workbook_utils import TableFile
+
+
+def zipped(files: dict) -> bytes:
+    bio = BytesIO()
+    with zipfile.ZipFile(bio, "w") as zf:
+        for path, text in files.items():
+            zf.writestr(path, text)
+    return bio.getvalue()
+
+
+def test_zip_members_with_the_same_name_stay_apart():
+    data = zipped({
+        "a/Σ1.csv": "ΟΝΟΜΑ,ΤΜΗΜΑ\nα,Α1\n", "b/Σ1.csv": "ΟΝΟΜΑ,ΤΜΗΜΑ\nβ,Α2\n",
+        "Σ2.csv": "ΟΝΟΜΑ;ΤΜΗΜΑ\nγ;Α1\n", "Σ3.csv": "ΟΝΟΜΑ,ΤΜΗΜΑ\nδ,Α1\n",
+        "Σ3.parquet": pd.DataFrame({"ΟΝΟΜΑ": ["ε"], "ΤΜΗΜΑ": ["Α1"]}).to_parquet(),
+    })
+    table = TableFile.from_bytes(data, "zip")
+    assert sorted(table.sheet_names) == ["a/Σ1", "b/Σ1", "Σ2", "Σ3.csv", "Σ3.parquet"]
+    names = [table.parse(s)["ΟΝΟΜΑ"][0] for s in ("a/Σ1", "b/Σ1", "Σ2", "Σ3.csv", "Σ3.parquet")]
+    assert names == ["α", "β", "γ", "δ", "ε"]
@@ -0,0 +1,634 @@
+import hashlib
+import importlib.util
+import os
+import threading
+import zipfile
+from collections import Counter
+from io import BytesIO
+import pandas as pd
+
+from instrumentation import StageTimer
+from result_cache import estimate_size
+
+# ---------- Content hashing ----------
+def content_hash(data: bytes) -> str:
+    """Σταθερό κλειδί για ένα ανεβασμένο αρχείο (ίδια bytes -> ίδιο κλειδί)."""
+    return hashlib.sha256(data or b"").hexdigest()
+
+# ---------- Reader engine ----------
+# "auto": calamine (Rust, python-calamine) αν είναι εγκατεστημένο, αλλιώς η προεπιλογή του pandas
+# (openpyxl σε read-only mode για .xlsx, xlrd για .xls). Επιλογή και με EXCEL_READER_ENGINE.
+DEFAULT_ENGINE = os.environ.get("EXCEL_READER_ENGINE", "auto")
+
+def _candidate_engines(engine: str) -> list:
+    if engine != "auto":
+        return [engine]
+    engines = []
+    if importlib.util.find_spec("python_calamine") is not None:
+        engines.append("calamine")
+    engines.append(None)
+    return engines
+
+def open_excel(data: bytes, engine: str = DEFAULT_ENGINE) -> pd.ExcelFile:
+    """pd.ExcelFile με τον ταχύτερο διαθέσιμο reader (ή τον `engine` που ζητήθηκε)."""
+    candidates = _candidate_engines(engine)
+    for i, eng in enumerate(candidates):
+        try:
+            return pd.ExcelFile(BytesIO(data), engine=eng)
+        except (ImportError, ValueError):
+            # π.χ. παλιό pandas χωρίς calamine: δοκίμασε τον επόμενο
+            if i == len(candidates) - 1:
+                raise
+
+# ---------- Columnar input (CSV / Parquet / Arrow, ή zip με πολλά) ----------
+TABLE_SUFFIXES = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet",
+                  ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+UPLOAD_TYPES = ["xlsx", "xls", "csv", "parquet", "arrow", "feather", "zip"]
+
+def _table_format(data: bytes, name: str = None):
+    """'excel' / 'zip' / 'parquet' / 'arrow' / 'csv' από τα πρώτα bytes (και την κατάληξη για CSV)."""
+    head = data[:8]
+    if head.startswith(b"PK\x03\x04"):
+        with zipfile.ZipFile(BytesIO(data)) as zf:
+            return "excel" if "[Content_Types].xml" in zf.namelist() else "zip"
+    if head.startswith(b"\xd0\xcf\x11\xe0"):      # OLE2: .xls
+        return "excel"
+    if head.startswith(b"PAR1"):
+        return "parquet"
+    if head.startswith(b"ARROW1"):
+        return "arrow"
+    ext = os.path.splitext(name or "")[1].lower()
+    if ext in (".xlsx", ".xls"):
+        return "excel"
+    return TABLE_SUFFIXES.get(ext, "csv")
+
+def _sniff_sep(data: bytes) -> str:
+    """Διαχωριστικό CSV από την πρώτη γραμμή (το ελληνικό Excel γράφει συχνά ';')."""
+    first = data[:4096].split(b"\n", 1)[0]
+    return max((b",", b";", b"\t"), key=first.count).decode()
+
+class TableFile:
+    """
+    Ίδια διεπαφή με το pd.ExcelFile (`sheet_names`, `engine`, `parse`) για πίνακες CSV/Parquet/Arrow:
+    ένα αρχείο = ένα σενάριο (sheet με το όνομα του αρχείου), zip = ένα σενάριο ανά αρχείο του zip
+    (ίδια ονόματα σε διαφορετικούς φακέλους/μορφές ξεχωρίζουν, βλ. _member_names).
+    Τα bytes κάθε πίνακα μένουν στη μνήμη (όπως και του Excel)· κάθε parse διαβάζει μόνο όσα ζητούνται.
+    """
+
+    def __init__(self, members: dict, engine: str):
+        self._members = members          # {sheet: (format, bytes)}
+        self.engine = engine
+        self.sheet_names = list(members)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, fmt: str, name: str = None) -> "TableFile":
+        if fmt != "zip":
+            sheet = os.path.splitext(os.path.basename(name))[0] if name else "Sheet1"
+            return cls({sheet: (fmt, data)}, fmt)
+        found = []
+        with zipfile.ZipFile(BytesIO(data)) as zf:
+            for info in sorted(zf.infolist(), key=lambda i: i.filename):
+                base = os.path.basename(info.filename)
+                ext = os.path.splitext(base)[1].lower()
+                if info.is_dir() or base.startswith((".", "~$")) or "__MACOSX" in info.filename or ext not in TABLE_SUFFIXES:
+                    continue
+                found.append((info.filename, TABLE_SUFFIXES[ext], zf.read(info)))
+        if not found:
+            raise ValueError("Το zip δεν περιέχει αρχεία CSV/Parquet/Arrow")
+        return cls(dict(zip(_member_names([path for path, _, _ in found]), [m[1:] for m in found])), "zip")
+
+    def _columns(self, fmt: str, data: bytes) -> list:
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            return list(pq.ParquetFile(BytesIO(data)).schema_arrow.names)
+        if fmt == "arrow":
+            import pyarrow.ipc as ipc
+            return list(ipc.open_file(BytesIO(data)).schema.names)
+        return list(pd.read_csv(BytesIO(data), sep=_sniff_sep(data), nrows=0, encoding="utf-8-sig").columns)
+
+    def parse(self, sheet_name: str, nrows: int = None, usecols=None) -> pd.DataFrame:
+        """Όπως το ExcelFile.parse: `nrows=0` μόνο επικεφαλίδες, `usecols` θέσεις στηλών."""
+        fmt, data = self._members[sheet_name]
+        if nrows == 0 and fmt != "csv":
+            return pd.DataFrame(columns=self._columns(fmt, data))
+        if fmt == "csv":
+            return pd.read_csv(BytesIO(data), sep=_sniff_sep(data), nrows=nrows, usecols=usecols, encoding="utf-8-sig")
+        columns = None
+        if usecols is not None:
+            names = self._columns(fmt, data)
+            columns = [names[i] for i in usecols]
+        if fmt == "parquet":
+            df = pd.read_parquet(BytesIO(data), columns=columns)
+        else:
+            df = pd.read_feather(BytesIO(data), columns=columns)
+        return df if nrows is None else df.head(nrows)
+
+def _member_names(paths: list) -> list:
+    """
+    Όνομα σεναρίου ανά αρχείο του zip: το όνομα του αρχείου χωρίς κατάληξη· όσα συμπίπτουν (π.χ. a/S1.csv
+    και b/S1.csv) παίρνουν και τον φάκελο («a/S1»), και αν συμπίπτουν ακόμη (S1.csv, S1.parquet) την κατάληξη.
+    """
+    names = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    seen = Counter(names)
+    names = [os.path.splitext(p)[0] if seen[n] > 1 else n for n, p in zip(names, paths)]
+    seen = Counter(names)
+    return [p if seen[n] > 1 else n for n, p in zip(names, paths)]
+
+def open_source(data: bytes, name: str = None, engine: str = DEFAULT_ENGINE):
+    """Excel (pd.ExcelFile) ή TableFile για CSV/Parquet/Arrow/zip, ανάλογα με το περιεχόμενο."""
+    fmt = _table_format(data, name)
+    if fmt == "excel":
+        return open_excel(data, engine)
+    return TableFile.from_bytes(data, fmt, name)
+
+# ---------- Parallel per-sheet work ----------
+PARALLEL_MIN_SHEETS = 8   # λιγότερα sheets -> σειριακά (το κόστος του pool δεν αξίζει)
+
+_POOL = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+def _get_pool(workers: int):
+    """Ένα κοινό process pool ανά διεργασία (spawn: ασφαλές μέσα από threads του Streamlit)."""
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+            _POOL_WORKERS = workers
+        return _POOL
+
+def _reset_pool():
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL, _POOL_WORKERS = None, 0
+
+def parallel_map(func, items, workers=None, min_items: int = PARALLEL_MIN_SHEETS) -> list:
+    """
+    [func(x) for x in items] με την ίδια σειρά, μοιρασμένο σε process pool.
+    `func` πρέπει να είναι top-level συνάρτηση/κλάση module (picklable).
+    Σειριακά όταν τα items είναι λίγα, όταν workers <= 1 ή αν χαλάσει το pool.
+    """
+    items = list(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(items))
+    if workers <= 1 or len(items) < min_items:
+        return [func(x) for x in items]
+    # multiprocessing/concurrent.futures μόνο όταν χρειαστεί pool (γρήγορο import του core)
+    from concurrent.futures.process import BrokenProcessPool
+    chunksize = max(1, len(items) // (workers * 4))
+    try:
+        return list(_get_pool(workers).map(func, items, chunksize=chunksize))
+    except BrokenProcessPool:
+        _reset_pool()
+        return [func(x) for x in items]
+
+def parallel_completed(func, items, workers=None, min_items: int = PARALLEL_MIN_SHEETS):
+    """
+    Σαν το parallel_map, αλλά generator με τη σειρά ολοκλήρωσης (as_completed): (i, αποτέλεσμα, None)
+    ή (i, None, εξαίρεση) — ένα item που αποτυγχάνει δεν σταματά τα υπόλοιπα. Αν σταματήσει η
+    ανάγνωση (break/close), όσα δεν ξεκίνησαν ακυρώνονται.
+    """
+    items = list(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(items))
+    pending = set(range(len(items)))
+    futures = {}
+    if workers > 1 and len(items) >= min_items:
+        from concurrent.futures import as_completed
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            pool = _get_pool(workers)
+            futures = {pool.submit(func, items[i]): i for i in sorted(pending)}
+            for future in as_completed(futures):
+                i = futures[future]
+                error = future.exception()
+                if isinstance(error, BrokenProcessPool):
+                    raise error
+                pending.discard(i)
+                yield (i, None, error) if error is not None else (i, future.result(), None)
+        except BrokenProcessPool:
+            _reset_pool()               # τα υπόλοιπα σειριακά
+        finally:
+            for future in futures:
+                future.cancel()
+    for i in sorted(pending):
+        try:
+            result = func(items[i])
+        except Exception as e:
+            yield i, None, e
+        else:
+            yield i, result, None
+
+# ---------- Parse-once workbook ----------
+class Workbook:
+    """
+    Ένα ανεβασμένο Excel (ή CSV/Parquet/Arrow/zip μέσω TableFile, `name` = όνομα αρχείου) που διαβάζεται **μία φορά**.
+      - κάθε sheet γίνεται parse το πολύ μία φορά (lazy, στην πρώτη ζήτηση)
+      - `usecols(header)` (προαιρετικό): από την επικεφαλίδα του sheet επιλέγει ποιες στήλες
+        (θέσεις) χρειάζεται το `normalize`· None = όλες. Οι υπόλοιπες στήλες διαβάζονται μόνο όταν
+        ζητηθούν (`normalized(sheet, all_columns=True)`, π.χ. για την εξαγωγή του πίνακα μαθητών).
+        Ο κατάλογος επικεφαλίδων (`catalog`) διαβάζει μόνο την πρώτη γραμμή κάθε sheet.
+      - κάθε sheet περνά από `normalize` (π.χ. auto_rename_columns) το πολύ μία φορά
+      - προαιρετικά, κάθε κανονικοποιημένο sheet περνά από `analyze` (π.χ. ScenarioAnalysis) μία φορά·
+        το `analyze_many(frames, workers)` (αν δοθεί) αναλύει πολλά sheets μαζί στο analyze_all
+        (π.χ. κοινός γράφος για σενάρια με ίδιο roster) και το `analyze_iter(frames, workers, chunk_size)`
+        το ίδιο με τη σειρά ολοκλήρωσης, για το AnalysisJob (βλ. iter_analyze_sheets)
+      - κάθε αναφορά (bytes) χτίζεται μόνο όταν ζητηθεί και μία φορά ανά κλειδί
+      - κάθε στάδιο (άνοιγμα, parse, normalize, analyze, export) χρονομετρείται στο `timer`·
+        το `diagnostics()` τα δίνει μαζί με τα εσωτερικά στάδια των αναλύσεων (αν έχουν `timer`)
+    Τα DataFrames που επιστρέφονται είναι κοινόχρηστα: αντιμετωπίζονται ως read-only
+    (όποιος θέλει να τα αλλάξει κάνει πρώτα .copy()).
+    """
+
+    def __init__(self, data: bytes, normalize=None, analyze=None, usecols=None, engine: str = DEFAULT_ENGINE,
+                 analyze_many=None, name: str = None, analyze_iter=None):
+        self.timer = StageTimer()
+        self.digest = content_hash(data)
+        self.nbytes = len(data or b"")
+        with self.timer.stage("excel_open"):
+            self._xl = open_source(data, name, engine)
+        self.engine = self._xl.engine
+        self.sheet_names = list(self._xl.sheet_names)
+        self._normalize = normalize
+        self._analyze = analyze
+        self._analyze_many = analyze_many
+        self._analyze_iter = analyze_iter
+        self._usecols = usecols
+        self._headers = {}
+        self._raw = {}
+        self._norm = {}
+        self._norm_all = {}
+        self._analysis = {}
+        self._reports = {}
+        self._derived = {}
+        self._lock = threading.RLock()
+        self._job = None
+
+    def headers(self, sheet: str) -> list:
+        """Οι επικεφαλίδες του sheet (διαβάζεται μόνο η πρώτη γραμμή)."""
+        with self._lock:
+            if sheet not in self._headers:
+                if sheet in self._raw:
+                    self._headers[sheet] = list(self._raw[sheet].columns)
+                else:
+                    with self.timer.stage("parse_header", sheet):
+                        self._headers[sheet] = list(self._xl.parse(sheet_name=sheet, nrows=0).columns)
+            return self._headers[sheet]
+
+    @property
+    def catalog(self) -> dict:
+        """{sheet: επικεφαλίδες} για όλα τα sheets."""
+        return {sheet: self.headers(sheet) for sheet in self.sheet_names}
+
+    def raw(self, sheet: str) -> pd.DataFrame:
+        """Το sheet όπως είναι στο αρχείο (όλες οι στήλες, χωρίς μετονομασίες)."""
+        with self._lock:
+            if sheet not in self._raw:
+                with self.timer.stage("parse", sheet):
+                    self._raw[sheet] = self._xl.parse(sheet_name=sheet)
+            return self._raw[sheet]
+
+    def _selected(self, sheet: str) -> pd.DataFrame:
+        """Μόνο οι στήλες που ζητά το `usecols` (ή όλες, αν το raw έχει ήδη διαβαστεί)."""
+        if sheet in self._raw or self._usecols is None:
+            return self.raw(sheet)
+        header = self.headers(sheet)
+        cols = self._usecols(header)
+        if cols is None or len(set(cols)) == len(header):
+            return self.raw(sheet)
+        with self.timer.stage("parse", sheet):
+            return self._xl.parse(sheet_name=sheet, usecols=sorted(cols))
+
+    def normalized(self, sheet: str, all_columns: bool = False):
+        """
+        (df_norm, mapping) — το αποτέλεσμα του `normalize` για το sheet, υπολογισμένο μία φορά.
+        all_columns=True: και οι στήλες που άφησε έξω το `usecols` (ίδιες γραμμές και index), με ένα
+        επιπλέον πλήρες parse μόνο αν το κανονικό διάβασε λιγότερες στήλες.
+        """
+        store = self._norm_all if all_columns else self._norm
+        if sheet in store:                 # έτοιμο: χωρίς αναμονή στο lock (π.χ. όσο τρέχει AnalysisJob)
+            return store[sheet]
+        with self._lock:
+            if sheet not in self._norm:
+                df_raw = self._selected(sheet)
+                self._norm[sheet] = self._normalize_frame(sheet, df_raw)
+                if df_raw is self._raw.get(sheet):
+                    self._norm_all[sheet] = self._norm[sheet]
+            if all_columns and sheet not in self._norm_all:
+                self._norm_all[sheet] = self._normalize_frame(sheet, self.raw(sheet))
+            return store[sheet]
+
+    def _normalize_frame(self, sheet: str, df_raw: pd.DataFrame):
+        if self._normalize is None:
+            return df_raw, {}
+        with self.timer.stage("normalize", sheet):
+            return self._normalize(df_raw)
+
+    def analysis(self, sheet: str):
+        """Το αποτέλεσμα του `analyze` πάνω στο κανονικοποιημένο sheet (υπολογίζεται μία φορά)."""
+        if sheet in self._analysis:
+            return self._analysis[sheet]
+        with self._lock:
+            if sheet not in self._analysis:
+                if self._analyze is None:
+                    raise ValueError("Workbook created without an `analyze` callable")
+                df_norm = self.normalized(sheet)[0]
+                with self.timer.stage("analyze", sheet):
+                    self._analysis[sheet] = self._analyze(df_norm)
+            return self._analysis[sheet]
+
+    def analyze_all(self, workers=None) -> list:
+        """Αναλύσεις όλων των sheets (με τη σειρά του αρχείου)· όσες λείπουν τρέχουν παράλληλα."""
+        with self._lock:
+            if self._analyze is None:
+                raise ValueError("Workbook created without an `analyze` callable")
+            todo = [s for s in self.sheet_names if s not in self._analysis]
+            frames = [self.normalized(s)[0] for s in todo]
+            if todo:
+                with self.timer.stage("analyze_all"):
+                    if self._analyze_many is not None:
+                        results = self._analyze_many(frames, workers=workers)
+                    else:
+                        results = parallel_map(self._analyze, frames, workers=workers)
+                for sheet, result in zip(todo, results):
+                    self._analysis[sheet] = result
+            return [self._analysis[s] for s in self.sheet_names]
+
+    def iter_analyses(self, sheets=None, workers=None, chunk_size: int = None):
+        """
+        Αναλύει όσα από τα `sheets` (προεπιλογή: όλα) λείπουν και δίνει (sheet, None) μόλις είναι έτοιμο
+        ή (sheet, εξαίρεση) αν απέτυχε — ένα sheet που αποτυγχάνει δεν σταματά τα υπόλοιπα.
+        Με `analyze_iter` τα sheets τρέχουν στο process pool και έρχονται με τη σειρά ολοκλήρωσης·
+        το lock κρατιέται μόνο για την αποθήκευση, ώστε τα έτοιμα sheets να διαβάζονται στο μεταξύ.
+        Ένα κομμάτι που αποτυγχάνει στο pool ξαναδοκιμάζεται sheet-sheet με το `analysis`.
+        """
+        todo, frames = [], []
+        for sheet in (self.sheet_names if sheets is None else sheets):
+            if sheet in self._analysis:
+                yield sheet, None
+                continue
+            if self._analyze_iter is None:
+                try:
+                    self.analysis(sheet)
+                except Exception as e:
+                    yield sheet, e
+                else:
+                    yield sheet, None
+                continue
+            try:
+                frames.append(self.normalized(sheet)[0])
+            except Exception as e:
+                yield sheet, e
+            else:
+                todo.append(sheet)
+        if not todo:
+            return
+        for positions, results, error in self._analyze_iter(frames, workers=workers, chunk_size=chunk_size):
+            for k, i in enumerate(positions):
+                sheet = todo[i]
+                if error is None:
+                    with self._lock:
+                        self._analysis.setdefault(sheet, results[k])
+                    yield sheet, None
+                    continue
+                try:
+                    self.analysis(sheet)
+                except Exception as e:
+                    yield sheet, e
+                else:
+                    yield sheet, None
+
+    def is_analyzed(self, sheet: str) -> bool:
+        return sheet in self._analysis
+
+    @property
+    def job(self):
+        """Το AnalysisJob του workbook (ή None), χωρίς να ξεκινά νέο."""
+        return self._job
+
+    def start_analysis(self) -> "AnalysisJob":
+        """
+        Ανάλυση όλων των sheets στο παρασκήνιο (AnalysisJob), παράλληλα στο process pool.
+        Ένα job ανά Workbook: επιστρέφεται το τρέχον (ή το ολοκληρωμένο)· μετά από ακύρωση ξεκινά νέο
+        που συνεχίζει από τα sheets που λείπουν.
+        """
+        with self._lock:
+            if self._job is None or (self._job.finished and self._job.cancelled):
+                self._job = AnalysisJob(self)
+                self._job.start()
+            return self._job
+
+    def cancel_analysis(self):
+        """Ακυρώνει το job παρασκηνίου (αν υπάρχει)· όσα sheets αναλύονται ήδη ολοκληρώνονται."""
+        job = self._job
+        if job is not None:
+            job.cancel()
+
+    def has_report(self, key) -> bool:
+        return key in self._reports
+
+    def report(self, key, build) -> bytes:
+        """Τα bytes της αναφοράς `key` (π.χ. ("mass",) ή ("stats", sheet)): `build()` καλείται μία φορά."""
+        with self._lock:
+            if key not in self._reports:
+                with self.timer.stage(f"export:{key[0]}", key[1] if len(key) > 1 else None):
+                    self._reports[key] = build()
+            return self._reports[key]
+
+    def derived(self, key, build):
+        """Αποτέλεσμα που προκύπτει από όλο το workbook (π.χ. σύγκριση σεναρίων): `build()` καλείται μία φορά."""
+        with self._lock:
+            if key not in self._derived:
+                with self.timer.stage(f"derive:{key[0]}"):
+                    self._derived[key] = build()
+            return self._derived[key]
+
+    def duplicates(self) -> dict:
+        """{sheet: πρώτο πανομοιότυπο sheet} για sheets που μοιράζονται το ίδιο αντικείμενο ανάλυσης."""
+        analyses = dict(self._analysis)     # στιγμιότυπο: δεν περιμένει το lock όσο τρέχει AnalysisJob
+        first, dups = {}, {}
+        for sheet in self.sheet_names:
+            if sheet in analyses:
+                key = id(analyses[sheet])
+                if key in first:
+                    dups[sheet] = first[key]
+                else:
+                    first[key] = sheet
+        return dups
+
+    def diagnostics(self) -> pd.DataFrame:
+        """Χρόνοι/μνήμη ανά στάδιο και sheet: του Workbook + τα εσωτερικά στάδια κάθε ανάλυσης."""
+        combined = StageTimer()
+        combined.merge(self.timer)
+        analyses = list(self._analysis.items())
+        seen = set()
+        for sheet, result in analyses:
+            timer = getattr(result, "timer", None)
+            if timer is not None and id(result) not in seen:   # πανομοιότυπα sheets: μία ανάλυση
+                seen.add(id(result))
+                combined.merge(timer, sheet)
+        return combined.frame()
+
+    def memory_estimate(self) -> int:
+        """
+        Εκτίμηση bytes: το αρχείο + ό,τι έχει υπολογιστεί (sheets, αναλύσεις, αναφορές, παράγωγα)·
+        κοινόχρηστα αντικείμενα (π.χ. το df_norm μέσα στην ανάλυση) μετρούν μία φορά.
+        Δεν περιλαμβάνει τις εσωτερικές δομές του reader.
+        """
+        seen = set()
+        stores = (self._headers, self._raw, self._norm, self._norm_all, self._analysis, self._reports, self._derived)
+        return self.nbytes + sum(estimate_size(dict(store), seen) for store in stores)
+
+    def close(self):
+        """
+        Ακυρώνει το job παρασκηνίου και αδειάζει τα αποτελέσματα (π.χ. όταν αφαιρείται από τη μνήμη
+        αποτελεσμάτων), χωρίς να περιμένει το lock· όποιος κρατά ακόμη το Workbook απλώς ξαναϋπολογίζει.
+        """
+        self.cancel_analysis()
+        for store in (self._raw, self._norm, self._norm_all, self._analysis, self._reports, self._derived):
+            store.clear()
+
+    def items(self):
+        """Iterate (sheet, df_norm) με τη σειρά του αρχείου."""
+        for sheet in self.sheet_names:
+            yield sheet, self.normalized(sheet)[0]
+
+# ---------- Background analysis ----------
+class AnalysisJob:
+    """
+    Ανάλυση των sheets ενός Workbook σε νήμα παρασκηνίου, μοιρασμένη στο process pool
+    (Workbook.iter_analyses), ώστε τα έτοιμα sheets να είναι διαθέσιμα όσο προχωρά το υπόλοιπο.
+      - `done`: sheets που ολοκληρώθηκαν (με τη σειρά ολοκλήρωσης)
+      - `errors`: {sheet: εξαίρεση} για sheets που απέτυχαν· το job συνεχίζει με τα υπόλοιπα
+      - `cancel()`: δεν ξεκινούν νέα sheets (όσα τρέχουν ήδη στο pool ολοκληρώνονται)
+    """
+
+    chunk_size = 4      # sheets ανά εργασία του pool: συχνότερη πρόοδος, κοινός γράφος ανά κομμάτι
+
+    def __init__(self, wb: "Workbook", workers=None):
+        self.wb = wb
+        self.workers = workers
+        self.total = len(wb.sheet_names)
+        self.done = []
+        self.errors = {}
+        self.finished = False
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"analysis-{wb.digest[:8]}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        results = self.wb.iter_analyses(workers=self.workers, chunk_size=self.chunk_size)
+        try:
+            for sheet, error in results:
+                if error is None:
+                    self.done.append(sheet)
+                else:
+                    self.errors[sheet] = error
+                if self._cancel.is_set():
+                    break
+        except Exception as e:          # π.χ. αποτυχία πριν από οποιοδήποτε sheet
+            for sheet in self.wb.sheet_names:
+                if sheet not in self.done:
+                    self.errors.setdefault(sheet, e)
+        finally:
+            results.close()
+            self.finished = True
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def complete(self) -> bool:
+        """Όλα τα sheets αναλύθηκαν (χωρίς σφάλματα)."""
+        return len(self.done) == self.total
+
+    @property
+    def failed(self) -> list:
+        """Τα sheets που απέτυχαν, με τη σειρά του αρχείου."""
+        errors = dict(self.errors)
+        return [s for s in self.wb.sheet_names if s in errors]
+
+    @property
+    def progress(self) -> float:
+        return (len(self.done) + len(self.errors)) / self.total if self.total else 1.0
+
+    def wait(self, timeout: float = None) -> bool:
+        """Περιμένει να τελειώσει το job· True αν τελείωσε."""
+        self._thread.join(timeout)
+        return self.finished
+
+# ---------- Streaming xlsx export ----------
+# Τα προσωρινά αρχεία του xlsxwriter (γραμμές του constant_memory, μέρη του zip) πάνε σε κατάλογο στη RAM
+# (tmpfs): XLSX_TMPDIR ή /dev/shm. Χωρίς τέτοιον κατάλογο (π.χ. Windows/macOS) όλα μένουν στη μνήμη της
+# διεργασίας (in_memory, χωρίς το όριο του ενός sheet), ώστε τα δεδομένα να μη γράφονται ποτέ σε δίσκο.
+def _ram_tmpdir():
+    path = os.environ.get("XLSX_TMPDIR") or "/dev/shm"
+    return path if os.path.isdir(path) and os.access(path, os.W_OK) else None
+
+XLSX_TMPDIR = _ram_tmpdir()
+XLSX_DATE_FORMAT = "yyyy-mm-dd hh:mm:ss"      # ημερομηνίες όπως στο to_excel του pandas
+
+def xlsx_options(constant_memory: bool = False) -> dict:
+    """Επιλογές του xlsxwriter.Workbook χωρίς αρχεία σε δίσκο (βλ. XLSX_TMPDIR)."""
+    if XLSX_TMPDIR is None:
+        return {"in_memory": True, "default_date_format": XLSX_DATE_FORMAT}
+    return {"tmpdir": XLSX_TMPDIR, "constant_memory": constant_memory, "default_date_format": XLSX_DATE_FORMAT}
+
+# pd.ExcelWriter(..., engine="xlsxwriter", engine_kwargs=XLSX_ENGINE_KWARGS)
+XLSX_ENGINE_KWARGS = {"options": xlsx_options()}
+
+class XlsxStreamWriter:
+    """
+    xlsx γραμμή-γραμμή με το constant_memory του xlsxwriter: κάθε γραμμή γράφεται αμέσως
+    και ένα sheet «κλείνει» μόλις ανοίξει το επόμενο, οπότε στη μνήμη μένει το πολύ ένα sheet.
+    Τα ενδιάμεσα αρχεία είναι στο XLSX_TMPDIR (RAM) και σβήνονται στο close· χωρίς XLSX_TMPDIR
+    το αρχείο χτίζεται ολόκληρο στη μνήμη. Ημερομηνίες με XLSX_DATE_FORMAT (όχι σκέτοι αριθμοί).
+    """
+
+    def __init__(self, output=None):
+        import xlsxwriter
+        self.output = output if output is not None else BytesIO()
+        self.book = xlsxwriter.Workbook(self.output, xlsx_options(constant_memory=True))
+        self._header_fmt = self.book.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.book.close()
+        return False
+
+    def write_rows(self, sheet_name: str, header, rows):
+        """Νέο sheet με επικεφαλίδα και γραμμές από οποιοδήποτε iterable (NaN/None -> κενό)."""
+        ws = self.book.add_worksheet(sheet_name)
+        ws.write_row(0, 0, list(header), self._header_fmt)
+        for r, row in enumerate(rows, start=1):
+            ws.write_row(r, 0, [None if _is_missing(v) else v for v in row])
+        return ws
+
+    def write_frame(self, sheet_name: str, df: pd.DataFrame):
+        return self.write_rows(sheet_name, df.columns, df.astype(object).itertuples(index=False, name=None))
+
+    def getvalue(self) -> bytes:
+        """Τα bytes του αρχείου (μετά το close). Το BytesIO.getvalue() δεν αντιγράφει το buffer."""
+        return self.output.getvalue()
+
+def _is_missing(v) -> bool:
+    try:
+        return v is None or bool(pd.isna(v))
+    except (TypeError, ValueError):
+        return False